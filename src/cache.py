@@ -0,0 +1,333 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TypedDict
+
+from fingerprint import hash_file, walk_tree
+from manager import VersionManager
+
+# Settings, in the manager's data_dir
+CACHE_FILE = "cache.json"
+# Per-cache bookkeeping, kept next to the copies so it survives moving data_dir
+INDEX_FILE = ".pivot-cache.json"
+# Partially copied files; never linked, removed on the next sync
+PART_SUFFIX = ".pivot-part"
+
+DEFAULT_BUDGET = 20 * 1024 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+
+def default_cache_root() -> Path:
+    """A local disk even when Pivot itself runs from the share."""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(Path.home(), ".cache")
+    return Path(base) / "pivot" / "versions"
+
+
+class CacheSettings(TypedDict):
+    enabled: bool
+    root: str
+    budget_bytes: int
+    # "mtime" (size + mtime) | "hash" (size + mtime, and the local copy's
+    # SHA-256 against the source's, recorded when it was copied)
+    compare: str
+    workers: int  # Parallel file copies
+
+
+class CacheEntry(TypedDict, total=False):
+    bytes: int
+    last_used: float
+    complete: bool
+    # compare="hash" only: {relpath: SHA-256 of the source file as copied}
+    hashes: dict[str, str]
+
+
+class SyncResult(TypedDict):
+    folder_name: str
+    copied: int
+    copied_bytes: int
+    removed: int
+    unchanged: int
+    elapsed: float
+
+
+def load_settings(path: Path) -> CacheSettings:
+    settings: CacheSettings = {
+        "enabled": False,
+        "root": str(default_cache_root()),
+        "budget_bytes": DEFAULT_BUDGET,
+        "compare": "mtime",
+        "workers": 8,
+    }
+    try:
+        with open(path, encoding="utf-8") as f:
+            settings.update(json.load(f))
+    except (FileNotFoundError, ValueError):
+        pass
+    return settings
+
+
+def save_settings(settings: CacheSettings, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _copy_file(src: str, dst: str) -> tuple[int, str]:
+    """
+    Streams src to dst through a temp file, then copies mode and mtime.
+    Returns (bytes, SHA-256 of what was copied), hashed on the way through.
+    """
+    part = dst + PART_SUFFIX
+    h = hashlib.sha256()
+    copied = 0
+    with open(src, "rb") as fsrc, open(part, "wb") as fdst:
+        while chunk := fsrc.read(CHUNK_SIZE):
+            fdst.write(chunk)
+            h.update(chunk)
+            copied += len(chunk)
+    # Permission bits matter too, e.g. executables on POSIX shares
+    shutil.copystat(src, part)
+    os.replace(part, dst)
+    return copied, h.hexdigest()
+
+
+class LocalCache:
+    """
+    Read-through mirror of Versions/ on a local disk for slow network shares.
+
+    Versions/ stays authoritative. Before a link is created the version is
+    synced into <root>/<folder_name>: only files whose size and mtime (or
+    hash) differ are copied, in parallel. The link then points at the copy.
+    Copies are evicted least-recently-linked first once the disk budget is
+    exceeded; versions currently linked from Persists/ are never evicted.
+    """
+
+    def __init__(self, manager: VersionManager, settings_path: Path | None = None):
+        self.manager = manager
+        self.settings_path = settings_path or manager.data_dir / CACHE_FILE
+        self.settings = load_settings(self.settings_path)
+        self.root = Path(self.settings["root"])
+        self._lock = threading.RLock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings["enabled"]
+
+    def attach(self) -> None:
+        """
+        Routes the manager's links through this cache. Attached even when
+        disabled, so links still pointing into the cache are recognized.
+        """
+        self.manager.mirror = self
+
+    def path(self, folder_name: str) -> Path:
+        return self.root / folder_name
+
+    # -- Index --
+
+    def _load_index(self) -> dict[str, CacheEntry]:
+        try:
+            with open(self.root / INDEX_FILE, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_index(self, index: dict[str, CacheEntry]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / (INDEX_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.root / INDEX_FILE)
+
+    def entries(self) -> dict[str, CacheEntry]:
+        with self._lock:
+            return self._load_index()
+
+    # -- Sync --
+
+    def _unchanged(
+        self, relpath: str, src: str, dst: str, src_stat, dst_stat, hashes: dict
+    ) -> bool:
+        if dst_stat is None or dst_stat[3] != src_stat[3] or dst_stat[0] != src_stat[0]:
+            return False
+        if src_stat[3] is not None:
+            # Symlinks: same target text
+            return True
+        if stat.S_IMODE(dst_stat[4]) != stat.S_IMODE(src_stat[4]):
+            return False
+        if dst_stat[1] != src_stat[1]:
+            return False
+        if self.settings["compare"] == "hash":
+            # Hashing the share costs as much as copying from it, so the
+            # source is read only if no hash was recorded when copying
+            if relpath not in hashes:
+                hashes[relpath] = hash_file(src)
+            return hash_file(dst) == hashes[relpath]
+        return True
+
+    def sync(
+        self,
+        folder_name: str,
+        src_files: dict | None = None,
+        hashes: dict[str, str] | None = None,
+    ) -> SyncResult:
+        """
+        Brings the local copy of one version up to date with Versions/.
+        hashes ({relpath: source SHA-256}, see CacheEntry) is updated in place.
+        """
+        if hashes is None:
+            hashes = {}
+        started = time.perf_counter()
+        source = self.manager.version_path(folder_name)
+        target = self.path(folder_name)
+        target.mkdir(parents=True, exist_ok=True)
+
+        if src_files is None:
+            src_files = walk_tree(source)
+        dst_files = walk_tree(target)
+
+        removed = 0
+        for relpath in dst_files.keys() - src_files.keys():
+            os.unlink(target / relpath)
+            hashes.pop(relpath, None)
+            removed += 1
+
+        to_copy: list[tuple[str, str]] = []
+        copy_relpaths: list[str] = []
+        unchanged = 0
+        for relpath, src_stat in src_files.items():
+            src = str(source / relpath)
+            dst = str(target / relpath)
+            if self._unchanged(
+                relpath, src, dst, src_stat, dst_files.get(relpath), hashes
+            ):
+                unchanged += 1
+                continue
+
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if src_stat[3] is not None:
+                if os.path.lexists(dst):
+                    os.unlink(dst)
+                os.symlink(src_stat[3], dst)
+                continue
+            to_copy.append((src, dst))
+            copy_relpaths.append(relpath)
+
+        copied_bytes = 0
+        if to_copy:
+            # Network reads dominate; several streams keep the link busy
+            with ThreadPoolExecutor(max_workers=self.settings["workers"]) as pool:
+                copies = pool.map(lambda job: _copy_file(*job), to_copy)
+                for relpath, (size, digest) in zip(copy_relpaths, copies):
+                    copied_bytes += size
+                    hashes[relpath] = digest
+
+        return {
+            "folder_name": folder_name,
+            "copied": len(to_copy),
+            "copied_bytes": copied_bytes,
+            "removed": removed,
+            "unchanged": unchanged,
+            "elapsed": time.perf_counter() - started,
+        }
+
+    def prepare(self, folder_names: list[str]) -> dict[str, Path]:
+        """
+        Called by VersionManager before linking. Syncs each version and
+        returns {folder_name: local path}. Versions that fail to sync or do
+        not fit the budget are left out, so their links use Versions/.
+        """
+        prepared: dict[str, Path] = {}
+        with self._lock:
+            index = self._load_index()
+            for folder_name in dict.fromkeys(folder_names):
+                try:
+                    src_files = walk_tree(self.manager.version_path(folder_name))
+                except OSError as ex:
+                    print(
+                        f"Failed to read {folder_name}, linking Versions/ directly: {ex}"
+                    )
+                    continue
+
+                size = sum(file_stat[0] for file_stat in src_files.values())
+                if size > self.settings["budget_bytes"]:
+                    print(f"{folder_name} is larger than the cache budget, not cached")
+                    continue
+
+                hashes = index.get(folder_name, {}).get("hashes", {})
+                # Make room first. Copies still linked stay, even the ones
+                # being replaced; the manager evicts again after relinking.
+                index[folder_name] = {
+                    "bytes": size,
+                    "last_used": time.time(),
+                    "complete": False,
+                }
+                self._evict(index, keep=set(prepared) | {folder_name})
+                self._save_index(index)
+
+                try:
+                    result = self.sync(folder_name, src_files, hashes)
+                except OSError as ex:
+                    print(
+                        f"Failed to cache {folder_name}, linking Versions/ directly: {ex}"
+                    )
+                    continue
+
+                index[folder_name]["complete"] = True
+                if self.settings["compare"] == "hash":
+                    index[folder_name]["hashes"] = hashes
+                prepared[folder_name] = self.path(folder_name)
+                if result["copied"]:
+                    print(
+                        f"Cached {folder_name}: {result['copied']} files, "
+                        f"{result['copied_bytes'] / 1024 / 1024:.1f} MB in {result['elapsed']:.2f}s"
+                    )
+
+            self._save_index(index)
+        return prepared
+
+    # -- Eviction --
+
+    def _active(self) -> set[str]:
+        return {folder for folder in self.manager.current_links().values() if folder}
+
+    def _evict(self, index: dict[str, CacheEntry], keep: set[str]) -> list[str]:
+        """
+        Removes least recently used copies until the budget holds. Active
+        versions and those in keep (being linked right now) are never evicted.
+        """
+        budget = self.settings["budget_bytes"]
+        total = sum(entry["bytes"] for entry in index.values())
+        if total <= budget:
+            return []
+
+        protected = self._active() | keep
+        candidates = sorted(
+            (name for name in index if name not in protected),
+            key=lambda name: index[name]["last_used"],
+        )
+
+        evicted = []
+        for folder_name in candidates:
+            if total <= budget:
+                break
+            shutil.rmtree(self.path(folder_name), ignore_errors=True)
+            total -= index.pop(folder_name)["bytes"]
+            evicted.append(folder_name)
+        return evicted
+
+    def evict(self) -> list[str]:
+        """Enforces the budget now. Returns the evicted folder names."""
+        with self._lock:
+            index = self._load_index()
+            evicted = self._evict(index, keep=set())
+            self._save_index(index)
+        return evicted
@@ -0,0 +1,814 @@
+import argparse
+import atexit
+import json
+import multiprocessing
+import sys
+
+from manager import VersionManager
+
+# Daemon methods that change Persists/
+WRITE_METHODS = {"link"}
+
+
+def _attach_listeners(manager: VersionManager) -> None:
+    """
+    Attaches the listeners that follow link changes. Called only right
+    before a write: LinkHistory.attach() alone reads every Persists/ entry.
+    """
+    from clone import VersionCloner
+    from history import LinkHistory
+    from prewarm import Prewarmer
+    from shims import BinIndex
+    from usage import UsageTracker
+
+    BinIndex(manager).attach()
+    VersionCloner(manager).attach()
+    UsageTracker(manager).attach()
+    LinkHistory(manager).attach()
+    prewarmer = Prewarmer(manager)
+    prewarmer.attach()
+    # The worker is a daemon thread; finish warming before the process exits
+    atexit.register(prewarmer.drain)
+
+
+def cmd_doctor(manager: VersionManager, args: argparse.Namespace) -> int:
+    from doctor import Doctor
+
+    doctor = Doctor(manager, max_workers=args.workers)
+    report = doctor.scan()
+
+    print(f"Checked {len(report.entries)} entries in {report.elapsed * 1000:.0f} ms")
+    for issue in report.issues:
+        fix = f" [fix: {issue['fix']}]" if issue["fix"] else ""
+        print(f"  {issue['kind']:<15} {issue['link_name']:<30} {issue['detail']}{fix}")
+
+    if args.fix:
+        to_fix = [i for i in report.issues if i["kind"] in args.fix and i["fix"]]
+        _attach_listeners(manager)
+        success_count, fail_count = doctor.repair(to_fix)
+        print(f"Repaired {success_count}. Failed: {fail_count}")
+        return 1 if fail_count else 0
+
+    return 0 if report.healthy else 1
+
+
+def cmd_daemon(manager: VersionManager, args: argparse.Namespace) -> int:
+    from daemon import PivotDaemon
+
+    _attach_listeners(manager)
+    daemon = PivotDaemon(manager, address=args.address)
+    print(f"Pivot daemon listening on {daemon.address}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+    return 0
+
+
+def _call(manager: VersionManager, method: str, **params):
+    """Routes a request through the daemon if one is running, else runs it inline."""
+    from daemon import DaemonClient, PivotDaemon
+
+    try:
+        client = DaemonClient()
+    except OSError:
+        # No daemon: answer from a one-off scan
+        client = None
+
+    if client is not None:
+        with client:
+            return client.call(method, **params)
+
+    if method in WRITE_METHODS:
+        _attach_listeners(manager)
+    response = PivotDaemon(manager).handle_request(
+        json.dumps({"jsonrpc": "2.0", "id": 0, "method": method, "params": params})
+    )
+    assert response is not None
+    if "error" in response:
+        raise RuntimeError(response["error"]["message"])
+    return response["result"]
+
+
+def cmd_status(manager: VersionManager, args: argparse.Namespace) -> int:
+    try:
+        result = _call(manager, "status", app=args.app)
+    except RuntimeError as ex:
+        print(ex, file=sys.stderr)
+        return 1
+    print(result["active_version"] or "")
+    return 0 if result["active_version"] else 1
+
+
+def cmd_list(manager: VersionManager, args: argparse.Namespace) -> int:
+    params = {"order_by": args.sort}
+    if args.match:
+        params["match"] = args.match
+    if args.limit is not None:
+        params["limit"] = args.limit
+    if args.unlinked:
+        params["linked"] = False
+    try:
+        result = _call(manager, "list", **params)
+    except RuntimeError as ex:
+        print(ex, file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+def cmd_link(manager: VersionManager, args: argparse.Namespace) -> int:
+    try:
+        result = _call(manager, "link", app=args.app, version=args.version)
+    except RuntimeError as ex:
+        print(ex, file=sys.stderr)
+        return 1
+    print(f"Linked {result['link_name']} -> {result['active_version']}")
+    return 0
+
+
+def cmd_profile(manager: VersionManager, args: argparse.Namespace) -> int:
+    from planner import LinkPlan
+    from profiles import ProfileStore
+
+    store = ProfileStore(manager)
+
+    if args.action == "list":
+        for name in store.names():
+            print(name)
+        return 0
+
+    if not args.name:
+        print("A profile name is required.", file=sys.stderr)
+        return 2
+
+    try:
+        if args.action == "save":
+            mapping = store.snapshot(args.name)
+            print(f"Saved {len(mapping)} links as '{args.name}'")
+        elif args.action == "delete":
+            store.delete(args.name)
+        elif args.action == "diff":
+            plan = store.plan(args.name)
+            for line in LinkPlan(plan.changes).describe():
+                print(f"  {line}")
+            print(plan.summary())
+        elif args.action == "apply":
+            _attach_listeners(manager)
+            plan, success_count, fail_count = store.apply(args.name)
+            print(
+                f"{plan.summary()}. Changed {success_count} links. Failed: {fail_count}"
+            )
+            return 1 if fail_count else 0
+    except (KeyError, ValueError) as ex:
+        # KeyError's str() would quote the message
+        print(ex.args[0], file=sys.stderr)
+        return 1
+    return 0
+
+
+def _parse_requests(pairs: list[str]) -> dict[str, str]:
+    requests = {}
+    for pair in pairs:
+        link_name, sep, folder_name = pair.partition("=")
+        if not sep or not link_name or not folder_name:
+            raise SystemExit(f"Expected APP=VERSION, got '{pair}'")
+        requests[link_name] = folder_name
+    return requests
+
+
+def cmd_plan(manager: VersionManager, args: argparse.Namespace) -> int:
+    from planner import execute_plan, plan_links
+
+    plan = plan_links(manager, _parse_requests(args.links))
+    for line in plan.describe():
+        print(f"  {line}")
+    print(f"Plan: {plan.summary()} (estimated cost {plan.total_cost})")
+
+    if not args.apply:
+        return 0
+
+    _attach_listeners(manager)
+    results = execute_plan(manager, plan)
+    for result in results:
+        status = "ok" if result["ok"] else f"FAILED: {result['error']}"
+        print(
+            f"  {result['link_name']:<30} {result['seconds'] * 1000:7.1f} ms  {status}"
+        )
+    fail_count = sum(1 for r in results if not r["ok"])
+    print(
+        f"Changed {len(results) - fail_count} links via {manager.backend.name}. "
+        f"Failed: {fail_count}"
+    )
+    return 1 if fail_count else 0
+
+
+def cmd_bin(manager: VersionManager, args: argparse.Namespace) -> int:
+    from shims import BinIndex
+
+    bin_index = BinIndex(manager)
+    shim_count, conflicts = bin_index.rebuild()
+    print(f"{shim_count} shims in {bin_index.bin_dir}")
+    for shim_name in conflicts:
+        print(f"  conflict: {shim_name} is provided by more than one app")
+    return 0
+
+
+def cmd_verify(manager: VersionManager, args: argparse.Namespace) -> int:
+    from fingerprint import FingerprintStore
+
+    store = FingerprintStore(manager)
+    links = manager.current_links()
+    apps = args.apps or sorted(name for name, folder in links.items() if folder)
+
+    status = 0
+    for app_name in apps:
+        folder_name = links.get(app_name)
+        if not folder_name:
+            print(f"  {app_name:<30} not linked to a version")
+            status = 1
+            continue
+
+        try:
+            if args.record or not store.has_baseline(folder_name):
+                root = store.record(folder_name)
+                print(f"  {app_name:<30} recorded {folder_name} ({root[:12]})")
+                continue
+            result = store.verify(folder_name, full=args.full)
+        except FileNotFoundError:
+            status = 1
+            print(f"  {app_name:<30} MISSING {folder_name}")
+            continue
+        except OSError as ex:
+            status = 1
+            print(f"  {app_name:<30} CHANGED {folder_name} (unreadable: {ex})")
+            continue
+
+        if result["ok"]:
+            print(
+                f"  {app_name:<30} OK {folder_name} "
+                f"({result['rehashed']} rehashed, {result['elapsed']:.2f}s)"
+            )
+        else:
+            status = 1
+            print(f"  {app_name:<30} CHANGED {folder_name}")
+            changes = (
+                ("modified", result["modified"]),
+                ("removed", result["removed"]),
+                ("added", result["added"]),
+            )
+            for kind, relpaths in changes:
+                for relpath in relpaths:
+                    print(f"      {kind:<9} {relpath}")
+    return status
+
+
+def cmd_prewarm(manager: VersionManager, args: argparse.Namespace) -> int:
+    from prewarm import PREWARM_FILE, Prewarmer, load_settings, save_settings
+
+    settings_path = manager.data_dir / PREWARM_FILE
+    settings = load_settings(settings_path)
+    changed = False
+    if args.enable or args.disable:
+        settings["enabled"] = bool(args.enable)
+        changed = True
+    if args.budget is not None:
+        settings["budget_bytes"] = args.budget * 1024 * 1024
+        changed = True
+    for pair in args.pattern or []:
+        app_name, _, pattern = pair.partition("=")
+        settings["patterns"].setdefault(app_name, []).append(pattern)
+        changed = True
+    if changed:
+        save_settings(settings, settings_path)
+
+    print(
+        f"Prewarm {'enabled' if settings['enabled'] else 'disabled'}, "
+        f"budget {settings['budget_bytes'] // 1024 // 1024} MB"
+    )
+
+    prewarmer = Prewarmer(manager)
+    links = manager.current_links()
+    for app_name in args.apps:
+        folder_name = links.get(app_name)
+        if not folder_name:
+            print(f"  {app_name:<30} not linked to a version")
+            continue
+        result = prewarmer.prewarm(app_name, folder_name)
+        print(
+            f"  {app_name:<30} {result['files']} files, "
+            f"{result['bytes'] / 1024 / 1024:.1f} MB via {result['method']} "
+            f"({result['skipped']} over budget, {result['elapsed']:.2f}s)"
+        )
+    return 0
+
+
+def cmd_shard(manager: VersionManager, args: argparse.Namespace) -> int:
+    from layout import ShardMigration
+
+    def on_progress(done: int, total: int, folder_name: str) -> None:
+        print(f"  [{done}/{total}] {folder_name}")
+
+    if not args.dry_run:
+        # Moving a linked version relinks it
+        _attach_listeners(manager)
+    report = ShardMigration(manager).run(dry_run=args.dry_run, on_progress=on_progress)
+    if report["resumed"]:
+        print("Finished an interrupted move first.")
+    for folder_name in report["skipped"]:
+        print(f"  skipped {folder_name}: no usable app name")
+    for folder_name, error in report["failed"]:
+        print(f"  FAILED {folder_name}: {error}")
+
+    if args.dry_run:
+        print(f"Would move {report['moved']} versions into Versions/<App>/ shards")
+        return 0
+    print(
+        f"Moved {report['moved']} versions, relinked {report['relinked']} links. "
+        f"Failed: {len(report['failed'])}"
+    )
+    return 1 if report["failed"] else 0
+
+
+def cmd_bench(manager: VersionManager, args: argparse.Namespace) -> int:
+    from pathlib import Path
+
+    from stress import LinkSwitchStress
+
+    stress = LinkSwitchStress(
+        root=Path(args.root) if args.root else None,
+        files=args.files,
+        file_size=args.size * 1024,
+    )
+    try:
+        for mode in args.mode:
+            report = stress.run(
+                switches=args.switches,
+                readers=args.readers,
+                processes=args.processes,
+                mode=mode,
+                interval=args.interval / 1000,
+            )
+            latency = report["latency"]
+            print(
+                f"{mode} switches via {report['backend']}: {report['switches']} switches, "
+                f"{report['readers']} {'processes' if args.processes else 'threads'}"
+            )
+            print(
+                "  latency ms  "
+                + "  ".join(f"{k} {v * 1000:.2f}" for k, v in latency.items())
+            )
+            print(
+                f"  reads {report['reads']}, failed {report['failed_reads']}, "
+                f"longest unavailable {report['longest_unavailable'] * 1000:.2f} ms"
+            )
+            for name, count in sorted(report["errors"].items()):
+                print(f"    {name}: {count}")
+    finally:
+        stress.cleanup()
+    return 0
+
+
+def cmd_cache(manager: VersionManager, args: argparse.Namespace) -> int:
+    from cache import CACHE_FILE, LocalCache, load_settings, save_settings
+
+    settings_path = manager.data_dir / CACHE_FILE
+    settings = load_settings(settings_path)
+    changed = False
+    if args.enable or args.disable:
+        settings["enabled"] = bool(args.enable)
+        changed = True
+    if args.root:
+        settings["root"] = args.root
+        changed = True
+    if args.budget is not None:
+        settings["budget_bytes"] = args.budget * 1024 * 1024 * 1024
+        changed = True
+    if args.compare:
+        settings["compare"] = args.compare
+        changed = True
+    if changed:
+        save_settings(settings, settings_path)
+
+    cache = LocalCache(manager, settings_path)
+    if args.evict:
+        for folder_name in cache.evict():
+            print(f"  evicted {folder_name}")
+
+    entries = cache.entries()
+    used = sum(entry["bytes"] for entry in entries.values())
+    print(
+        f"Cache {'enabled' if settings['enabled'] else 'disabled'} at {settings['root']}, "
+        f"{used / 1024**3:.2f} of {settings['budget_bytes'] / 1024**3:.0f} GB, "
+        f"compare by {settings['compare']}"
+    )
+    for folder_name, entry in sorted(
+        entries.items(), key=lambda item: item[1]["last_used"], reverse=True
+    ):
+        state = "" if entry["complete"] else "  (incomplete)"
+        print(f"  {folder_name:<40} {entry['bytes'] / 1024**2:9.1f} MB{state}")
+    if changed and settings["enabled"]:
+        print("Relink apps (e.g. re-apply a profile) to move them into the cache.")
+    return 0
+
+
+def cmd_clone(manager: VersionManager, args: argparse.Namespace) -> int:
+    from pathlib import Path
+
+    from clone import VersionCloner
+
+    cloner = VersionCloner(manager)
+    try:
+        result = cloner.clone(args.source, args.folder_name, method=args.method)
+    except ValueError as ex:
+        print(ex, file=sys.stderr)
+        return 1
+    print(
+        f"Cloned {result['source']} -> {result['folder_name']} in "
+        f"{result['elapsed'] * 1000:.0f} ms: {result['reflinked']} reflinked, "
+        f"{result['hardlinked']} hardlinked, {result['copied']} copied"
+    )
+    if args.patch:
+        written = cloner.apply_patch(args.folder_name, Path(args.patch))
+        print(f"Applied {written} patched files")
+    return 0
+
+
+def cmd_unshare(manager: VersionManager, args: argparse.Namespace) -> int:
+    from clone import VersionCloner
+
+    copied = VersionCloner(manager).unshare(args.folder_name, args.paths or None)
+    print(f"Gave {copied} shared files their own copy")
+    return 0
+
+
+def cmd_metadata(manager: VersionManager, args: argparse.Namespace) -> int:
+    from metadata import MetadataStore, describe, order_versions
+
+    groups = manager.get_grouped_versions()
+    apps = args.apps or list(groups)
+    folders = [v for app in apps if app in groups for v in groups[app].versions]
+    metadata = MetadataStore(manager).refresh(folders, prune=not args.apps)
+
+    for app_name in apps:
+        if app_name not in groups:
+            print(f"{app_name}: unknown app")
+            continue
+        print(app_name)
+        for folder_name in reversed(
+            order_versions(groups[app_name].versions, metadata)
+        ):
+            print(f"  {folder_name:<40} {describe(metadata.get(folder_name))}")
+    return 0
+
+
+def cmd_usage(manager: VersionManager, args: argparse.Namespace) -> int:
+    from usage import UsageTracker, format_age
+
+    tracker = UsageTracker(manager)
+    if args.sample:
+        print(f"Sampled: {tracker.sample()} versions with newer access times")
+
+    if args.unused is not None:
+        last_used = tracker.last_used()
+        for folder_name in tracker.unused(args.unused):
+            print(f"{folder_name:<40} {format_age(last_used.get(folder_name, 0.0))}")
+        return 0
+
+    for app_name, app in sorted(tracker.rollups().items()):
+        print(
+            f"{app_name:<30} {format_age(app['last_used']):<16} "
+            f"{app['switches']:>4} switches  most linked: {app['most_linked']}"
+        )
+    return 0
+
+
+def cmd_tier(manager: VersionManager, args: argparse.Namespace) -> int:
+    from tiering import TIERS_FILE, TierManager, load_settings, save_settings
+    from usage import UsageTracker
+
+    settings_path = manager.data_dir / TIERS_FILE
+    settings = load_settings(settings_path)
+    changed = False
+    if args.enable or args.disable:
+        settings["enabled"] = bool(args.enable)
+        changed = True
+    if args.slow_root:
+        settings["slow_root"] = args.slow_root
+        changed = True
+    if args.hot_days is not None:
+        settings["hot_days"] = args.hot_days
+        changed = True
+    if args.rate is not None:
+        settings["rate_mb"] = args.rate
+        changed = True
+    if changed:
+        save_settings(settings, settings_path)
+
+    tiers = TierManager(manager, UsageTracker(manager), settings_path)
+    if not tiers.enabled:
+        print("Tiering is disabled. Enable it with --enable --slow-root PATH.")
+        return 0
+    # main() attached a TierManager already; only the roots may have just
+    # changed. Its listener only wakes a background worker, which the CLI
+    # does not run.
+    manager.tier_roots = (tiers.slow_root,)
+
+    if not (args.run or args.dry_run):
+        print(
+            f"Slow root {settings['slow_root']}, hot for {settings['hot_days']:g} days, "
+            f"copies at {settings['rate_mb']:g} MB/s"
+        )
+        return 0
+
+    def on_progress(done: int, total: int, folder_name: str) -> None:
+        print(f"  [{done}/{total}] {folder_name}")
+
+    if not args.dry_run:
+        # Moving a linked version relinks it
+        _attach_listeners(manager)
+    results = tiers.run(dry_run=args.dry_run, on_progress=on_progress)
+    for result in results:
+        size = result["bytes"] / 1024**2
+        print(f"  {result['folder_name']:<40} -> {result['to']:<4} {size:9.1f} MB")
+    print(f"{'Would move' if args.dry_run else 'Moved'} {len(results)} versions")
+    return 0
+
+
+def cmd_history(manager: VersionManager, args: argparse.Namespace) -> int:
+    from history import LinkHistory, format_time, parse_when
+
+    history = LinkHistory(manager)
+    try:
+        if args.compact:
+            before, after = history.compact(args.keep_days)
+            print(
+                f"Compacted history from {before / 1024:.0f} KB to {after / 1024:.0f} KB"
+            )
+            return 0
+
+        if args.restore:
+            when = parse_when(args.restore)
+            if not args.apply:
+                plan, added = history.restore_plan(when)
+                for line in plan.describe():
+                    print(f"  {line}")
+                for link_name in added:
+                    print(f"  {'remove':<18} {link_name}")
+                print(
+                    f"Restore to {format_time(when)}: {plan.summary()}, "
+                    f"{len(added)} remove"
+                )
+                return 0
+            _attach_listeners(manager)
+            _, _, success_count, fail_count = history.restore(when)
+            print(
+                f"Restored links to {format_time(when)}. "
+                f"Changed {success_count} links. Failed: {fail_count}"
+            )
+            return 1 if fail_count else 0
+
+        if args.at:
+            when = parse_when(args.at)
+            for link_name, folder_name in sorted(history.state_at(when).items()):
+                print(f"{link_name:<30} {folder_name or '(not a version link)'}")
+            return 0
+
+        since = parse_when(args.since) if args.since else None
+    except ValueError as ex:
+        print(ex, file=sys.stderr)
+        return 2
+
+    for entry in history.entries(since=since, link_name=args.app, limit=args.limit):
+        print(
+            f"{format_time(entry['time'])}  {entry['link_name']:<30} "
+            f"{entry['folder_name'] or '(removed)'}"
+        )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pivot")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_doctor = sub.add_parser("doctor", help="Check Persists/ links for problems")
+    p_doctor.add_argument(
+        "--workers", type=int, default=16, help="Parallel resolves (default: 16)"
+    )
+    p_doctor.add_argument(
+        "--fix",
+        nargs="*",
+        choices=["dangling", "outdated"],
+        help="Apply suggested repairs for these issue kinds (default: dangling)",
+    )
+    p_doctor.set_defaults(func=cmd_doctor)
+
+    p_daemon = sub.add_parser("daemon", help="Serve JSON-RPC on a local socket")
+    p_daemon.add_argument("--address", help="Socket path or pipe name")
+    p_daemon.set_defaults(func=cmd_daemon)
+
+    p_status = sub.add_parser("status", help="Print the active version of an app")
+    p_status.add_argument("app")
+    p_status.set_defaults(func=cmd_status)
+
+    p_list = sub.add_parser("list", help="Print the grouped view as JSON")
+    p_list.add_argument("--match", metavar="GLOB", help="Only apps matching GLOB")
+    p_list.add_argument(
+        "--unlinked", action="store_true", help="Only apps without a link"
+    )
+    p_list.add_argument("--limit", type=int, metavar="N", help="At most N apps")
+    p_list.add_argument("--sort", choices=("name", "versions"), default="name")
+    p_list.set_defaults(func=cmd_list)
+
+    p_link = sub.add_parser("link", help="Link an app to a version")
+    p_link.add_argument("app")
+    p_link.add_argument("version")
+    p_link.set_defaults(func=cmd_link)
+
+    p_plan = sub.add_parser("plan", help="Show (and optionally apply) a link plan")
+    p_plan.add_argument("links", nargs="+", metavar="APP=VERSION")
+    p_plan.add_argument("--apply", action="store_true", help="Execute the plan")
+    p_plan.set_defaults(func=cmd_plan)
+
+    p_bin = sub.add_parser("bin", help="Rebuild the Persists/.bin shim folder")
+    p_bin.set_defaults(func=cmd_bin)
+
+    p_verify = sub.add_parser(
+        "verify", help="Verify active versions against fingerprints"
+    )
+    p_verify.add_argument("apps", nargs="*", help="Link names (default: all)")
+    p_verify.add_argument("--record", action="store_true", help="Record a new baseline")
+    p_verify.add_argument("--full", action="store_true", help="Rehash every file")
+    p_verify.set_defaults(func=cmd_verify)
+
+    p_prewarm = sub.add_parser("prewarm", help="Warm the page cache for linked apps")
+    p_prewarm.add_argument("apps", nargs="*", help="Link names to warm now")
+    toggle = p_prewarm.add_mutually_exclusive_group()
+    toggle.add_argument(
+        "--enable", action="store_true", help="Prewarm after every link"
+    )
+    toggle.add_argument("--disable", action="store_true")
+    p_prewarm.add_argument("--budget", type=int, metavar="MB", help="Byte budget in MB")
+    p_prewarm.add_argument(
+        "--pattern", action="append", metavar="APP=GLOB", help="Add a file pattern"
+    )
+    p_prewarm.set_defaults(func=cmd_prewarm)
+
+    p_shard = sub.add_parser(
+        "shard", help="Move Versions/ into per-app folders (resumable)"
+    )
+    p_shard.add_argument("--dry-run", action="store_true", help="Only count the moves")
+    p_shard.set_defaults(func=cmd_shard)
+
+    p_metadata = sub.add_parser(
+        "metadata", help="Show versions, publishers and build dates from manifests"
+    )
+    p_metadata.add_argument("apps", nargs="*", help="App names (default: all)")
+    p_metadata.set_defaults(func=cmd_metadata)
+
+    p_usage = sub.add_parser("usage", help="Show when apps and versions were last used")
+    p_usage.add_argument(
+        "--unused", type=float, metavar="DAYS", help="List versions unused for DAYS"
+    )
+    p_usage.add_argument(
+        "--sample",
+        action="store_true",
+        help="Sample access times of active versions first",
+    )
+    p_usage.set_defaults(func=cmd_usage)
+
+    p_history = sub.add_parser(
+        "history",
+        help="Show past link changes and restore Persists/ to a point in time",
+    )
+    p_history.add_argument("--app", help="Only changes of this link")
+    p_history.add_argument("--since", metavar="WHEN", help="e.g. 2h, 3d, 2026-01-17")
+    p_history.add_argument("--limit", type=int, default=50)
+    action = p_history.add_mutually_exclusive_group()
+    action.add_argument("--at", metavar="WHEN", help="Show the links at WHEN")
+    action.add_argument(
+        "--restore",
+        metavar="WHEN",
+        help="Show the changes that restore the links at WHEN",
+    )
+    action.add_argument("--compact", action="store_true", help="Shrink old history")
+    p_history.add_argument("--apply", action="store_true", help="Apply --restore")
+    p_history.add_argument(
+        "--keep-days",
+        type=float,
+        default=90,
+        help="--compact keeps every change of the last DAYS (default: 90)",
+    )
+    p_history.set_defaults(func=cmd_history)
+
+    p_tier = sub.add_parser("tier", help="Move cold versions to a slow disk and back")
+    toggle = p_tier.add_mutually_exclusive_group()
+    toggle.add_argument("--enable", action="store_true")
+    toggle.add_argument("--disable", action="store_true")
+    p_tier.add_argument("--slow-root", metavar="PATH", help="Folder for cold versions")
+    p_tier.add_argument(
+        "--hot-days",
+        type=float,
+        metavar="N",
+        help="Keep versions used within N days fast",
+    )
+    p_tier.add_argument(
+        "--rate", type=float, metavar="MB", help="Copy throttle in MB/s"
+    )
+    p_tier.add_argument("--run", action="store_true", help="Move versions now")
+    p_tier.add_argument("--dry-run", action="store_true", help="Show the moves only")
+    p_tier.set_defaults(func=cmd_tier)
+
+    p_cache = sub.add_parser("cache", help="Local read-through cache for Versions/")
+    toggle = p_cache.add_mutually_exclusive_group()
+    toggle.add_argument("--enable", action="store_true", help="Link through the cache")
+    toggle.add_argument("--disable", action="store_true")
+    p_cache.add_argument("--root", help="Cache directory on a local disk")
+    p_cache.add_argument("--budget", type=int, metavar="GB", help="Disk budget in GB")
+    p_cache.add_argument(
+        "--compare", choices=["mtime", "hash"], help="How changed files are detected"
+    )
+    p_cache.add_argument("--evict", action="store_true", help="Enforce the budget now")
+    p_cache.set_defaults(func=cmd_cache)
+
+    p_clone = sub.add_parser(
+        "clone", help="Create a version from another, sharing unchanged files"
+    )
+    p_clone.add_argument("source", help="Existing version folder")
+    p_clone.add_argument("folder_name", help="New version folder")
+    p_clone.add_argument(
+        "--method",
+        choices=["auto", "reflink", "hardlink", "copy"],
+        default="auto",
+        help="auto: reflinks, else hardlinks, else copies",
+    )
+    p_clone.add_argument(
+        "--patch", metavar="DIR", help="Copy these files over the clone"
+    )
+    p_clone.set_defaults(func=cmd_clone)
+
+    p_unshare = sub.add_parser(
+        "unshare", help="Copy hardlinked files of a clone before editing them in place"
+    )
+    p_unshare.add_argument("folder_name")
+    p_unshare.add_argument("paths", nargs="*", help="Relative paths (default: all)")
+    p_unshare.set_defaults(func=cmd_unshare)
+
+    p_bench = sub.add_parser(
+        "bench", help="Stress link switching while readers open files through it"
+    )
+    p_bench.add_argument("--switches", type=int, default=200)
+    p_bench.add_argument("--readers", type=int, default=4)
+    p_bench.add_argument(
+        "--processes", action="store_true", help="Readers are processes, not threads"
+    )
+    p_bench.add_argument(
+        "--mode",
+        nargs="+",
+        choices=["link", "directory"],
+        default=["link", "directory"],
+        help="Replace a link, or a real directory (default: both)",
+    )
+    p_bench.add_argument("--files", type=int, default=20, help="Files per version")
+    p_bench.add_argument("--size", type=int, default=64, metavar="KB", help="File size")
+    p_bench.add_argument(
+        "--interval",
+        type=float,
+        default=0.0,
+        metavar="MS",
+        help="Pause between switches",
+    )
+    p_bench.add_argument("--root", help="Scratch directory (default: a temp dir)")
+    p_bench.set_defaults(func=cmd_bench)
+
+    p_profile = sub.add_parser("profile", help="Save and apply named link sets")
+    p_profile.add_argument(
+        "action", choices=["list", "save", "apply", "diff", "delete"]
+    )
+    p_profile.add_argument("name", nargs="?")
+    p_profile.set_defaults(func=cmd_profile)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    from cache import LocalCache
+    from config import ensure_app_dirs
+    from tiering import TierManager
+
+    args = build_parser().parse_args(argv)
+    if getattr(args, "fix", None) == []:
+        args.fix = ["dangling"]
+
+    ensure_app_dirs()
+    manager = VersionManager()
+    # Both change what reads see (mirror paths, cold versions) and cost one
+    # settings read; the listeners are attached by the commands that write
+    LocalCache(manager).attach()
+    TierManager(manager).attach()
+    return args.func(manager, args)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,307 @@
+import errno
+import json
+import os
+import platform
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TypedDict
+
+from config import STAGING_SUFFIXES
+from manager import VersionManager
+
+# Linux ioctl that shares extents between files (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+# Errors meaning "this filesystem cannot do that", as opposed to a bad file
+UNSUPPORTED = {
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.EPERM,
+}
+CLONES_FILE = "clones.json"
+STAGING_SUFFIX = STAGING_SUFFIXES[0]
+
+METHODS = ("auto", "reflink", "hardlink", "copy")
+
+
+class CloneResult(TypedDict):
+    source: str
+    folder_name: str
+    files: int
+    reflinked: int
+    hardlinked: int  # Shared with the source until broken on write
+    copied: int
+    elapsed: float
+
+
+def reflink_file(src: str, dst: str) -> None:
+    """Copy-on-write clone of one file. Raises OSError where unsupported."""
+    if platform.system() != "Linux":
+        raise OSError(errno.EOPNOTSUPP, "reflinks need Linux FICLONE")
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.unlink(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def clone_tree(
+    src: Path, dst: Path, method: str = "auto", hardlinks: bool = True
+) -> tuple[int, int, int]:
+    """
+    Recreates src at dst sharing file data instead of copying it: reflinks
+    where the filesystem supports them, else hardlinks, else plain copies.
+    Each method is dropped after its first "unsupported" error, so a tree
+    on e.g. NTFS pays for one failed reflink, not one per file.
+    Without hardlinks, "auto" falls back to copies right away.
+    Returns (reflinked, hardlinked, copied).
+    """
+    try_reflink = method in ("auto", "reflink")
+    try_hardlink = hardlinks and method in ("auto", "hardlink")
+    reflinked = hardlinked = copied = 0
+
+    for dirpath, dirnames, filenames in os.walk(src):
+        rel_dir = os.path.relpath(dirpath, src)
+        target_dir = dst / rel_dir if rel_dir != "." else dst
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        for name in dirnames + filenames:
+            source = os.path.join(dirpath, name)
+            target = str(target_dir / name)
+
+            if os.path.islink(source):
+                os.symlink(os.readlink(source), target)
+                if name in dirnames:
+                    # Not descended into by os.walk either
+                    dirnames.remove(name)
+                continue
+            if name in dirnames:
+                continue
+
+            if try_reflink:
+                try:
+                    reflink_file(source, target)
+                    reflinked += 1
+                    continue
+                except OSError as ex:
+                    if ex.errno not in UNSUPPORTED or method == "reflink":
+                        raise
+                    try_reflink = False
+
+            if try_hardlink:
+                try:
+                    os.link(source, target)
+                    hardlinked += 1
+                    continue
+                except OSError as ex:
+                    if ex.errno == errno.EMLINK:
+                        # Too many links to this one file; copy just this one
+                        pass
+                    elif ex.errno not in UNSUPPORTED or method == "hardlink":
+                        raise
+                    else:
+                        try_hardlink = False
+
+            shutil.copy2(source, target)
+            copied += 1
+
+        shutil.copystat(dirpath, target_dir)
+
+    return reflinked, hardlinked, copied
+
+
+def is_shared(path: Path) -> bool:
+    """True if the file is hardlinked to another name (e.g. its source version)."""
+    st = path.lstat()
+    return not path.is_symlink() and st.st_nlink > 1
+
+
+def break_link(path: Path) -> bool:
+    """
+    Break-on-write: gives a hardlinked file its own copy before it is changed,
+    so the other names (the source version) keep the old content.
+    Returns False if the file was not shared.
+    """
+    if not is_shared(path):
+        return False
+    tmp = path.with_name(path.name + STAGING_SUFFIX)
+    shutil.copy2(path, tmp)
+    os.replace(tmp, path)
+    return True
+
+
+@contextmanager
+def open_for_write(path: Path, mode: str = "r+b"):
+    """open() for modifying a file in a cloned version without touching its source."""
+    break_link(path)
+    with open(path, mode) as f:
+        yield f
+
+
+class VersionCloner:
+    """
+    Creates new version folders from existing ones in milliseconds: the clone
+    shares file data with its source. Reflinked files are copied by the
+    filesystem when written; hardlinked ones are shared until unshared.
+    Clones are recorded as {folder_name: source} in data_dir/clones.json.
+
+    Once attached, either side of a clone is unshared when it is linked:
+    apps write to their folder in place, which would change the other side
+    through a hardlink. The copying happens after the link is made, once
+    the write lock is released, and before create_link returns.
+    """
+
+    def __init__(self, manager: VersionManager):
+        self.manager = manager
+        self.path = manager.data_dir / CLONES_FILE
+        self._lock = threading.Lock()
+        # Linked folders waiting to be unshared by the next flush
+        self._pending: set[str] = set()
+
+    def attach(self) -> None:
+        """Unshare clones and their sources as they get linked from Persists/."""
+        self.manager.add_link_listener(self._on_link_changed)
+        self.manager.add_flush_listener(self._unshare_pending)
+
+    def _on_link_changed(self, app_name: str, folder_name: str | None) -> None:
+        # Runs under the write lock: only note the folder
+        if folder_name is not None:
+            with self._lock:
+                self._pending.add(folder_name)
+
+    def _unshare_pending(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        if not pending:
+            return
+        clones = self._load()
+        paired = set(clones) | set(clones.values())
+        for folder_name in sorted(pending & paired):
+            copied = self.unshare(folder_name)
+            if copied:
+                print(f"Unshared {copied} files of {folder_name} from its clones")
+
+    def _is_linked(self, folder_name: str) -> bool:
+        return folder_name in self.manager.current_links().values()
+
+    def _load(self) -> dict[str, str]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save(self, clones: dict[str, str]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(clones, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def source_of(self, folder_name: str) -> str | None:
+        return self._load().get(folder_name)
+
+    def clone(self, source: str, folder_name: str, method: str = "auto") -> CloneResult:
+        """
+        Clones Versions/source as folder_name, into folder_name's shard if
+        there is one. The tree is built under a staging name and renamed
+        into place, so scans never see a half-built version.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown clone method: {method}")
+        src = self.manager.version_path(source)
+        if not src.is_dir():
+            raise FileNotFoundError(f"{src} does not exist.")
+        if self.manager.version_path(folder_name).exists():
+            raise FileExistsError(f"Version {folder_name} already exists.")
+
+        # The app writes to a linked version in place; hardlinks would
+        # carry those writes into the clone
+        linked = self._is_linked(source)
+        if linked and method == "hardlink":
+            raise ValueError(
+                f"{source} is linked; clone it with reflinks or copies instead."
+            )
+
+        started = time.perf_counter()
+        shard = self.manager.shard_name(folder_name)
+        parent = self.manager.versions_dir
+        if self.manager.is_shard(shard):
+            parent = parent / shard
+        dst = parent / folder_name
+        staging = parent / (folder_name + STAGING_SUFFIX)
+        shutil.rmtree(staging, ignore_errors=True)
+
+        try:
+            reflinked, hardlinked, copied = clone_tree(
+                src, staging, method, hardlinks=not linked
+            )
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        # Serializes clones.json. Persists/ is not touched, so the
+        # generation stays; scans notice the new folder by its parent's mtime.
+        with self.manager.write_transaction():
+            os.rename(staging, dst)
+            clones = self._load()
+            clones[folder_name] = source
+            self._save(clones)
+        if hardlinked and self._is_linked(source):
+            # Linked while the clone was being built
+            self.unshare(folder_name)
+
+        return {
+            "source": source,
+            "folder_name": folder_name,
+            "files": reflinked + hardlinked + copied,
+            "reflinked": reflinked,
+            "hardlinked": hardlinked,
+            "copied": copied,
+            "elapsed": time.perf_counter() - started,
+        }
+
+    def unshare(self, folder_name: str, relpaths: list[str] | None = None) -> int:
+        """
+        Breaks hardlinks ahead of in-place writes by other tools (installers,
+        updaters). All shared files by default. Returns the files copied.
+        """
+        root = self.manager.version_path(folder_name)
+        if relpaths:
+            paths = [root / relpath for relpath in relpaths]
+        else:
+            paths = [
+                Path(dirpath) / name
+                for dirpath, _, filenames in os.walk(root)
+                for name in filenames
+            ]
+        return sum(1 for path in paths if break_link(path))
+
+    def apply_patch(self, folder_name: str, patch_dir: Path) -> int:
+        """
+        Copies every file of patch_dir into the version. Files are written to
+        a temp name and renamed over the old ones, which replaces a shared
+        name without writing through it. Returns the files written.
+        """
+        root = self.manager.version_path(folder_name)
+        written = 0
+        for dirpath, _, filenames in os.walk(patch_dir):
+            rel_dir = os.path.relpath(dirpath, patch_dir)
+            target_dir = root / rel_dir if rel_dir != "." else root
+            target_dir.mkdir(parents=True, exist_ok=True)
+            for name in filenames:
+                tmp = target_dir / (name + STAGING_SUFFIX)
+                shutil.copy2(os.path.join(dirpath, name), tmp)
+                os.replace(tmp, target_dir / name)
+                written += 1
+        return written
@@ -16,8 +16,28 @@ else:
 VERSIONS_DIR = APP_ROOT / "Versions"
 PERSISTS_DIR = APP_ROOT / "Persists"
 
-# Ensure directories exist (safe to run in both modes, though in prod user should provide them)
-# We won't force create in prod to respect user intent, but for dev it's needed.
-if not IS_FROZEN:
-    VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
-    PERSISTS_DIR.mkdir(parents=True, exist_ok=True)
+# Aggregated executable shims: put only this folder on PATH
+BIN_DIR = PERSISTS_DIR / ".bin"
+
+# Entries in Persists/ owned by Pivot itself, never treated as app links
+PERSISTS_RESERVED = frozenset({BIN_DIR.name})
+
+# Marks Versions/<App>/ as a shard holding that app's version folders
+SHARD_MARKER = ".pivot-shard"
+
+# Versions/ entries being built or moved by Pivot; never listed as versions
+STAGING_SUFFIXES = (".pivot-staging", ".pivot-migrating")
+
+# Pivot's own state (daemon socket, caches, ...). Created lazily by its users.
+DATA_DIR = APP_ROOT / ".pivot"
+
+
+def ensure_app_dirs() -> None:
+    """
+    Creates the dev tree under dummy/. Called by the entry points rather than
+    at import, so importing Pivot (e.g. from tests) never touches the disk.
+    We won't force create in prod to respect user intent.
+    """
+    if not IS_FROZEN:
+        VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
+        PERSISTS_DIR.mkdir(parents=True, exist_ok=True)
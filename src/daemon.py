@@ -0,0 +1,269 @@
+import hashlib
+import json
+import os
+import platform
+import threading
+from collections.abc import Callable
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any
+
+from config import APP_ROOT, DATA_DIR
+from hub import ScanCache
+from manager import AppGroup, ScanSnapshot, VersionManager
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+def default_address() -> tuple[str, str]:
+    """
+    Returns (address, family) for the daemon endpoint of this APP_ROOT.
+    Windows uses a named pipe, everything else a Unix socket under DATA_DIR.
+    """
+    if platform.system() == "Windows":
+        # One pipe per portable install
+        digest = hashlib.sha1(str(APP_ROOT).lower().encode()).hexdigest()[:12]
+        return rf"\\.\pipe\pivot-{digest}", "AF_PIPE"
+    return str(DATA_DIR / "pivot.sock"), "AF_UNIX"
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class PivotDaemon:
+    """
+    Long-running process that keeps the grouped view in memory and serves
+    status/list/link over JSON-RPC.
+
+    The cache (hub.ScanCache) is validated on every request against the
+    shared write generation and the mtimes of Versions/ and Persists/, so
+    writes from the GUI (or anyone else) are noticed while reads stay warm
+    without rescanning.
+    Writes take the same cross-process lock as the GUI.
+    """
+
+    def __init__(self, manager: VersionManager, address: str | None = None):
+        self.manager = manager
+        if address is None:
+            self.address, self.family = default_address()
+        else:
+            self.address = address
+            self.family = (
+                "AF_PIPE" if address.startswith("\\\\.\\pipe\\") else "AF_UNIX"
+            )
+
+        self.cache = ScanCache(manager)
+        # Serializes writes issued through this daemon
+        self._lock = threading.Lock()
+        self._listener: Listener | None = None
+        self._stopped = threading.Event()
+
+        self._methods: dict[str, Callable[..., Any]] = {
+            "ping": self.rpc_ping,
+            "status": self.rpc_status,
+            "list": self.rpc_list,
+            "link": self.rpc_link,
+            "refresh": self.rpc_refresh,
+        }
+
+    # -- Cache --
+
+    def groups(self) -> ScanSnapshot:
+        """Returns the cached grouped view, rescanning only if the tree changed."""
+        return self.cache.groups()
+
+    # -- RPC Methods --
+
+    def rpc_ping(self) -> str:
+        return "pong"
+
+    def rpc_status(self, app: str) -> dict:
+        groups = self.groups()
+        if app not in groups:
+            raise RpcError(INVALID_PARAMS, f"Unknown app: {app}")
+        data = groups[app]
+        return {
+            "app": app,
+            "active_version": data["active_version"],
+            "link_name": data["link_name"],
+            "versions": list(data.versions),
+        }
+
+    def rpc_list(
+        self,
+        match: str | None = None,
+        linked: bool | None = None,
+        order_by: str = "name",
+        limit: int | None = None,
+    ) -> dict[str, AppGroup]:
+        """The grouped view, optionally filtered; keys keep the requested order."""
+        try:
+            records = self.groups().iter_groups(
+                match=match,
+                linked=linked,
+                order_by=order_by,
+                descending=order_by == "versions",
+                limit=limit,
+            )
+            return {record.name: record.to_dict() for record in records}
+        except ValueError as ex:
+            raise RpcError(INVALID_PARAMS, str(ex)) from None
+
+    def rpc_link(self, app: str, version: str, force: bool = True) -> dict:
+        # Checked before writing, so a bad request leaves Persists/ alone
+        groups = self.groups()
+        if app not in groups:
+            raise RpcError(INVALID_PARAMS, f"Unknown app: {app}")
+        if version not in groups[app].versions:
+            raise RpcError(INVALID_PARAMS, f"Unknown version of {app}: {version}")
+        with self._lock:
+            self.manager.create_link(app, version, force=force)
+            # Invalidate; next read rescans once
+            self.cache.invalidate()
+        return self.rpc_status(app)
+
+    def rpc_refresh(self) -> int:
+        with self._lock:
+            self.cache.invalidate()
+        return len(self.groups())
+
+    # -- Transport --
+
+    def handle_request(self, raw: bytes) -> dict | None:
+        """Dispatches one JSON-RPC request. Returns None for notifications."""
+        try:
+            request = json.loads(raw)
+        except ValueError as ex:
+            return _error(None, PARSE_ERROR, f"Parse error: {ex}")
+
+        if not isinstance(request, dict) or "method" not in request:
+            return _error(None, INVALID_REQUEST, "Invalid request")
+
+        req_id = request.get("id")
+        method = self._methods.get(request["method"])
+        if method is None:
+            return _error(
+                req_id, METHOD_NOT_FOUND, f"Unknown method: {request['method']}"
+            )
+
+        params = request.get("params") or {}
+        try:
+            if isinstance(params, list):
+                result = method(*params)
+            else:
+                result = method(**params)
+        except RpcError as ex:
+            return _error(req_id, ex.code, ex.message)
+        except TypeError as ex:
+            return _error(req_id, INVALID_PARAMS, str(ex))
+        except (OSError, LookupError, ValueError, RuntimeError) as ex:
+            # Failed link or scan (RuntimeError covers StaleStateError)
+            return _error(req_id, SERVER_ERROR, str(ex))
+
+        if "id" not in request:
+            return None
+        return {"jsonrpc": "2.0", "id": req_id, "result": result}
+
+    def _serve_connection(self, conn: Connection) -> None:
+        with conn:
+            while not self._stopped.is_set():
+                try:
+                    raw = conn.recv_bytes()
+                except (EOFError, OSError):
+                    return
+                response = self.handle_request(raw)
+                if response is not None:
+                    conn.send_bytes(json.dumps(response).encode())
+
+    def serve_forever(self) -> None:
+        """Accepts clients until stop() is called. One thread per connection."""
+        if self.family == "AF_UNIX":
+            os.makedirs(os.path.dirname(self.address), exist_ok=True)
+            if os.path.exists(self.address):
+                if _is_alive(self.address, self.family):
+                    raise RuntimeError(
+                        f"Pivot daemon already running at {self.address}"
+                    )
+                # Stale socket from a crashed daemon
+                os.unlink(self.address)
+
+        # Warm the cache before accepting the first client
+        self.groups()
+
+        listener = self._listener = Listener(self.address, family=self.family)
+        try:
+            while not self._stopped.is_set():
+                try:
+                    conn = listener.accept()
+                except OSError:
+                    break
+                if self._stopped.is_set():
+                    # Wake-up connection from stop()
+                    conn.close()
+                    break
+                threading.Thread(
+                    target=self._serve_connection, args=(conn,), daemon=True
+                ).start()
+        finally:
+            self._listener = None
+            listener.close()
+
+    def stop(self) -> None:
+        """Stops serve_forever() from any thread."""
+        self._stopped.set()
+        if self._listener is not None:
+            # accept() does not return on close(), so poke it with a connection
+            _is_alive(self.address, self.family)
+
+
+class DaemonClient:
+    """Keeps one connection open so repeated calls skip the connect cost."""
+
+    def __init__(self, address: str | None = None, family: str | None = None):
+        if address is None:
+            address, family = default_address()
+        self._conn = Client(address, family=family)
+        self._next_id = 0
+
+    def call(self, method: str, **params) -> Any:
+        self._next_id += 1
+        request = {
+            "jsonrpc": "2.0",
+            "id": self._next_id,
+            "method": method,
+            "params": params,
+        }
+        self._conn.send_bytes(json.dumps(request).encode())
+        response = json.loads(self._conn.recv_bytes())
+        if "error" in response:
+            raise RpcError(response["error"]["code"], response["error"]["message"])
+        return response["result"]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _error(req_id, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": req_id, "error": {"code": code, "message": message}}
+
+
+def _is_alive(address: str, family: str) -> bool:
+    try:
+        Client(address, family=family).close()
+        return True
+    except OSError:
+        return False
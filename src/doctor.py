@@ -0,0 +1,276 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TypedDict
+
+from manager import VersionManager
+from metadata import MetadataStore, VersionMetadata, order_versions
+
+# Each Persists entry costs a few stats/readlinks. On a slow share these are
+# dominated by round-trip latency, so we run them in parallel.
+DEFAULT_WORKERS = 16
+# Reported, but a link that is merely not the newest is still healthy
+INFORMATIONAL = {"outdated"}
+
+
+class LinkEntry(TypedDict):
+    link_name: str
+    kind: str  # "symlink" | "junction" | "directory" | "file"
+    target: str | None  # Resolved target path (links only)
+    folder_name: str | None  # Versions/ folder the link points into
+    target_exists: bool
+
+
+class Issue(TypedDict):
+    kind: str  # "dangling" | "external" | "duplicate" | "real_directory" | "outdated"
+    link_name: str
+    folder_name: str | None
+    detail: str
+    fix: str | None  # Suggested repair: "relink_newest" | "remove" | None
+    fix_version: str | None  # Version to relink to when fix == "relink_newest"
+
+
+class LinkIndex:
+    """
+    Two-way index between Persists links and Versions folders.
+    link_to_version: {link_name: folder_name | None}
+    version_to_links: {folder_name: [link_name, ...]}
+    """
+
+    def __init__(self, entries: list[LinkEntry]):
+        self.link_to_version: dict[str, str | None] = {}
+        self.version_to_links: dict[str, list[str]] = {}
+
+        for entry in entries:
+            folder_name = entry["folder_name"]
+            self.link_to_version[entry["link_name"]] = folder_name
+            if folder_name is not None:
+                self.version_to_links.setdefault(folder_name, []).append(
+                    entry["link_name"]
+                )
+
+        for links in self.version_to_links.values():
+            links.sort()
+
+    def links_for(self, folder_name: str) -> list[str]:
+        return self.version_to_links.get(folder_name, [])
+
+    def version_for(self, link_name: str) -> str | None:
+        return self.link_to_version.get(link_name)
+
+
+class DoctorReport:
+    def __init__(
+        self,
+        entries: list[LinkEntry],
+        index: LinkIndex,
+        issues: list[Issue],
+        elapsed: float,
+    ):
+        self.entries = entries
+        self.index = index
+        self.issues = issues
+        self.elapsed = elapsed
+
+    def by_kind(self, kind: str) -> list[Issue]:
+        return [issue for issue in self.issues if issue["kind"] == kind]
+
+    @property
+    def healthy(self) -> bool:
+        return all(issue["kind"] in INFORMATIONAL for issue in self.issues)
+
+
+class Doctor:
+    """
+    Health scan for Persists/. Reports links that get_grouped_versions would
+    silently hide or misgroup, and offers bulk repairs for them.
+    """
+
+    def __init__(
+        self,
+        manager: VersionManager,
+        max_workers: int = DEFAULT_WORKERS,
+        metadata: dict[str, VersionMetadata] | None = None,
+    ):
+        self.manager = manager
+        self.max_workers = max_workers
+        # Orders versions like the UI; the cached manifests by default
+        self.metadata = metadata
+
+    def _inspect(self, link_path: Path) -> LinkEntry:
+        """Classifies a single Persists entry. Runs in a worker thread."""
+        entry: LinkEntry = {
+            "link_name": link_path.name,
+            "kind": "file",
+            "target": None,
+            "folder_name": None,
+            "target_exists": False,
+        }
+
+        fs = self.manager.fs
+        if fs.is_symlink(link_path):
+            entry["kind"] = "symlink"
+        elif fs.is_dir(link_path):
+            # Junctions report is_dir() but readlink() succeeds on them
+            entry["kind"] = "directory"
+            try:
+                fs.readlink(link_path)
+                entry["kind"] = "junction"
+            except (OSError, ValueError):
+                pass
+
+        if entry["kind"] in ("symlink", "junction"):
+            target = self.manager.resolve_link_target(link_path)
+            if target is not None:
+                entry["target"] = str(target)
+                entry["folder_name"] = self.manager.version_folder_of(target)
+                entry["target_exists"] = fs.is_dir(target)
+
+        return entry
+
+    def _list_entries(self) -> list[Path]:
+        return list(self.manager.iter_persists())
+
+    def scan(self) -> DoctorReport:
+        """Inspects every Persists entry concurrently and classifies problems."""
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # Listing Versions/ overlaps with the per-link resolves
+            versions_future = pool.submit(self.manager.scan_versions)
+            entries = list(pool.map(self._inspect, self._list_entries()))
+            versions = versions_future.result()
+
+        entries.sort(key=lambda e: e["link_name"])
+        index = LinkIndex(entries)
+        issues = self._classify(entries, index, versions)
+
+        return DoctorReport(entries, index, issues, time.perf_counter() - started)
+
+    def _newest_by_app(self, versions: list[str]) -> dict[str, str]:
+        """Newest folder per app name, in the same order as 'Select Latest'."""
+        metadata = self.metadata
+        if metadata is None:
+            metadata = MetadataStore(self.manager).cached()
+        by_app: dict[str, list[str]] = {}
+        for folder_name in versions:
+            by_app.setdefault(self.manager.extract_app_name(folder_name), []).append(
+                folder_name
+            )
+        return {
+            app_name: order_versions(folders, metadata)[-1]
+            for app_name, folders in by_app.items()
+        }
+
+    def _classify(
+        self, entries: list[LinkEntry], index: LinkIndex, versions: list[str]
+    ) -> list[Issue]:
+        issues: list[Issue] = []
+        available = set(versions)
+        newest_by_app = self._newest_by_app(versions)
+
+        for entry in entries:
+            link_name = entry["link_name"]
+            folder_name = entry["folder_name"]
+
+            if entry["kind"] == "directory":
+                issues.append(
+                    {
+                        "kind": "real_directory",
+                        "link_name": link_name,
+                        "folder_name": None,
+                        "detail": "Real directory in Persists/, not a link",
+                        "fix": None,
+                        "fix_version": None,
+                    }
+                )
+                continue
+
+            if entry["kind"] == "file":
+                continue
+
+            # Prefer the app name of the version it used to point at
+            app_name = (
+                self.manager.extract_app_name(folder_name) if folder_name else link_name
+            )
+            newest = newest_by_app.get(app_name)
+
+            if not entry["target_exists"] or (
+                folder_name is not None and folder_name not in available
+            ):
+                issues.append(
+                    {
+                        "kind": "dangling",
+                        "link_name": link_name,
+                        "folder_name": folder_name,
+                        "detail": f"Target {entry['target']} does not exist",
+                        "fix": "relink_newest" if newest else "remove",
+                        "fix_version": newest,
+                    }
+                )
+                continue
+
+            if folder_name is None:
+                issues.append(
+                    {
+                        "kind": "external",
+                        "link_name": link_name,
+                        "folder_name": None,
+                        "detail": f"Points outside Versions/: {entry['target']}",
+                        "fix": None,
+                        "fix_version": None,
+                    }
+                )
+                continue
+
+            links = index.links_for(folder_name)
+            if len(links) > 1 and link_name != links[0]:
+                issues.append(
+                    {
+                        "kind": "duplicate",
+                        "link_name": link_name,
+                        "folder_name": folder_name,
+                        "detail": f"{folder_name} is also linked as {links[0]}",
+                        "fix": None,
+                        "fix_version": None,
+                    }
+                )
+
+            if newest and newest != folder_name:
+                issues.append(
+                    {
+                        "kind": "outdated",
+                        "link_name": link_name,
+                        "folder_name": folder_name,
+                        "detail": f"Newer version available: {newest}",
+                        "fix": "relink_newest",
+                        "fix_version": newest,
+                    }
+                )
+
+        return issues
+
+    def repair(self, issues: list[Issue]) -> tuple[int, int]:
+        """
+        Applies the suggested fix of every issue that has one.
+        Returns (success_count, fail_count).
+        """
+        success_count = 0
+        fail_count = 0
+
+        for issue in issues:
+            try:
+                if issue["fix"] == "relink_newest" and issue["fix_version"]:
+                    self.manager.create_link(
+                        issue["link_name"], issue["fix_version"], force=True
+                    )
+                elif issue["fix"] == "remove":
+                    self.manager.remove_link(issue["link_name"])
+                else:
+                    continue
+                success_count += 1
+            except OSError as ex:
+                print(f"Failed to repair {issue['link_name']}: {ex}")
+                fail_count += 1
+
+        return success_count, fail_count
@@ -0,0 +1,481 @@
+import errno
+import itertools
+import os
+import shutil
+import stat
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from pathlib import Path, PurePath
+
+from linkbackend import LinkBackend, default_backend
+from locking import bump_generation, read_generation, write_lock
+
+# Junction targets come back from readlink with the Win32 long path prefix
+LONG_PATH_PREFIX = "\\\\?\\"
+# Links followed while resolving one path before giving up (like the OS)
+MAX_LINK_HOPS = 40
+
+
+class FileSystem:
+    """
+    The filesystem calls VersionManager makes, on the real disk.
+    MemoryFileSystem implements the same methods on an in-memory tree.
+    Paths are Path objects; errors are the OSError subclasses os raises.
+    """
+
+    name = "real"
+
+    # -- Queries (follow links like os.stat) --
+
+    def exists(self, path: Path) -> bool:
+        return path.exists()
+
+    def is_dir(self, path: Path) -> bool:
+        return path.is_dir()
+
+    def is_file(self, path: Path) -> bool:
+        return path.is_file()
+
+    def is_symlink(self, path: Path) -> bool:
+        """False for junctions, as in Path.is_symlink()."""
+        return path.is_symlink()
+
+    def listdir(self, path: Path) -> list[str]:
+        return os.listdir(path)
+
+    def list_dirs(self, path: Path) -> list[str]:
+        """Names of the subdirectories (or links to directories) of path."""
+        with os.scandir(path) as entries:
+            return [e.name for e in entries if e.is_dir()]
+
+    def readlink(self, path: Path) -> str:
+        """Raw link text; raises OSError if path is not a symlink or junction."""
+        return os.readlink(path)
+
+    def resolve(self, path: Path) -> Path:
+        return path.resolve()
+
+    def mtime_ns(self, path: Path) -> int:
+        return path.stat().st_mtime_ns
+
+    def list_files(self, path: Path) -> dict[str, int]:
+        """{name: st_mode} of the files (or links to files) in path."""
+        with os.scandir(path) as entries:
+            return {e.name: e.stat().st_mode for e in entries if e.is_file()}
+
+    def walk(self, path: Path) -> Iterator[tuple[str, list[str], list[str]]]:
+        """Like os.walk: links to directories are listed, not descended into."""
+        return os.walk(path)
+
+    def read_bytes(self, path: Path) -> bytes:
+        return path.read_bytes()
+
+    # -- Changes --
+
+    def mkdir(self, path: Path, parents: bool = False, exist_ok: bool = False) -> None:
+        path.mkdir(parents=parents, exist_ok=exist_ok)
+
+    def write_bytes(self, path: Path, data: bytes) -> None:
+        path.write_bytes(data)
+
+    def chmod(self, path: Path, mode: int) -> None:
+        os.chmod(path, mode)
+
+    def symlink(self, target, path: Path) -> None:
+        """Symlink with the target text as given (links to files, e.g. shims)."""
+        os.symlink(target, path)
+
+    def replace(self, src: Path, dst: Path) -> None:
+        os.replace(src, dst)
+
+    def unlink(self, path: Path) -> None:
+        path.unlink()
+
+    def rmdir(self, path: Path) -> None:
+        """Removes an empty directory or a junction (not its target)."""
+        path.rmdir()
+
+    def rmtree(self, path: Path) -> None:
+        shutil.rmtree(path)
+
+    def link_backend(self) -> LinkBackend:
+        return default_backend()
+
+    # -- Write coordination (see locking.py) --
+
+    def write_lock(self, data_dir: Path):
+        return write_lock(data_dir)
+
+    def read_generation(self, data_dir: Path) -> int:
+        return read_generation(data_dir)
+
+    def bump_generation(self, data_dir: Path) -> int:
+        return bump_generation(data_dir)
+
+
+# -- In-Memory --
+
+DIR, FILE, SYMLINK, JUNCTION = "dir", "file", "symlink", "junction"
+
+
+class _Node:
+    __slots__ = ("children", "data", "kind", "mode", "mtime_ns", "target")
+
+    def __init__(self, kind: str, target: str | None = None, data: bytes = b""):
+        self.kind = kind
+        self.children: dict[str, _Node] | None = {} if kind == DIR else None
+        self.target = target
+        self.data = data
+        self.mode = (stat.S_IFDIR | 0o755) if kind == DIR else (stat.S_IFREG | 0o644)
+        self.mtime_ns = 0
+
+
+def _error(code: int, path) -> OSError:
+    # OSError picks the subclass (FileNotFoundError, ...) from the errno
+    return OSError(code, os.strerror(code), str(path))
+
+
+class MemoryFileSystem(FileSystem):
+    """
+    Deterministic in-memory tree for tests and benchmarks: no disk access,
+    so scenarios with 100k version folders set up and scan in seconds.
+
+    Symlinks store their target text as given. Junctions, like on Windows,
+    store an absolute target, are not reported by is_symlink() and read
+    back with the long path prefix. Both are followed by every query.
+
+    latency is charged per filesystem call to simulate a network share.
+    By default it only advances the virtual clock (elapsed), which keeps
+    runs fast and repeatable; sleep=True makes each call really wait.
+    calls counts the calls by method name. mtimes come from a counter
+    bumped by every change, so they order changes deterministically.
+    """
+
+    name = "memory"
+
+    def __init__(self, latency: float = 0.0, sleep: bool = False):
+        self.latency = latency
+        self.sleep = sleep
+        self.elapsed = 0.0
+        self.calls: Counter[str] = Counter()
+        self._root = _Node(DIR)
+        self._clock = itertools.count(1)
+        self._lock = threading.RLock()
+        self._write_locks: dict[Path, threading.RLock] = {}
+        self._generations: dict[Path, int] = {}
+
+    def _tick(self, method: str) -> None:
+        self.calls[method] += 1
+        if self.latency:
+            self.elapsed += self.latency
+            if self.sleep:
+                time.sleep(self.latency)
+
+    # -- Tree --
+
+    @staticmethod
+    def _parts(path) -> tuple[str, ...]:
+        return PurePath(os.path.abspath(os.fspath(path))).parts
+
+    def _walk(self, path, follow: bool = True) -> tuple[tuple[str, ...], _Node | None]:
+        """
+        Resolves path to (real parts, node). Links in the middle are always
+        followed, the last component only with follow. node is None if the
+        path does not exist; the parts are then resolved as far as possible.
+        """
+        parts = self._parts(path)
+        resolved = [parts[0]]
+        node: _Node | None = self._root
+        hops = 0
+        i = 1
+        while i < len(parts):
+            part = parts[i]
+            i += 1
+            child = (
+                node.children.get(part) if node and node.children is not None else None
+            )
+            if (
+                child is not None
+                and child.target is not None
+                and (i < len(parts) or follow)
+            ):
+                hops += 1
+                if hops > MAX_LINK_HOPS:
+                    raise _error(errno.ELOOP, path)
+                target = os.path.join(os.path.join(*resolved), child.target)
+                parts = self._parts(target) + parts[i:]
+                resolved = [parts[0]]
+                node = self._root
+                i = 1
+                continue
+            resolved.append(part)
+            node = child
+        return tuple(resolved), node
+
+    def _node(self, path, follow: bool = True) -> _Node | None:
+        return self._walk(path, follow)[1]
+
+    def _parent(self, path) -> tuple[_Node, str]:
+        """Existing parent directory of path and the name to use in it."""
+        parent, name = os.path.split(os.path.abspath(os.fspath(path)))
+        node = self._node(parent)
+        if node is None:
+            raise _error(errno.ENOENT, parent)
+        if node.children is None:
+            raise _error(errno.ENOTDIR, parent)
+        return node, name
+
+    def _touch(self, *nodes: _Node) -> None:
+        mtime_ns = next(self._clock)
+        for node in nodes:
+            node.mtime_ns = mtime_ns
+
+    def _add(self, path, node: _Node) -> None:
+        with self._lock:
+            parent, name = self._parent(path)
+            if name in parent.children:
+                raise _error(errno.EEXIST, path)
+            parent.children[name] = node
+            self._touch(parent, node)
+
+    # -- Queries --
+
+    def exists(self, path: Path) -> bool:
+        self._tick("exists")
+        return self._node(path) is not None
+
+    def is_dir(self, path: Path) -> bool:
+        self._tick("is_dir")
+        node = self._node(path)
+        return node is not None and node.kind == DIR
+
+    def is_file(self, path: Path) -> bool:
+        self._tick("is_file")
+        node = self._node(path)
+        return node is not None and node.kind == FILE
+
+    def is_symlink(self, path: Path) -> bool:
+        self._tick("is_symlink")
+        node = self._node(path, follow=False)
+        return node is not None and node.kind == SYMLINK
+
+    def _dir_node(self, path) -> _Node:
+        node = self._node(path)
+        if node is None:
+            raise _error(errno.ENOENT, path)
+        if node.children is None:
+            raise _error(errno.ENOTDIR, path)
+        return node
+
+    def listdir(self, path: Path) -> list[str]:
+        self._tick("listdir")
+        return list(self._dir_node(path).children)
+
+    def list_dirs(self, path: Path) -> list[str]:
+        # One call like os.scandir; d_type answers is_dir for plain entries
+        self._tick("list_dirs")
+        names = []
+        for name, child in list(self._dir_node(path).children.items()):
+            if child.target is not None:
+                child = self._node(Path(path) / name)
+            if child is not None and child.kind == DIR:
+                names.append(name)
+        return names
+
+    def readlink(self, path: Path) -> str:
+        self._tick("readlink")
+        node = self._node(path, follow=False)
+        if node is None:
+            raise _error(errno.ENOENT, path)
+        if node.kind == JUNCTION:
+            return LONG_PATH_PREFIX + node.target
+        if node.kind != SYMLINK:
+            raise _error(errno.EINVAL, path)
+        return node.target
+
+    def resolve(self, path: Path) -> Path:
+        self._tick("resolve")
+        return Path(*self._walk(path)[0])
+
+    def _existing(self, path, follow: bool = True) -> _Node:
+        node = self._node(path, follow)
+        if node is None:
+            raise _error(errno.ENOENT, path)
+        return node
+
+    def mtime_ns(self, path: Path) -> int:
+        self._tick("mtime_ns")
+        return self._existing(path).mtime_ns
+
+    def list_files(self, path: Path) -> dict[str, int]:
+        self._tick("list_files")
+        files = {}
+        for name, child in list(self._dir_node(path).children.items()):
+            if child.target is not None:
+                child = self._node(Path(path) / name)
+            if child is not None and child.kind == FILE:
+                files[name] = child.mode
+        return files
+
+    def walk(self, path: Path) -> Iterator[tuple[str, list[str], list[str]]]:
+        self._tick("walk")
+        stack = [os.fspath(path)]
+        while stack:
+            top = stack.pop()
+            node = self._node(top)
+            if node is None or node.children is None:
+                continue
+            dirs, files = [], []
+            for name, child in list(node.children.items()):
+                if child.target is not None:
+                    child = self._node(Path(top) / name)
+                (dirs if child is not None and child.kind == DIR else files).append(
+                    name
+                )
+            yield top, dirs, files
+            # Like os.walk(followlinks=False): only real directories
+            stack.extend(
+                os.path.join(top, name)
+                for name in reversed(dirs)
+                if node.children[name].kind == DIR
+            )
+
+    def read_bytes(self, path: Path) -> bytes:
+        self._tick("read_bytes")
+        node = self._existing(path)
+        if node.kind != FILE:
+            raise _error(errno.EISDIR, path)
+        return node.data
+
+    # -- Changes --
+
+    def mkdir(self, path: Path, parents: bool = False, exist_ok: bool = False) -> None:
+        self._tick("mkdir")
+        with self._lock:
+            node = self._node(path)
+            if node is not None:
+                if exist_ok and node.kind == DIR:
+                    return
+                raise _error(errno.EEXIST, path)
+            if parents:
+                parent = Path(os.path.abspath(path)).parent
+                if self._node(parent) is None:
+                    self.mkdir(parent, parents=True, exist_ok=True)
+            self._add(path, _Node(DIR))
+
+    def write_bytes(self, path: Path, data: bytes) -> None:
+        self._tick("write_bytes")
+        with self._lock:
+            node = self._node(path)
+            if node is not None and node.kind == FILE:
+                node.data = data
+                self._touch(node)
+            else:
+                self._add(path, _Node(FILE, data=data))
+
+    def chmod(self, path: Path, mode: int) -> None:
+        self._tick("chmod")
+        node = self._existing(path)
+        node.mode = stat.S_IFMT(node.mode) | stat.S_IMODE(mode)
+
+    def replace(self, src: Path, dst: Path) -> None:
+        self._tick("replace")
+        with self._lock:
+            src_parent, src_name = self._parent(src)
+            node = src_parent.children.get(src_name)
+            if node is None:
+                raise _error(errno.ENOENT, src)
+            dst_parent, dst_name = self._parent(dst)
+            existing = dst_parent.children.get(dst_name)
+            if existing is not None and existing.kind == DIR:
+                raise _error(errno.EISDIR, dst)
+            del src_parent.children[src_name]
+            dst_parent.children[dst_name] = node
+            self._touch(src_parent, dst_parent)
+
+    def symlink(self, target, path: Path) -> None:
+        self._tick("symlink")
+        self._add(path, _Node(SYMLINK, target=os.fspath(target)))
+
+    def junction(self, target, path: Path) -> None:
+        """Junctions always hold an absolute path to a directory."""
+        self._tick("junction")
+        with self._lock:
+            if not self.is_dir(Path(target)):
+                raise _error(errno.ENOENT, target)
+            self._add(path, _Node(JUNCTION, target=str(self.resolve(Path(target)))))
+
+    def _remove(self, path, check) -> None:
+        with self._lock:
+            parent, name = self._parent(path)
+            node = parent.children.get(name)
+            if node is None:
+                raise _error(errno.ENOENT, path)
+            check(node)
+            del parent.children[name]
+            self._touch(parent)
+
+    def unlink(self, path: Path) -> None:
+        self._tick("unlink")
+
+        def check(node: _Node) -> None:
+            if node.kind in (DIR, JUNCTION):
+                raise _error(errno.EISDIR, path)
+
+        self._remove(path, check)
+
+    def rmdir(self, path: Path) -> None:
+        self._tick("rmdir")
+
+        def check(node: _Node) -> None:
+            if node.kind == DIR and node.children:
+                raise _error(errno.ENOTEMPTY, path)
+            if node.kind not in (DIR, JUNCTION):
+                raise _error(errno.ENOTDIR, path)
+
+        self._remove(path, check)
+
+    def rmtree(self, path: Path) -> None:
+        self._tick("rmtree")
+
+        def check(node: _Node) -> None:
+            if node.kind != DIR:
+                raise _error(errno.ENOTDIR, path)
+
+        self._remove(path, check)
+
+    def link_backend(self) -> LinkBackend:
+        return MemoryLinkBackend(self)
+
+    # -- Write coordination --
+
+    def write_lock(self, data_dir: Path):
+        with self._lock:
+            return self._write_locks.setdefault(data_dir, threading.RLock())
+
+    def read_generation(self, data_dir: Path) -> int:
+        return self._generations.get(data_dir, 0)
+
+    def bump_generation(self, data_dir: Path) -> int:
+        with self._lock:
+            self._generations[data_dir] = self.read_generation(data_dir) + 1
+            return self._generations[data_dir]
+
+
+class MemoryLinkBackend(LinkBackend):
+    """Creates the links of a MemoryFileSystem, as symlinks or junctions."""
+
+    def __init__(self, fs: MemoryFileSystem, kind: str = SYMLINK):
+        if kind not in (SYMLINK, JUNCTION):
+            raise ValueError(f"Unknown link kind: {kind}")
+        self.fs = fs
+        self.kind = kind
+        self.name = f"memory-{kind}"
+
+    def create(self, src: Path, dst: Path) -> None:
+        if self.kind == JUNCTION:
+            self.fs.junction(src, dst)
+        else:
+            self.fs.symlink(src, dst)
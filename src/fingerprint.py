@@ -0,0 +1,262 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TypedDict
+
+from manager import VersionManager
+
+FINGERPRINTS_DIR = "fingerprints"
+
+CHUNK_SIZE = 1024 * 1024
+# Files at least this big are hashed through mmap instead of read() chunks
+MMAP_THRESHOLD = 8 * 1024 * 1024
+# Files per worker task; keeps IPC overhead low for trees of small files
+TASK_CHUNKSIZE = 64
+
+
+class VerifyResult(TypedDict):
+    folder_name: str
+    ok: bool
+    root: str
+    expected_root: str
+    added: list[str]
+    removed: list[str]
+    modified: list[str]
+    rehashed: int  # Files whose (size, mtime, inode) changed and were read again
+    elapsed: float
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file. Runs in worker processes, so must stay top-level."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                for offset in range(0, size, CHUNK_SIZE):
+                    h.update(m[offset : offset + CHUNK_SIZE])
+        else:
+            while chunk := f.read(CHUNK_SIZE):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def merkle_root(file_hashes: dict[str, str]) -> str:
+    """
+    Hash tree over {relpath: file_hash}. Each directory hashes its sorted
+    children, so the root changes if any file is added, removed or modified.
+    """
+    tree: dict = {}
+    for relpath, file_hash in file_hashes.items():
+        node = tree
+        *dirs, name = relpath.split("/")
+        for d in dirs:
+            node = node.setdefault(d, {})
+        node[name] = file_hash
+
+    def digest(node: dict) -> str:
+        h = hashlib.sha256()
+        for name in sorted(node):
+            child = node[name]
+            if isinstance(child, dict):
+                h.update(b"d" + name.encode() + b"\0" + digest(child).encode())
+            else:
+                h.update(b"f" + name.encode() + b"\0" + child.encode())
+        return h.hexdigest()
+
+    return digest(tree)
+
+
+def walk_tree(root: Path) -> dict[str, tuple[int, int, int, str | None, int]]:
+    """
+    {relpath: (size, mtime_ns, inode, symlink_target, mode)} for every file under root.
+    Symlinks are recorded by their target text and not followed.
+    Inodes come from DirEntry.inode(): DirEntry.stat() reports 0 on Windows,
+    where inode() costs one extra system call per file.
+    """
+    stats: dict[str, tuple[int, int, int, str | None, int]] = {}
+    stack = [("", str(root))]
+    while stack:
+        prefix, folder = stack.pop()
+        with os.scandir(folder) as it:
+            for entry in it:
+                relpath = prefix + entry.name
+                if entry.is_symlink():
+                    st = entry.stat(follow_symlinks=False)
+                    stats[relpath] = (
+                        0,
+                        st.st_mtime_ns,
+                        entry.inode(),
+                        os.readlink(entry.path),
+                        st.st_mode,
+                    )
+                elif entry.is_dir():
+                    stack.append((relpath + "/", entry.path))
+                else:
+                    st = entry.stat()
+                    stats[relpath] = (
+                        st.st_size,
+                        st.st_mtime_ns,
+                        entry.inode(),
+                        None,
+                        st.st_mode,
+                    )
+    return stats
+
+
+class FingerprintStore:
+    """
+    Per-version content fingerprints stored as data_dir/fingerprints/<folder>.json:
+    {
+        "root": merkle root recorded as the baseline,
+        "baseline": {relpath: hash},
+        "cache": {relpath: [size, mtime_ns, inode, hash]}  # last seen state
+    }
+    Verification only rehashes files whose (size, mtime, inode) moved.
+    """
+
+    def __init__(
+        self,
+        manager: VersionManager,
+        path: Path | None = None,
+        max_workers: int | None = None,
+    ):
+        self.manager = manager
+        self.path = path or manager.data_dir / FINGERPRINTS_DIR
+        # 0 hashes in-process (tests, tiny trees); None lets the pool decide
+        self.max_workers = max_workers
+        self._recording: set[str] = set()
+        self._lock = threading.Lock()
+
+    def attach(self) -> None:
+        """Record a baseline in the background the first time a version is linked."""
+        self.manager.add_link_listener(self._on_link_changed)
+
+    def _on_link_changed(self, app_name: str, folder_name: str | None) -> None:
+        if folder_name is None or self.has_baseline(folder_name):
+            return
+        with self._lock:
+            if folder_name in self._recording:
+                return
+            self._recording.add(folder_name)
+
+        def run():
+            try:
+                self.record(folder_name)
+            except OSError as ex:
+                print(f"Failed to fingerprint {folder_name}: {ex}")
+            finally:
+                with self._lock:
+                    self._recording.discard(folder_name)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    # -- Storage --
+
+    def _file(self, folder_name: str) -> Path:
+        return self.path / f"{folder_name}.json"
+
+    def has_baseline(self, folder_name: str) -> bool:
+        return self._file(folder_name).exists()
+
+    def _load(self, folder_name: str) -> dict | None:
+        try:
+            with open(self._file(folder_name), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _save(self, folder_name: str, data: dict) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self._file(folder_name).with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, self._file(folder_name))
+
+    # -- Hashing --
+
+    def _hash_tree(
+        self, folder_name: str, cache: dict[str, list], full: bool
+    ) -> tuple[dict[str, str], dict[str, list], int]:
+        """Returns (file_hashes, new_cache, rehashed_count)."""
+        root = self.manager.version_path(folder_name)
+        stats = walk_tree(root)
+
+        hashes: dict[str, str] = {}
+        new_cache: dict[str, list] = {}
+        to_hash: list[str] = []
+
+        for relpath, (size, mtime_ns, inode, link_target, _) in stats.items():
+            if link_target is not None:
+                hashes[relpath] = "link:" + link_target
+                continue
+            cached = cache.get(relpath)
+            if not full and cached and cached[:3] == [size, mtime_ns, inode]:
+                hashes[relpath] = cached[3]
+                new_cache[relpath] = cached
+            else:
+                to_hash.append(relpath)
+
+        paths = [str(root / relpath) for relpath in to_hash]
+        if self.max_workers == 0 or len(paths) < 2:
+            digests = [hash_file(p) for p in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                digests = list(pool.map(hash_file, paths, chunksize=TASK_CHUNKSIZE))
+
+        for relpath, digest in zip(to_hash, digests):
+            size, mtime_ns, inode = stats[relpath][:3]
+            hashes[relpath] = digest
+            new_cache[relpath] = [size, mtime_ns, inode, digest]
+
+        return hashes, new_cache, len(to_hash)
+
+    def record(self, folder_name: str) -> str:
+        """Hashes a version and stores it as the trusted baseline. Returns the root."""
+        previous = self._load(folder_name) or {}
+        hashes, cache, _ = self._hash_tree(
+            folder_name, previous.get("cache", {}), False
+        )
+        root = merkle_root(hashes)
+        self._save(folder_name, {"root": root, "baseline": hashes, "cache": cache})
+        return root
+
+    def verify(self, folder_name: str, full: bool = False) -> VerifyResult:
+        """
+        Compares a version with its baseline. With full=True every file is
+        re-read, ignoring the stat cache.
+        """
+        started = time.perf_counter()
+        data = self._load(folder_name)
+        if data is None:
+            raise FileNotFoundError(f"No fingerprint recorded for {folder_name}")
+
+        hashes, cache, rehashed = self._hash_tree(folder_name, data["cache"], full)
+        root = merkle_root(hashes)
+
+        baseline: dict[str, str] = data["baseline"]
+        result: VerifyResult = {
+            "folder_name": folder_name,
+            "ok": root == data["root"],
+            "root": root,
+            "expected_root": data["root"],
+            "added": sorted(set(hashes) - set(baseline)),
+            "removed": sorted(set(baseline) - set(hashes)),
+            "modified": sorted(
+                p for p in hashes if p in baseline and hashes[p] != baseline[p]
+            ),
+            "rehashed": rehashed,
+            "elapsed": 0.0,
+        }
+
+        # Keep the stat cache fresh so the next run skips these files
+        data["cache"] = cache
+        self._save(folder_name, data)
+
+        result["elapsed"] = time.perf_counter() - started
+        return result
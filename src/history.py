@@ -0,0 +1,355 @@
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import TypedDict
+
+from manager import VersionManager
+from planner import LinkPlan, PlanStep, apply_plan, plan_links
+
+HISTORY_FILE = "history.jsonl"
+
+# Entries between two checkpoints; a point in time is rebuilt from the
+# checkpoint before it plus at most this many entries
+CHECKPOINT_EVERY = 256
+# compact() keeps every switch of the last KEEP_DAYS days and only the
+# last switch per link and day before that
+KEEP_DAYS = 90
+# attach() compacts once the file grows past this many bytes
+COMPACT_SIZE = 1024 * 1024
+DAY = 86400
+
+_RELATIVE = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": DAY, "w": 7 * DAY}
+
+
+class HistoryEntry(TypedDict):
+    time: float
+    link_name: str
+    folder_name: str | None  # None: the link was removed
+
+
+def parse_when(text: str, now: float | None = None) -> float:
+    """
+    Timestamp from "90m", "2h", "3d", "1w" (ago), an ISO date or datetime
+    in local time, or seconds since the epoch.
+    """
+    text = text.strip()
+    match = _RELATIVE.match(text)
+    if match:
+        return (now or time.time()) - float(match[1]) * _UNITS[match[2]]
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise ValueError(f"Not a time: {text}") from None
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _timestamp(line: bytes) -> float:
+    # Entries are '[<time>,...' and checkpoints '{"t":<time>,...'
+    start = 1 if line[:1] == b"[" else 5
+    return float(line[start : line.index(b",", start)])
+
+
+def _is_checkpoint(line: bytes) -> bool:
+    return line[:1] == b"{"
+
+
+def _encode(record) -> bytes:
+    return json.dumps(record, separators=(",", ":")).encode()
+
+
+def _replay(lines: list[bytes], links: dict[str, str | None]) -> int:
+    """Applies lines to links in place. Returns entries since the last checkpoint."""
+    since = 0
+    for line in lines:
+        record = json.loads(line)
+        if isinstance(record, dict):
+            links.clear()
+            links.update(record["links"])
+            since = 0
+            continue
+        _, link_name, folder_name = record
+        if folder_name is None:
+            links.pop(link_name, None)
+        else:
+            links[link_name] = folder_name
+        since += 1
+    return since
+
+
+class LinkHistory:
+    """
+    Append-only log of every Persists/ link change, one JSON line each:
+
+        [time, link_name, folder_name or null]
+
+    Every CHECKPOINT_EVERY entries (and whenever Persists/ was changed
+    while no Pivot was recording) a checkpoint line holds the complete
+    mapping, {"t": time, "links": {link_name: folder_name}}, with null
+    for entries that are not links into Versions/. The links at any point
+    in time are the checkpoint before it plus the entries in between;
+    timestamps never decrease, so both are found by bisection.
+
+    Several processes may append; each catches up with the others'
+    lines before writing a checkpoint.
+    """
+
+    def __init__(
+        self,
+        manager: VersionManager,
+        path: Path | None = None,
+        checkpoint_every: int = CHECKPOINT_EVERY,
+    ):
+        self.manager = manager
+        self.path = path or manager.data_dir / HISTORY_FILE
+        self.checkpoint_every = checkpoint_every
+        self._lock = threading.Lock()
+        # Mapping after the last line read, and where reading stopped
+        self._links: dict[str, str | None] = {}
+        self._offset = 0
+        self._since = 0
+        self._last_time = 0.0
+        # compact() replaces the file; offsets into the old one are void
+        self._inode: int | None = None
+
+    # -- Log --
+
+    def _read_lines(self) -> list[bytes]:
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        # A line still being appended by another process has no newline yet
+        return data[: data.rfind(b"\n") + 1].splitlines()
+
+    def _sync(self) -> None:
+        """Reads the lines appended since the last call (by anyone)."""
+        try:
+            with open(self.path, "rb") as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self._inode:
+                    self._links, self._offset, self._since = {}, 0, 0
+                    self._inode = inode
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        complete = data[: data.rfind(b"\n") + 1]
+        if not complete:
+            return
+        lines = complete.splitlines()
+        since = _replay(lines, self._links)
+        self._since = since if any(map(_is_checkpoint, lines)) else self._since + since
+        self._last_time = max(self._last_time, _timestamp(lines[-1]))
+        self._offset += len(complete)
+
+    def _append(self, record) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # One write per line; O_APPEND keeps concurrent writers' lines whole
+        with open(self.path, "ab") as f:
+            f.write(_encode(record) + b"\n")
+        self._sync()
+
+    def _now(self, now: float | None) -> float:
+        # Never go back, even if the clock does, so bisection stays valid
+        return round(max(now or time.time(), self._last_time), 3)
+
+    # -- Recording --
+
+    def attach(self) -> None:
+        """
+        Records link changes from now on. Writes a checkpoint first if
+        Persists/ differs from the end of the log (first use, or changes
+        made while no Pivot was recording).
+        """
+        if self.path.exists() and self.path.stat().st_size > COMPACT_SIZE:
+            self.compact()
+        with self._lock:
+            self._sync()
+            current = self.manager.current_links()
+            if current != self._links or not self._offset:
+                self._append({"t": self._now(None), "links": current})
+        self.manager.add_link_listener(self.record)
+
+    def record(
+        self, link_name: str, folder_name: str | None, now: float | None = None
+    ) -> None:
+        with self._lock:
+            self._sync()
+            self._append([self._now(now), link_name, folder_name])
+            if self._since >= self.checkpoint_every:
+                self._append({"t": self._now(now), "links": dict(self._links)})
+
+    # -- Queries --
+
+    def entries(
+        self,
+        since: float | None = None,
+        until: float | None = None,
+        link_name: str | None = None,
+        limit: int | None = None,
+    ) -> list[HistoryEntry]:
+        """Link changes in [since, until], newest first."""
+        lines = self._read_lines()
+        start = 0 if since is None else bisect.bisect_left(lines, since, key=_timestamp)
+        end = (
+            len(lines)
+            if until is None
+            else bisect.bisect_right(lines, until, key=_timestamp)
+        )
+        found: list[HistoryEntry] = []
+        for line in reversed(lines[start:end]):
+            if _is_checkpoint(line):
+                continue
+            when, name, folder_name = json.loads(line)
+            if link_name is not None and name != link_name:
+                continue
+            found.append({"time": when, "link_name": name, "folder_name": folder_name})
+            if limit is not None and len(found) >= limit:
+                break
+        return found
+
+    def state_at(self, when: float) -> dict[str, str | None]:
+        """
+        {link_name: folder_name} as it was at `when`. Raises ValueError if
+        the history starts later.
+        """
+        lines = self._read_lines()
+        end = bisect.bisect_right(lines, when, key=_timestamp)
+        for start in range(end - 1, -1, -1):
+            if _is_checkpoint(lines[start]):
+                links: dict[str, str | None] = {}
+                _replay(lines[start:end], links)
+                return links
+        if lines:
+            raise ValueError(f"History starts at {format_time(_timestamp(lines[0]))}")
+        raise ValueError("No link history recorded yet")
+
+    # -- Restoring --
+
+    def restore_plan(self, when: float) -> tuple[LinkPlan, list[str]]:
+        """
+        Compares the links at `when` with Persists/ now. Returns the plan
+        for the links that point elsewhere (or are missing) and the links
+        that did not exist at `when`. Unchanged links are not touched, and
+        entries that were not links into Versions/ are left alone.
+        """
+        past = self.state_at(when)
+        current = self.manager.current_links()
+        requests = {
+            link_name: folder_name
+            for link_name, folder_name in sorted(past.items())
+            if folder_name is not None and current.get(link_name) != folder_name
+        }
+        added = sorted(
+            link_name
+            for link_name, folder_name in current.items()
+            if link_name not in past and folder_name is not None
+        )
+        return plan_links(self.manager, requests), added
+
+    def restore(
+        self,
+        when: float,
+        on_step: Callable[[PlanStep, str | None], None] | None = None,
+    ) -> tuple[LinkPlan, list[str], int, int]:
+        """
+        Puts Persists/ back to how it was at `when` in one batch under the
+        write lock. Raises StaleStateError if links changed since planning.
+        Returns (plan, removed links, success_count, fail_count); the
+        restore is recorded like any other change, so it can be undone.
+        """
+        plan, added = self.restore_plan(when)
+        with self.manager.write_transaction(plan.generation):
+            success_count, fail_count = apply_plan(self.manager, plan, on_step)
+            for link_name in added:
+                try:
+                    self.manager.remove_link(link_name)
+                    success_count += 1
+                except OSError as ex:
+                    print(f"Failed to remove {link_name}: {ex}")
+                    fail_count += 1
+        return plan, added, success_count, fail_count + plan.count("skip")
+
+    # -- Compaction --
+
+    def compact(
+        self, keep_days: float = KEEP_DAYS, now: float | None = None
+    ) -> tuple[int, int]:
+        """
+        Rewrites the log: before keep_days ago only the last change per
+        link and day is kept, and checkpoints that add nothing to the
+        replayed entries are dropped; newer lines are kept as they are.
+        Every point in time stays restorable, older ones to the day.
+        Returns (bytes before, bytes after).
+        """
+        cutoff = (now or time.time()) - keep_days * DAY
+        # Under the write lock, so Pivot writers cannot append meanwhile
+        with self.manager.write_transaction(), self._lock:
+            lines = self._read_lines()
+            before = sum(len(line) + 1 for line in lines)
+            split = bisect.bisect_left(lines, cutoff, key=_timestamp)
+
+            out: list[bytes] = []
+            links: dict[str, str | None] = {}
+            since = 0
+            day = None
+            pending: dict[str, list] = {}
+
+            def emit(line: bytes) -> None:
+                nonlocal since
+                out.append(line)
+                _replay([line], links)
+                since = 0 if _is_checkpoint(line) else since + 1
+                if since >= self.checkpoint_every:
+                    out.append(_encode({"t": _timestamp(line), "links": dict(links)}))
+                    since = 0
+
+            def flush() -> None:
+                for entry in sorted(pending.values(), key=lambda e: e[0]):
+                    emit(_encode(entry))
+                pending.clear()
+
+            # The mapping the original lines replay to
+            replayed: dict[str, str | None] = {}
+            for line in lines[:split]:
+                record = json.loads(line)
+                if isinstance(record, dict):
+                    # Keep only checkpoints the entries do not explain, and
+                    # always the first: the log must start with a mapping
+                    # (an empty one on a fresh install)
+                    if not out or record["links"] != replayed:
+                        flush()
+                        emit(line)
+                    _replay([line], replayed)
+                    continue
+                _replay([line], replayed)
+                entry_day = int(record[0] // DAY)
+                if entry_day != day:
+                    flush()
+                    day = entry_day
+                pending[record[1]] = record
+            flush()
+            out.extend(lines[split:])
+
+            data = b"".join(line + b"\n" for line in out)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+            self._sync()
+        return before, len(data)
@@ -0,0 +1,212 @@
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from manager import ScanSnapshot, VersionManager
+from snapshot import SnapshotDelta
+
+# Seconds between checks for changes made outside the hub (CLI, daemon)
+POLL_INTERVAL = 2.0
+
+# Called with the new snapshot and what changed since the previous one
+Subscriber = Callable[[ScanSnapshot, SnapshotDelta], None]
+
+
+class ScanCache:
+    """
+    The grouped view, rescanned only when the tree changed.
+
+    Validated against the shared write generation and the mtimes of
+    Versions/ and Persists/, so writes from any Pivot process (or anyone
+    else) are noticed while reads stay warm without rescanning.
+    """
+
+    def __init__(self, manager: VersionManager):
+        self.manager = manager
+        self._groups = ScanSnapshot.empty()
+        self._stamp: tuple[int, ...] | None = None
+        # Concurrent readers share one rescan instead of each starting one
+        self._lock = threading.Lock()
+
+    def stamp(self) -> tuple[int, ...]:
+        def mtime(path) -> int:
+            try:
+                return self.manager.fs.mtime_ns(path)
+            except OSError:
+                return 0
+
+        # Generation catches Pivot writers, mtimes catch everything else.
+        # Versions added inside a shard or tier root only touch its mtime.
+        versions_dir = self.manager.versions_dir
+        return (
+            self.manager.read_generation(),
+            mtime(versions_dir),
+            mtime(self.manager.persists_dir),
+            *(mtime(versions_dir / shard) for shard in self.manager.shards),
+            *(mtime(root) for root in self.manager.tier_roots),
+        )
+
+    def groups(self) -> ScanSnapshot:
+        """Returns the cached grouped view, rescanning only if the tree changed."""
+        stamp = self.stamp()
+        if stamp != self._stamp:
+            with self._lock:
+                # Stamp before scanning so changes during the scan are not lost
+                stamp = self.stamp()
+                if stamp != self._stamp:
+                    self._groups = self.manager.get_grouped_versions()
+                    self._stamp = stamp
+        return self._groups
+
+    def invalidate(self) -> None:
+        """Makes the next read rescan, e.g. after a write within the same mtime tick."""
+        self._stamp = None
+
+
+class SessionHub:
+    """
+    Server mode: one VersionManager, one ScanCache and one writer shared by
+    every connected session (browser tab), so the disk is scanned once per
+    change however many sessions are open.
+
+    Writes from any session run one at a time on the writer thread. After
+    each write, and whenever the poller sees a change from outside, the
+    snapshot is rescanned once and every subscriber gets the delta.
+    Selection state stays per session and never goes through the hub.
+    """
+
+    def __init__(self, manager: VersionManager, poll_interval: float = POLL_INTERVAL):
+        self.manager = manager
+        self.cache = ScanCache(manager)
+        self.poll_interval = poll_interval
+        self._writer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="pivot-writer"
+        )
+        self._readers = ThreadPoolExecutor(thread_name_prefix="pivot-reader")
+        self._subscribers: dict[int, Subscriber] = {}
+        self._next_id = 0
+        # Guards subscribers, the published snapshot and the shared futures
+        self._lock = threading.RLock()
+        self._published: ScanSnapshot | None = None
+        # Sessions get deltas in the order they were computed
+        self._publishing = threading.Lock()
+        self._shared: dict[str, tuple[int, Future]] = {}
+        self._stop = threading.Event()
+        self._poller: threading.Thread | None = None
+
+    @property
+    def sessions(self) -> int:
+        return len(self._subscribers)
+
+    # -- Reads --
+
+    def groups(self) -> ScanSnapshot:
+        """
+        The latest published snapshot; scans only before the first publish.
+        It may trail the disk: writes through submit() are published before
+        their future resolves, changes from other processes only by the
+        next poll. Call publish() first to catch up now.
+        """
+        with self._lock:
+            if self._published is None:
+                self._published = self.cache.groups()
+            return self._published
+
+    def shared(self, key: str, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        Runs fn(*args) on the reader pool once per snapshot generation and
+        hands every caller with the same key the same future, e.g. so only
+        the first session reads the version manifests.
+        """
+        generation = self.groups().generation
+        with self._lock:
+            entry = self._shared.get(key)
+            if entry is None or entry[0] != generation:
+                entry = (generation, self._readers.submit(fn, *args))
+                self._shared[key] = entry
+            return entry[1]
+
+    # -- Sessions --
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """
+        Registers a session. callback runs on a hub thread; UI code should
+        hand it to its own event loop (page.run_task). Returns unsubscribe.
+        """
+        with self._lock:
+            key = self._next_id
+            self._next_id += 1
+            self._subscribers[key] = callback
+
+        def unsubscribe() -> None:
+            with self._lock:
+                self._subscribers.pop(key, None)
+
+        return unsubscribe
+
+    def publish(self) -> SnapshotDelta | None:
+        """
+        Rescans if the tree changed and sends the delta to every session.
+        Returns the delta, or None if nothing changed.
+        """
+        with self._publishing:
+            with self._lock:
+                previous = self._published
+                current = self.cache.groups()
+                self._published = current
+                if previous is None or current is previous:
+                    return None
+                delta = current.diff(previous)
+                if not delta["changed"] and not delta["removed"]:
+                    return None
+                subscribers = list(self._subscribers.values())
+
+            for callback in subscribers:
+                try:
+                    callback(current, delta)
+                except RuntimeError as ex:
+                    # The session's event loop is already closed
+                    print(f"Failed to notify a session: {ex}")
+            return delta
+
+    # -- Writes --
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """
+        Queues a write (e.g. manager.create_link) behind the writes of all
+        other sessions. The future resolves after the change is published.
+        """
+
+        def write() -> Any:
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                # Same-tick writes may not move the mtimes; the generation
+                # usually does, but a failed write must still be picked up
+                self.cache.invalidate()
+                self.publish()
+
+        return self._writer.submit(write)
+
+    # -- Polling --
+
+    def start(self) -> None:
+        """Publishes changes from other processes every poll_interval seconds."""
+        if self._poller is not None:
+            return
+        self._stop.clear()
+        self._poller = threading.Thread(target=self._run, daemon=True)
+        self._poller.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._poller = None
+
+    def _run(self) -> None:
+        # One stamp per interval for all sessions together
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.publish()
+            except OSError as ex:
+                print(f"Failed to check for changes: {ex}")
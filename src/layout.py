@@ -0,0 +1,231 @@
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import TypedDict
+
+from config import SHARD_MARKER, STAGING_SUFFIXES
+from manager import VersionManager
+
+# Records the move in progress so an interrupted migration can finish it
+MIGRATION_FILE = "shard-migration.json"
+
+# Temporary name for a version whose folder name equals its shard name
+STAGING_SUFFIX = STAGING_SUFFIXES[1]
+
+
+class ShardMove(TypedDict):
+    folder_name: str
+    shard: str
+    links: list[str]  # Persists/ entries pointing at the version before the move
+
+
+class MigrationReport(TypedDict):
+    moved: int
+    relinked: int
+    resumed: bool  # An interrupted move was finished first
+    failed: list[tuple[str, str]]  # (folder_name, error)
+    skipped: list[str]  # Folders without a usable shard name
+
+
+def pending_moves(manager: VersionManager) -> tuple[list[tuple[str, str]], list[str]]:
+    """
+    Versions still in the flat layout. Returns ([(folder_name, shard)], skipped),
+    where skipped lists folders whose app name cannot serve as a shard name.
+    """
+    moves: list[tuple[str, str]] = []
+    skipped: list[str] = []
+    if not manager.fs.exists(manager.versions_dir):
+        return moves, skipped
+
+    names = sorted(manager.fs.list_dirs(manager.versions_dir))
+
+    for name in names:
+        folder_name = name.removesuffix(STAGING_SUFFIX)
+        if name == folder_name and manager.is_shard(name):
+            continue
+        shard = manager.shard_name(folder_name)
+        # The scanner only probes bare app names for the shard marker
+        if not shard or manager.extract_app_name(shard) != shard:
+            skipped.append(folder_name)
+            continue
+        moves.append((folder_name, shard))
+    return moves, skipped
+
+
+class ShardMigration:
+    """
+    Moves a flat Versions/ tree into Versions/<App>/<version> shards and
+    relinks the Persists/ entries of every moved version.
+
+    One version at a time, under the write lock: the move and its relinks are
+    journaled to MIGRATION_FILE first. Re-running after an interruption
+    finishes the journaled move, then continues with what is still flat.
+    A link that cannot be relinked stops the run with its move journaled.
+    """
+
+    def __init__(self, manager: VersionManager, journal_path: Path | None = None):
+        self.manager = manager
+        self.journal_path = journal_path or manager.data_dir / MIGRATION_FILE
+
+    # -- Journal --
+
+    def _read_journal(self) -> ShardMove | None:
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_journal(self, move: ShardMove) -> None:
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.journal_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(move, f)
+        os.replace(tmp, self.journal_path)
+
+    def _clear_journal(self) -> None:
+        try:
+            self.journal_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    # -- Migration --
+
+    def _move(self, folder_name: str, shard: str) -> None:
+        """Idempotent: each step checks whether it already happened."""
+        versions_dir = self.manager.versions_dir
+        shard_dir = versions_dir / shard
+        dst = shard_dir / folder_name
+        src = versions_dir / folder_name
+        staging = versions_dir / (folder_name + STAGING_SUFFIX)
+
+        if folder_name == shard and src.is_dir() and not self.manager.is_shard(shard):
+            # Versions/App is a version; it becomes Versions/App/App
+            os.rename(src, staging)
+        if staging.is_dir():
+            src = staging
+
+        shard_dir.mkdir(exist_ok=True)
+        (shard_dir / SHARD_MARKER).touch()
+
+        if dst.is_dir():
+            return
+        if dst.exists():
+            raise FileExistsError(f"{dst} already exists.")
+        os.rename(src, dst)
+
+    def _relink(self, move: ShardMove) -> tuple[int, list[str]]:
+        """
+        Points the journaled links at the new location.
+        Returns (links changed, "link_name: error" for each link that failed).
+        """
+        items = [(link_name, move["folder_name"]) for link_name in move["links"]]
+        relinked = 0
+        errors: list[str] = []
+        for result in self.manager.create_links(items, force=True):
+            if result["ok"]:
+                relinked += 1
+            else:
+                print(f"Failed to relink {result['link_name']}: {result['error']}")
+                errors.append(f"{result['link_name']}: {result['error']}")
+        return relinked, errors
+
+    def _finish(self, move: ShardMove, report: MigrationReport) -> bool:
+        """
+        Moves and relinks one version under the write lock. The journal is
+        cleared only once every link points at the new location; otherwise
+        it stays for the next run and the move is reported as failed.
+        Returns False if the journal was kept.
+        """
+        with self.manager.write_transaction() as changes:
+            self._move(move["folder_name"], move["shard"])
+            changes.append(move["folder_name"])
+            relinked, errors = self._relink(move)
+        report["relinked"] += relinked
+        if errors:
+            report["failed"].append(
+                (move["folder_name"], "Failed to relink " + "; ".join(errors))
+            )
+            return False
+        self._clear_journal()
+        return True
+
+    def _links_by_folder(self) -> dict[str, list[str]]:
+        by_folder: dict[str, list[str]] = {}
+        for link_name, folder_name in self.manager.current_links().items():
+            if folder_name:
+                by_folder.setdefault(folder_name, []).append(link_name)
+        return by_folder
+
+    def run(
+        self,
+        dry_run: bool = False,
+        on_progress: Callable[[int, int, str], None] | None = None,
+    ) -> MigrationReport:
+        """
+        Migrates every flat version. on_progress(done, total, folder_name)
+        is called after each one.
+        """
+        report: MigrationReport = {
+            "moved": 0,
+            "relinked": 0,
+            "resumed": False,
+            "failed": [],
+            "skipped": [],
+        }
+
+        journal = self._read_journal()
+        if journal and not dry_run:
+            try:
+                if not self._finish(journal, report):
+                    # Moving on would overwrite the journal of the failed links
+                    return report
+                report["resumed"] = True
+            except OSError as ex:
+                print(f"Failed to finish moving {journal['folder_name']}: {ex}")
+                report["failed"].append((journal["folder_name"], str(ex)))
+
+        moves, report["skipped"] = pending_moves(self.manager)
+        failed = {folder_name for folder_name, _ in report["failed"]}
+        moves = [m for m in moves if m[0] not in failed]
+        if dry_run:
+            report["moved"] = len(moves)
+            return report
+
+        # Links are read once; rescanned only if another writer got in between
+        links = self._links_by_folder()
+        generation = self.manager.read_generation()
+
+        for done, (folder_name, shard) in enumerate(moves, 1):
+            try:
+                with self.manager.write_transaction():
+                    if self.manager.read_generation() != generation:
+                        links = self._links_by_folder()
+
+                    move: ShardMove = {
+                        "folder_name": folder_name,
+                        "shard": shard,
+                        "links": links.get(folder_name, []),
+                    }
+                    self._write_journal(move)
+                    finished = self._finish(move, report)
+                if not finished:
+                    # The journal holds the failed links; the next run retries
+                    break
+                report["moved"] += 1
+            except OSError as ex:
+                # Usually a file in use on Windows; the next run retries it
+                print(f"Failed to move {folder_name}: {ex}")
+                report["failed"].append((folder_name, str(ex)))
+                if (self.manager.versions_dir / folder_name).is_dir() and not (
+                    self.manager.is_shard(folder_name)
+                ):
+                    # Nothing was moved, nothing to resume
+                    self._clear_journal()
+            generation = self.manager.read_generation()
+
+            if on_progress:
+                on_progress(done, len(moves), folder_name)
+
+        return report
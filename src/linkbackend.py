@@ -0,0 +1,257 @@
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TypedDict
+
+# Windows: "A required privilege is not held by the client"
+ERROR_PRIVILEGE_NOT_HELD = 1314
+
+
+class LinkResult(TypedDict):
+    link_name: str
+    folder_name: str
+    ok: bool
+    error: str | None
+    seconds: float  # Wall time attributed to this link (amortized for batches)
+
+
+class PrivilegeError(OSError):
+    """Raised by a backend that cannot create links without extra privileges."""
+
+
+class LinkBackend(ABC):
+    """
+    Creates directory links. create_many() receives every link of a batch at
+    once so backends with a high fixed cost per call (process spawns) can
+    amortize it. Existing entries have already been removed by the caller.
+    """
+
+    name = "base"
+    # True if each create_many() call has a high fixed cost, so callers
+    # should hand over a whole batch instead of one link at a time
+    batched = False
+
+    @abstractmethod
+    def create(self, src: Path, dst: Path) -> None:
+        """Creates one link dst -> src. Raises PrivilegeError if not allowed."""
+
+    def create_many(
+        self, pairs: list[tuple[Path, Path]]
+    ) -> list[tuple[float, Exception | None]]:
+        """Returns (seconds, error) per pair, in order."""
+        results: list[tuple[float, Exception | None]] = []
+        for src, dst in pairs:
+            started = time.perf_counter()
+            error: Exception | None = None
+            try:
+                self.create(src, dst)
+            except PrivilegeError:
+                raise
+            except OSError as ex:
+                error = ex
+            results.append((time.perf_counter() - started, error))
+        return results
+
+
+class SymlinkBackend(LinkBackend):
+    name = "symlink"
+
+    def create(self, src: Path, dst: Path) -> None:
+        # target_is_directory=True is crucial for Windows
+        try:
+            os.symlink(src, dst, target_is_directory=True)
+        except OSError as e:
+            if getattr(e, "winerror", None) == ERROR_PRIVILEGE_NOT_HELD:
+                raise PrivilegeError(e.errno, str(e)) from e
+            raise
+
+
+def _escape(path: Path) -> str:
+    """Escapes path for a .cmd script line; % is doubled so it stays literal."""
+    return str(path).replace("%", "%%")
+
+
+class JunctionBackend(LinkBackend):
+    """
+    Windows Directory Junctions. Do not require Admin privileges.
+    Uses CreateJunction when the interpreter exposes it (a private CPython
+    API, so any sign of it having changed switches to the script), otherwise
+    writes the whole batch into one script run by a single cmd.exe.
+    """
+
+    name = "junction"
+
+    def __init__(self):
+        try:
+            import _winapi
+
+            self._native = getattr(_winapi, "CreateJunction", None)
+        except ImportError:
+            self._native = None
+
+    @property
+    def batched(self) -> bool:
+        return self._native is None
+
+    def create(self, src: Path, dst: Path) -> None:
+        error = self.create_many([(src, dst)])[0][1]
+        if error:
+            raise error
+
+    def create_many(
+        self, pairs: list[tuple[Path, Path]]
+    ) -> list[tuple[float, Exception | None]]:
+        if not pairs:
+            return []
+        if self._native is not None:
+            return self._create_native(pairs)
+        return self._create_with_script(pairs)
+
+    def _create_native(
+        self, pairs: list[tuple[Path, Path]]
+    ) -> list[tuple[float, Exception | None]]:
+        results: list[tuple[float, Exception | None]] = []
+        for n, (src, dst) in enumerate(pairs):
+            started = time.perf_counter()
+            error: Exception | None = None
+            try:
+                self._native(str(src), str(dst))
+            except OSError as ex:
+                error = ex
+            except (TypeError, AttributeError) as ex:
+                # Signature changed: use the script for this and later links
+                print(f"CreateJunction unusable, falling back to mklink: {ex}")
+                self._native = None
+                return results + self._create_with_script(pairs[n:])
+            results.append((time.perf_counter() - started, error))
+        return results
+
+    def _create_with_script(
+        self, pairs: list[tuple[Path, Path]]
+    ) -> list[tuple[float, Exception | None]]:
+        """One cmd.exe process for the whole batch instead of one per link."""
+        started = time.perf_counter()
+        # UTF-8 code page so non-ASCII folder names survive
+        lines = ["@echo off", "chcp 65001 >nul"]
+        for i, (src, dst) in enumerate(pairs):
+            # Marks where this link's error messages start on stderr
+            lines.append(f">&2 echo PIVOT_LINK {i}")
+            # mklink /J Link Target; % would expand variables even in quotes
+            lines.append(
+                f'mklink /J "{_escape(dst)}" "{_escape(src)}" >nul || echo PIVOT_FAIL {i}'
+            )
+
+        fd, script = tempfile.mkstemp(suffix=".cmd", prefix="pivot-junctions-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write("\r\n".join(lines) + "\r\n")
+            # Failures are reported per link by the script, not the exit code
+            result = subprocess.run(
+                ["cmd", "/c", script], capture_output=True, text=True, check=False
+            )
+        finally:
+            os.unlink(script)
+
+        failed = {
+            int(line.split()[1])
+            for line in result.stdout.splitlines()
+            if line.startswith("PIVOT_FAIL ")
+        }
+        messages: dict[int, list[str]] = {}
+        current: list[str] = []
+        for line in result.stderr.splitlines():
+            if line.startswith("PIVOT_LINK "):
+                current = messages.setdefault(int(line.split()[1]), [])
+            elif line.strip():
+                current.append(line.strip())
+
+        amortized = (time.perf_counter() - started) / len(pairs)
+        return [
+            (
+                amortized,
+                OSError(
+                    "Failed to create junction: "
+                    + (" ".join(messages.get(i, [])) or "mklink failed")
+                )
+                if i in failed
+                else None,
+            )
+            for i in range(len(pairs))
+        ]
+
+
+class FakeBackend(LinkBackend):
+    """
+    Test double. Counts calls, can inject latency and failures, and by default
+    materializes links as real symlinks so the rest of VersionManager works.
+    batch_latency is paid once per create_many() (like a process spawn),
+    link_latency once per link. Batched like the junction script by default.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        batch_latency: float = 0.0,
+        link_latency: float = 0.0,
+        fail: set[str] | None = None,
+        materialize: bool = True,
+        batched: bool = True,
+    ):
+        self.batch_latency = batch_latency
+        self.link_latency = link_latency
+        self.fail = fail or set()
+        self.materialize = materialize
+        self.batched = batched
+        self.batches = 0
+        self.created: list[tuple[Path, Path]] = []
+
+    def create_many(
+        self, pairs: list[tuple[Path, Path]]
+    ) -> list[tuple[float, Exception | None]]:
+        self.batches += 1
+        started = time.perf_counter()
+        if self.batch_latency:
+            time.sleep(self.batch_latency)
+
+        results: list[tuple[float, Exception | None]] = []
+        for src, dst in pairs:
+            link_started = time.perf_counter()
+            if self.link_latency:
+                time.sleep(self.link_latency)
+            if dst.name in self.fail:
+                results.append(
+                    (time.perf_counter() - link_started, OSError("fake failure"))
+                )
+                continue
+            if self.materialize:
+                os.symlink(src, dst, target_is_directory=True)
+            self.created.append((src, dst))
+            results.append((time.perf_counter() - link_started, None))
+
+        # Spread the fixed batch cost over the links, like the junction script
+        overhead = (time.perf_counter() - started - sum(r[0] for r in results)) / max(
+            len(pairs), 1
+        )
+        return [(seconds + overhead, error) for seconds, error in results]
+
+    def create(self, src: Path, dst: Path) -> None:
+        error = self.create_many([(src, dst)])[0][1]
+        if error:
+            raise error
+
+
+def default_backend() -> LinkBackend:
+    """Symlinks everywhere; VersionManager falls back to junctions on privilege errors."""
+    return SymlinkBackend()
+
+
+def fallback_backend() -> LinkBackend | None:
+    """Backend to switch to after a PrivilegeError, if any."""
+    if platform.system() == "Windows":
+        return JunctionBackend()
+    return None
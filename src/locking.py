@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+LOCK_FILE = "persists.lock"
+GENERATION_FILE = "generation"
+
+
+class LockTimeout(TimeoutError):
+    pass
+
+
+class StaleStateError(RuntimeError):
+    """A write was based on data older than the current generation."""
+
+    def __init__(self, expected: int, current: int):
+        super().__init__(
+            f"Persists/ changed since it was read (generation {expected} -> {current}). "
+            "Refresh and try again."
+        )
+        self.expected = expected
+        self.current = current
+
+
+class FileLock:
+    """
+    Advisory, cross-process exclusive lock on a file (flock / msvcrt.locking).
+    Re-entrant within a process, so nested writes (e.g. create_link inside a
+    batch) do not deadlock. Only writers take it; readers never block.
+    """
+
+    def __init__(self, path: Path, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: int | None = None
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if os.name == "nt":
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(self, fd: int) -> None:
+        if os.name == "nt":
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def acquire(self) -> None:
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            raise LockTimeout(f"Timed out waiting for {self.path}")
+        if self._depth:
+            self._depth += 1
+            return
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            deadline = time.monotonic() + self.timeout
+            while not self._try_lock(fd):
+                if time.monotonic() > deadline:
+                    os.close(fd)
+                    raise LockTimeout(f"Another Pivot instance holds {self.path}")
+                time.sleep(0.05)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+        self._fd = fd
+        self._depth = 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fd, self._fd = self._fd, None
+            try:
+                self._unlock(fd)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def read_generation(data_dir: Path) -> int:
+    """Current generation, 0 if nothing was ever written. Lock-free."""
+    try:
+        return int((data_dir / GENERATION_FILE).read_text().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def bump_generation(data_dir: Path) -> int:
+    """Increments the generation. Callers must hold the write lock."""
+    generation = read_generation(data_dir) + 1
+    data_dir.mkdir(parents=True, exist_ok=True)
+    tmp = data_dir / (GENERATION_FILE + ".tmp")
+    tmp.write_text(str(generation))
+    # Atomic, so lock-free readers see either the old or the new value
+    os.replace(tmp, data_dir / GENERATION_FILE)
+    return generation
+
+
+_locks: dict[Path, FileLock] = {}
+_locks_guard = threading.Lock()
+
+
+def write_lock(data_dir: Path) -> FileLock:
+    """Process-wide FileLock for a data dir (shared so re-entrancy works)."""
+    path = data_dir / LOCK_FILE
+    with _locks_guard:
+        if path not in _locks:
+            _locks[path] = FileLock(path)
+        return _locks[path]
@@ -1,12 +1,85 @@
-import asyncio
+import argparse
+import multiprocessing
+import threading
 
 import flet as ft
 
+from cache import LocalCache
+from clone import VersionCloner
+from config import ensure_app_dirs
+from fingerprint import FingerprintStore
+from history import LinkHistory
+from hub import SessionHub
+from locking import StaleStateError
 from manager import VersionManager
+from metadata import MetadataStore
+from planner import apply_plan, plan_links
+from prewarm import PrewarmResult, Prewarmer
+from profiles import ProfileStore
+from shims import BinIndex
 from state import AppState
+from tiering import TierManager
+from ui.plan_dialog import show_plan_dialog
 from ui.toolbar import PivotToolbar
 from ui.version_grid import VersionGrid
-from ui.utils import show_snack
+from ui.utils import release_notifier, show_progress, show_snack
+from usage import UsageTracker, preferred_version
+
+
+class Services:
+    """
+    Everything the sessions of one process share: the manager, its
+    listeners and background workers, and the hub with the one scan
+    snapshot and write queue. Desktop mode has one session, server mode
+    one per browser tab.
+    """
+
+    def __init__(self):
+        ensure_app_dirs()
+        self.manager = VersionManager()
+        LocalCache(self.manager).attach()
+        BinIndex(self.manager).attach()
+        VersionCloner(self.manager).attach()
+        self.fingerprints = FingerprintStore(self.manager)
+        self.fingerprints.attach()
+        self.profiles = ProfileStore(self.manager)
+        self.metadata_store = MetadataStore(self.manager)
+        self.usage = UsageTracker(self.manager)
+        self.usage.attach()
+        self.usage.start()
+        self.tiers = TierManager(self.manager, self.usage)
+        self.tiers.attach()
+        self.tiers.start()
+        Prewarmer(self.manager, on_done=self.on_prewarmed).attach()
+        # Every link change, so a bad batch can be rolled back in one go
+        LinkHistory(self.manager).attach()
+        # Also picks up changes made by other Pivot instances (CLI, daemon)
+        self.hub = SessionHub(self.manager)
+        self.hub.start()
+        # Open sessions, for messages that are not about one of them
+        self.pages: list[ft.Page] = []
+
+    def on_prewarmed(self, result: PrewarmResult):
+        # Called from the prewarm worker thread
+        message = (
+            f"Prewarmed {result['folder_name']}: {result['files']} files, "
+            f"{result['bytes'] / 1024 / 1024:.0f} MB"
+        )
+        for page in list(self.pages):
+            page.run_task(show_snack, page, message, ft.Colors.BLUE_GREY)
+
+
+_services: Services | None = None
+_services_lock = threading.Lock()
+
+
+def shared_services() -> Services:
+    """Built by the first session, reused by every later one."""
+    global _services
+    with _services_lock:
+        if _services is None:
+            _services = Services()
+        return _services
 
 
 async def main(page: ft.Page):
@@ -16,80 +89,197 @@ async def main(page: ft.Page):
     page.window.height = 700
     page.padding = 0
 
-    # Initialize Core Objects
-    manager = VersionManager()
+    # Shared Core Objects
+    services = shared_services()
+    manager = services.manager
+    fingerprints = services.fingerprints
+    profiles = services.profiles
+    usage = services.usage
+    hub = services.hub
+
+    # Per Session State
     app_state = AppState()
+    services.pages.append(page)
 
-    # Center window
-    await page.window.center()
+    if not page.web:
+        # Center window
+        await page.window.center()
 
     # -- Actions --
 
     async def execute_batch_link():
-        """Iterate through selected versions and link them."""
+        """Plan the selected links, show the plan and apply it once confirmed."""
         # Get snapshot of tasks to avoid modification issues during iteration
-        tasks = list(app_state.selected_versions.items())
+        requests = dict(app_state.selected_versions)
 
-        if not tasks:
+        if not requests:
             return
 
-        success_count = 0
-        fail_count = 0
+        plan = plan_links(manager, requests)
+
+        if not plan.changes and not plan.count("skip"):
+            app_state.clear_all()
+            await show_snack(
+                page, "Selected versions are already linked.", ft.Colors.GREEN
+            )
+            return
 
-        await show_snack(page, "Processing batch links...", ft.Colors.BLUE)
+        async def run_plan():
+            total = len(plan.changes)
+            await show_snack(page, f"Linked 0/{total}", ft.Colors.BLUE, key="batch")
+            done = 0
 
-        for app_name, version in tasks:
+            def on_step(step, error):
+                # Worker thread; progress messages coalesce into one snack
+                nonlocal done
+                done += 1
+                page.run_task(show_progress, page, "batch", done, total)
+
+            # Queued behind other sessions' writes, off the event loop
             try:
-                # Small delay for UI responsiveness
-                await asyncio.sleep(0.01)
-                manager.create_link(app_name, version, force=True)
-                success_count += 1
-            except Exception as ex:
-                print(f"Failed to link {app_name}: {ex}")
-                fail_count += 1
+                success_count, fail_count = await versions_grid.run_write(
+                    apply_plan, manager, plan, on_step
+                )
+            except StaleStateError:
+                await versions_grid.reload_after_write()
+                await show_snack(
+                    page,
+                    "Links were changed by another Pivot instance. Review and retry.",
+                    ft.Colors.ORANGE,
+                )
+                return
+            fail_count += plan.count("skip")
+
+            # Clear selection after processing
+            app_state.clear_all()
+
+            # Refresh Data
+            await versions_grid.reload_after_write()
+
+            # Replaces the progress snack
+            if fail_count > 0:
+                await show_snack(
+                    page,
+                    f"Linked {success_count}. Failed: {fail_count}",
+                    ft.Colors.ORANGE,
+                    key="batch",
+                )
+            else:
+                await show_snack(
+                    page,
+                    f"Successfully linked {success_count} apps!",
+                    ft.Colors.GREEN,
+                    key="batch",
+                )
+
+        show_plan_dialog(page, plan, run_plan)
+
+    def select_latest_available():
+        """
+        Selects the newest version for all apps where the newest is not currently
+        active, skipping versions the user switched back from (usage history).
+        """
+        if not hasattr(versions_grid, "groups"):
+            return
 
-        # Clear selection after processing
-        app_state.clear_all()
+        # Oldest first, by manifest version where known
+        ordered = {
+            app_name: versions_grid.ordered_versions(app_name)
+            for app_name, data in versions_grid.groups.items()
+            if data["versions"]
+        }
+        # Versions the user switched back from are not offered again
+        rank = {v: i for versions in ordered.values() for i, v in enumerate(versions)}
+        rejected = usage.rolled_back(rank)
 
-        # Refresh Data
-        await versions_grid.refresh_data()
+        with app_state.batch_updates():
+            for app_name, versions in ordered.items():
+                newest = preferred_version(versions, rejected)
+
+                # Select if the newest is NOT the currently active one
+                if versions_grid.groups[app_name]["active_version"] != newest:
+                    app_state.select(app_name, newest)
+
+    async def apply_profile(name: str):
+        """Relinks only the apps whose current version differs from the profile."""
+        try:
+            _, success_count, fail_count = await versions_grid.run_write(
+                profiles.apply, name
+            )
+        except (KeyError, ValueError, OSError, StaleStateError) as ex:
+            await show_snack(page, f"Failed to apply '{name}': {ex}", ft.Colors.ERROR)
+            return
+
+        await versions_grid.reload_after_write()
 
         if fail_count > 0:
             await show_snack(
-                page, f"Linked {success_count}. Failed: {fail_count}", ft.Colors.ORANGE
+                page,
+                f"Profile '{name}': changed {success_count}. Failed: {fail_count}",
+                ft.Colors.ORANGE,
             )
         else:
             await show_snack(
-                page, f"Successfully linked {success_count} apps!", ft.Colors.GREEN
+                page,
+                f"Profile '{name}' applied ({success_count} changed)",
+                ft.Colors.GREEN,
             )
 
-    def select_latest_available():
-        """Selects the newest version for all apps where the newest is not currently active."""
-        if not hasattr(versions_grid, "groups"):
-            return
+    async def save_profile():
+        """Prompts for a name and snapshots the current links."""
+        name_field = ft.TextField(label="Profile name", autofocus=True)
 
-        with app_state.batch_updates():
-            for app_name, data in versions_grid.groups.items():
-                versions = data["versions"]
-                if not versions:
-                    continue
+        def close_dialog(e=None):
+            page.close(dialog)  # type: ignore[attr-defined]
 
-                # Get newest (sort descending)
-                newest = sorted(versions, reverse=True)[0]
+        async def save(e):
+            name = (name_field.value or "").strip()
+            if not name:
+                return
+            close_dialog()
+            mapping = profiles.snapshot(name)
+            toolbar.update_toolbar()
+            await show_snack(
+                page, f"Saved {len(mapping)} links as '{name}'", ft.Colors.GREEN
+            )
 
-                # Select if the newest is NOT the currently active one
-                if data["active_version"] != newest:
-                    app_state.select(app_name, newest)
+        dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Save Profile"),
+            content=name_field,
+            actions=[
+                ft.TextButton("Cancel", on_click=close_dialog),
+                ft.ElevatedButton(
+                    "Save",
+                    on_click=save,
+                    bgcolor=ft.Colors.BLUE,
+                    color=ft.Colors.WHITE,
+                ),
+            ],
+            actions_alignment=ft.MainAxisAlignment.END,
+        )
+        page.open(dialog)  # type: ignore[attr-defined]
 
     # -- Components --
 
-    versions_grid = VersionGrid(page, manager, app_state)
+    versions_grid = VersionGrid(
+        page,
+        manager,
+        app_state,
+        fingerprints=fingerprints,
+        metadata_store=services.metadata_store,
+        usage=usage,
+        hub=hub,
+    )
 
     toolbar = PivotToolbar(
         page,
         app_state,
         on_link_action=execute_batch_link,
         on_select_latest=select_latest_available,
+        get_profile_names=profiles.names,
+        on_apply_profile=apply_profile,
+        on_save_profile=save_profile,
     )
 
     # -- Layout --
@@ -105,6 +295,41 @@ async def main(page: ft.Page):
     # Initial Load
     await versions_grid.refresh_data()
 
+    # Changes from other sessions and other Pivot instances arrive as deltas
+    def on_change(snapshot, delta):
+        # Hub thread; applied on this session's event loop
+        page.run_task(versions_grid.apply_delta, snapshot, delta)
+
+    unsubscribe = hub.subscribe(on_change)
+
+    def on_close(e):
+        unsubscribe()
+        services.pages.remove(page)
+        release_notifier(page)
+
+    page.on_close = on_close
+
+    # Manifests are read after the first render, never before it
+    page.run_task(versions_grid.load_metadata)
+
 
 if __name__ == "__main__":
-    ft.run(main)
+    # Fingerprint hashing uses a process pool; required for frozen builds
+    multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="Pivot")
+    parser.add_argument(
+        "--web",
+        action="store_true",
+        help="Serve the UI over HTTP; all sessions share one scan and write queue",
+    )
+    parser.add_argument("--host", help="Address to listen on in --web mode")
+    parser.add_argument("--port", type=int, default=8550)
+    # Frozen builds may be started with extra arguments
+    args, _ = parser.parse_known_args()
+
+    if args.web:
+        # Serve only; users open http://host:port in their browsers
+        ft.run(main, view=None, host=args.host, port=args.port)
+    else:
+        ft.run(main)
@@ -1,234 +1,640 @@
 import os
 import re
-import shutil
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
-from typing import TypedDict
-
-import subprocess
-import platform
 
 # Import from local config
-from config import VERSIONS_DIR, PERSISTS_DIR
-
-
-class AppGroup(TypedDict):
-    versions: list[str]
-    active_version: str | None
-    link_name: str | None
+from config import (
+    DATA_DIR,
+    PERSISTS_DIR,
+    PERSISTS_RESERVED,
+    SHARD_MARKER,
+    STAGING_SUFFIXES,
+    VERSIONS_DIR,
+)
+from filesystem import LONG_PATH_PREFIX, FileSystem
+from linkbackend import LinkBackend, LinkResult, PrivilegeError, fallback_backend
+from locking import StaleStateError
+from snapshot import AppGroup, ScanSnapshot
+
+__all__ = ["AppGroup", "ScanSnapshot", "StaleStateError", "VersionManager"]
 
 
 class VersionManager:
-    def __init__(self):
-        self.versions_dir = VERSIONS_DIR
-        self.persists_dir = PERSISTS_DIR
+    def __init__(
+        self,
+        backend: LinkBackend | None = None,
+        fs: FileSystem | None = None,
+        root: Path | None = None,
+    ):
+        """
+        root holds Versions/, Persists/ and .pivot/ (config.APP_ROOT by
+        default). fs is the real disk unless given, e.g. a MemoryFileSystem.
+        """
+        if root is None:
+            self.versions_dir = VERSIONS_DIR
+            self.persists_dir = PERSISTS_DIR
+            # Lock file and generation counter shared by every Pivot process
+            self.data_dir = DATA_DIR
+        else:
+            self.versions_dir = root / VERSIONS_DIR.name
+            self.persists_dir = root / PERSISTS_DIR.name
+            self.data_dir = root / DATA_DIR.name
+        self.fs = fs or FileSystem()
+        self.backend = backend or self.fs.link_backend()
+        # Shard folders (Versions/<App>/) seen by the last scan_versions()
+        self.shards: tuple[str, ...] = ()
+        # Optional local mirror (cache.LocalCache) that links point into
+        self.mirror = None
+        # Extra flat version roots (tiering.TierManager's slow root), scanned
+        # after Versions/. A folder present in both is taken from Versions/.
+        self.tier_roots: tuple[Path, ...] = ()
+        # Called as callback(app_name, folder_name | None) after a link changes
+        self._link_listeners: list[Callable[[str, str | None], None]] = []
+        # Called as callback() after a write that changed links, once per
+        # outermost transaction and after the write lock is released
+        self._flush_listeners: list[Callable[[], None]] = []
+        # Per thread: transaction nesting depth and whether links changed
+        self._transactions = threading.local()
+
+    def add_link_listener(self, callback: Callable[[str, str | None], None]):
+        self._link_listeners.append(callback)
+
+    def remove_link_listener(self, callback: Callable[[str, str | None], None]):
+        if callback in self._link_listeners:
+            self._link_listeners.remove(callback)
+
+    def _notify_link(self, app_name: str, folder_name: str | None):
+        for callback in self._link_listeners:
+            try:
+                callback(app_name, folder_name)
+            except (OSError, ValueError) as ex:
+                # Listeners are best-effort, the link itself already succeeded
+                print(f"Link listener failed for {app_name}: {ex}")
+
+    def add_flush_listener(self, callback: Callable[[], None]):
+        self._flush_listeners.append(callback)
+
+    def remove_flush_listener(self, callback: Callable[[], None]):
+        if callback in self._flush_listeners:
+            self._flush_listeners.remove(callback)
+
+    def _notify_flush(self):
+        for callback in self._flush_listeners:
+            try:
+                callback()
+            except (OSError, ValueError) as ex:
+                print(f"Flush listener failed: {ex}")
+
+    def read_generation(self) -> int:
+        """Counter bumped by every write to Persists/. Cheap and lock-free."""
+        return self.fs.read_generation(self.data_dir)
+
+    @contextmanager
+    def write_transaction(self, expected_generation: int | None = None):
+        """
+        Holds the cross-process write lock. Rejects the write with
+        StaleStateError if Persists/ moved past expected_generation.
+        Yields a list; append to it to signal a change and bump the generation.
+        Flush listeners run once the outermost transaction has released the lock.
+        """
+        state = self._transactions
+        state.depth = getattr(state, "depth", 0) + 1
+        try:
+            with self.fs.write_lock(self.data_dir):
+                if expected_generation is not None:
+                    current = self.read_generation()
+                    if current != expected_generation:
+                        raise StaleStateError(expected_generation, current)
+                changes: list = []
+                try:
+                    yield changes
+                finally:
+                    if changes:
+                        self.fs.bump_generation(self.data_dir)
+                        state.changed = True
+        finally:
+            state.depth -= 1
+            if not state.depth and getattr(state, "changed", False):
+                state.changed = False
+                self._notify_flush()
+
+    def iter_persists(self) -> Iterator[Path]:
+        """Entries of Persists/, skipping Pivot's own reserved folders (e.g. .bin)."""
+        if not self.fs.exists(self.persists_dir):
+            return
+        for name in self.fs.listdir(self.persists_dir):
+            if name not in PERSISTS_RESERVED:
+                yield self.persists_dir / name
+
+    # -- Versions Layout --
+    # Versions/ may be flat (Versions/<version>) or sharded per app
+    # (Versions/<App>/<version>), or a mix of both while migrating.
+    # Folder names stay the identity of a version in either layout.
+
+    def shard_name(self, folder_name: str) -> str:
+        """Shard folder a version belongs to in the sharded layout."""
+        return self.extract_app_name(folder_name)
+
+    def is_shard(self, name: str) -> bool:
+        """
+        True if Versions/name is a shard. Only bare app names can be shards,
+        so version folders in a flat tree cost no extra stat.
+        """
+        return self.extract_app_name(name) == name and self.fs.is_file(
+            self.versions_dir / name / SHARD_MARKER
+        )
+
+    def version_path(self, folder_name: str) -> Path:
+        """Location of a version folder in either layout, or in a tier root."""
+        sharded = self.versions_dir / self.shard_name(folder_name) / folder_name
+        if self.fs.is_dir(sharded):
+            return sharded
+        flat = self.versions_dir / folder_name
+        if self.tier_roots and not self.fs.is_dir(flat):
+            for root in self.tier_roots:
+                if self.fs.is_dir(root / folder_name):
+                    return root / folder_name
+        return flat
+
+    def link_source(self, folder_name: str) -> Path:
+        """Directory a link for folder_name points at: the mirror copy or Versions/."""
+        if self.mirror is not None and self.mirror.enabled:
+            return self.mirror.path(folder_name)
+        return self.version_path(folder_name)
 
     def scan_versions(self) -> list[str]:
-        """Returns sorted list of directory names in Versions/."""
-        if not self.versions_dir.exists():
+        """Returns sorted list of version folder names in Versions/ and its shards."""
+        if not self.fs.exists(self.versions_dir):
+            self.shards = ()
+            return []
+
+        versions: list[str] = []
+        shards: list[str] = []
+        for name in self.fs.list_dirs(self.versions_dir):
+            if name.endswith(STAGING_SUFFIXES):
+                continue
+            if self.is_shard(name):
+                shards.append(name)
+                versions.extend(self.scan_app_versions(name))
+            else:
+                versions.append(name)
+
+        self.shards = tuple(sorted(shards))
+        if self.tier_roots:
+            versions.extend(self._scan_tier_roots(set(versions)))
+        return sorted(versions)
+
+    def _scan_tier_roots(self, seen: set[str]) -> list[str]:
+        """Versions of the tier roots not already seen in Versions/."""
+        found: list[str] = []
+        for root in self.tier_roots:
+            try:
+                names = self.fs.list_dirs(root)
+            except OSError:
+                # Slow disk not mounted: its versions are just not listed
+                continue
+            for name in names:
+                if name not in seen and not name.endswith(STAGING_SUFFIXES):
+                    seen.add(name)
+                    found.append(name)
+        return found
+
+    def scan_app_versions(self, shard: str) -> list[str]:
+        """Lists one shard only, without touching the rest of Versions/."""
+        try:
+            return sorted(
+                name
+                for name in self.fs.list_dirs(self.versions_dir / shard)
+                if not name.endswith(STAGING_SUFFIXES)
+            )
+        except OSError:
             return []
-        return sorted([d.name for d in self.versions_dir.iterdir() if d.is_dir()])
 
     def scan_persisted(self) -> list[str]:
         """Returns list of names in Persists/ (symlinks or dirs)."""
-        if not self.persists_dir.exists():
-            return []
-        return [d.name for d in self.persists_dir.iterdir()]
+        return [d.name for d in self.iter_persists()]
 
     def resolve_link_target(self, link_path: Path) -> Path | None:
         """
         Resolves the target of a symlink or junction.
         Returns absolute Path to target if successful, else None.
         """
+        fs = self.fs
         try:
-            if link_path.is_symlink():
-                target = link_path.readlink()
+            if fs.is_symlink(link_path):
+                target = Path(fs.readlink(link_path))
                 if not target.is_absolute():
                     target = link_path.parent / target
-                return target.resolve()
+                return fs.resolve(target)
 
             # Python 3.10+ readlink supports junctions
-            if link_path.exists():
+            if fs.exists(link_path):
                 try:
-                    target = link_path.readlink()
+                    target = Path(fs.readlink(link_path).removeprefix(LONG_PATH_PREFIX))
                     if not target.is_absolute():
                         target = link_path.parent / target
-                    return target.resolve()
+                    return fs.resolve(target)
                 except OSError:
                     pass
             return None
         except OSError:
             return None
 
-    def get_grouped_versions(self) -> dict[str, AppGroup]:
+    @staticmethod
+    def _relative_parts(target: Path, root: Path) -> tuple[str, ...] | None:
+        """
+        Path parts of target below root, or None if it lies elsewhere.
+        Both must be resolved to avoid symlink/casing mismatches in parents;
+        target already is by resolve_link_target.
+        """
+        # Handle Windows Long Path prefix (\\?\) mismatch
+        # target might have it, root might not
+        target_str = str(target)
+        root_str = str(root)
+
+        if target_str.startswith("\\\\?\\"):
+            target = Path(target_str[4:])
+
+        if root_str.startswith("\\\\?\\"):
+            root = Path(root_str[4:])
+
+        try:
+            return target.relative_to(root).parts
+        except ValueError:
+            return None
+
+    def version_folder_of(self, target: Path) -> str | None:
         """
-        Returns a dictionary grouping versions by app name.
-        Structure:
+        Returns the Versions/ folder name (inside its shard, if sharded) that a
+        resolved link target points into, or None if it lies outside Versions/.
+        Targets inside the local mirror count as the mirrored version.
+        """
+        parts = self._relative_parts(target, self.fs.resolve(self.versions_dir))
+        if parts is None:
+            # Flat roots outside Versions/: tier roots and the mirror
+            roots = list(self.tier_roots)
+            if self.mirror is not None:
+                roots.append(self.mirror.root)
+            for root in roots:
+                other = self._relative_parts(target, self.fs.resolve(root))
+                if other is not None:
+                    return other[0] if other else None
+            # Target is not in Versions dir
+            return None
+
+        if not parts:
+            return None
+        if self.is_shard(parts[0]):
+            # Versions/<App>/<version>/...; the shard itself is not a version
+            return parts[1] if len(parts) > 1 else None
+        # Get the top-level folder name
+        return parts[0]
+
+    def get_grouped_versions(self) -> ScanSnapshot:
+        """
+        Returns an immutable snapshot grouping versions by app name.
+        It reads like the former dict structure:
         {
             "AppName": {
-                "versions": ["v1", "v2"],
+                "versions": ["v1", "v2"],       # Oldest first
                 "active_version": "v1" | None,  # The folder name that is currently linked
                 "link_name": "AppName" | None   # The name of the link in Persists
             }
         }
         """
-        groups: dict[str, AppGroup] = {}
-        version_to_link = {}
-        extracted_root_to_link_name = {}
-
-        # Track which Persists items are actually managed versions
-        managed_links = set()
+        # Read before scanning: a write during the scan then looks stale
+        generation = self.read_generation()
+        version_to_link: dict[str, str] = {}
+        extracted_root_to_link_name: dict[str, str] = {}
+        unmanaged: list[str] = []
 
         # 1. Analyze Persists to establish Naming Priority
-        if self.persists_dir.exists():
-            for link_path in self.persists_dir.iterdir():
-                target = self.resolve_link_target(link_path)
-                if target:
-                    # Check if target is inside Versions
-                    # resolve() returns absolute path.
-                    # We need to check if it's relative to self.versions_dir
-                    try:
-                        # Ensure both are resolved to avoid symlink/casing mismatches in parents
-                        # But self.versions_dir might not be fully resolved if Config doesn't do it.
-                        # target is already resolved() in resolve_link_target.
-
-                        # Use resolve() on versions_dir to be safe
-                        versions_root = self.versions_dir.resolve()
-
-                        # Handle Windows Long Path prefix (\\?\) mismatch
-                        # target might have it, versions_root might not
-                        target_str = str(target)
-                        root_str = str(versions_root)
-
-                        if target_str.startswith("\\\\?\\"):
-                            target_str = target_str[4:]
-                            target = Path(target_str)
-
-                        if root_str.startswith("\\\\?\\"):
-                            root_str = root_str[4:]
-                            versions_root = Path(root_str)
-
-                        relative_target = target.relative_to(versions_root)
-                        # It is a version!
-                        folder_name = relative_target.parts[
-                            0
-                        ]  # Get the top-level folder name
-
-                        link_name = link_path.name
-                        version_to_link[folder_name] = link_name
-
-                        managed_links.add(link_name)
-
-                        # Establish mapping: RootName -> LinkName
-                        root = self.extract_app_name(folder_name)
-                        # We prefer the link name as the group name
-                        extracted_root_to_link_name[root] = link_name
-
-                    except ValueError:
-                        # Target is not in Versions dir, ignore
-                        pass
+        for link_path in self.iter_persists():
+            target = self.resolve_link_target(link_path)
+            folder_name = self.version_folder_of(target) if target else None
+            if folder_name:
+                link_name = link_path.name
+                version_to_link[folder_name] = link_name
+
+                # Establish mapping: RootName -> LinkName
+                root = self.extract_app_name(folder_name)
+                # We prefer the link name as the group name
+                extracted_root_to_link_name[root] = link_name
+            else:
+                # Regular directory or a link pointing elsewhere
+                unmanaged.append(link_path.name)
 
         # 2. Group all available versions
+        # {group_name: [versions, active_version, link_name]}
+        groups: dict[str, list] = {}
         for folder_name in self.scan_versions():
             root = self.extract_app_name(folder_name)
 
             # Determine Group Name: Use Link Name if available for this root, else Root Name
             group_name = extracted_root_to_link_name.get(root, root)
 
-            if group_name not in groups:
-                groups[group_name] = {
-                    "versions": [],
-                    "active_version": None,
-                    "link_name": None,
-                }
-            groups[group_name]["versions"].append(folder_name)
+            group = groups.get(group_name)
+            if group is None:
+                group = groups[group_name] = [[], None, None]
+            group[0].append(folder_name)
 
             # Check if this specific version is the active one
             if folder_name in version_to_link:
-                groups[group_name]["active_version"] = folder_name
-                groups[group_name]["link_name"] = version_to_link[folder_name]
-
-        # 3. Add unmanaged/external Persists items
-        if self.persists_dir.exists():
-            for link_path in self.persists_dir.iterdir():
-                if link_path.name not in managed_links:
-                    # This is either a regular directory or a link pointing elsewhere
-                    # We add it as a group with no versions
-                    group_name = link_path.name
-
-                    if group_name not in groups:
-                        groups[group_name] = {
-                            "versions": [],
-                            "active_version": None,
-                            "link_name": group_name,
-                        }
-                    else:
-                        # Ensure link_name is set if it wasn't
-                        if groups[group_name]["link_name"] is None:
-                            groups[group_name]["link_name"] = group_name
-
-        return groups
-
-    def get_unlinked_versions(self) -> list[tuple[str, str]]:
-        """
-        Returns a list of (App Name, Original Folder Name) for items
-        that do not exist in Persists.
-        """
-        all_versions = self.scan_versions()
-        persisted = set(self.scan_persisted())
-
-        unlinked = []
-        for folder_name in all_versions:
-            app_name = self.extract_app_name(folder_name)
-            # logic: if a link/folder with 'app_name' exists in Persists,
-            # we consider it "linked" (managed).
-            if app_name not in persisted:
-                unlinked.append((app_name, folder_name))
-
-        return unlinked
-
-    def create_link(self, app_name: str, folder_name: str, force: bool = False) -> None:
+                group[1] = folder_name
+                group[2] = version_to_link[folder_name]
+
+        # 3. Add unmanaged/external Persists items as groups with no versions
+        for group_name in unmanaged:
+            if group_name not in groups:
+                groups[group_name] = [[], None, group_name]
+            elif groups[group_name][2] is None:
+                # Ensure link_name is set if it wasn't
+                groups[group_name][2] = group_name
+
+        return ScanSnapshot(
+            [(name, g[0], g[1], g[2]) for name, g in groups.items()],
+            generation=generation,
+        )
+
+    def current_links(self) -> dict[str, str | None]:
         """
-        Creates a symlink (or junction on Windows): Persists/app_name -> Versions/folder_name
+        Returns {link_name: folder_name} for every entry in Persists/.
+        folder_name is None for real directories and links pointing outside Versions/.
+        """
+        links: dict[str, str | None] = {}
+        for link_path in self.iter_persists():
+            target = self.resolve_link_target(link_path)
+            links[link_path.name] = self.version_folder_of(target) if target else None
+        return links
+
+    def get_unlinked_versions(
+        self, snapshot: ScanSnapshot | None = None
+    ) -> list[tuple[str, str]]:
+        """
+        Returns a list of (App Name, Original Folder Name) for versions of
+        apps without an entry in Persists/. App names are group names, so
+        a version linked under a custom link name counts as linked.
+        Pass a snapshot to reuse an existing scan; use
+        ScanSnapshot.iter_unlinked() directly to stream instead.
+        """
+        if snapshot is None:
+            snapshot = self.get_grouped_versions()
+        return list(snapshot.iter_unlinked())
+
+    def read_link_state(self, app_name: str) -> tuple[str, str | None]:
+        """
+        Classifies Persists/app_name with a single readlink in the common case.
+        Returns (kind, raw_target) where kind is "missing", "link", "directory"
+        or "file", and raw_target is the unresolved link text for links.
         """
-        src = self.versions_dir / folder_name
         dst = self.persists_dir / app_name
+        try:
+            # Python 3.10+ readlink supports junctions
+            return "link", self.fs.readlink(dst)
+        except FileNotFoundError:
+            return "missing", None
+        except (OSError, ValueError):
+            pass
 
-        if dst.exists() or dst.is_symlink():
-            if force:
-                if dst.is_symlink() or dst.is_file():
-                    dst.unlink()
-                else:
-                    # Directory or Junction
-                    try:
-                        dst.rmdir()  # Works for Junctions and empty dirs
-                    except OSError:
-                        shutil.rmtree(dst)  # Non-empty directory
-            else:
-                raise FileExistsError(f"Target {dst} already exists.")
+        if self.fs.is_dir(dst):
+            return "directory", None
+        return "file", None
 
-        # Create Symlink
-        # target_is_directory=True is crucial for Windows
+    def link_matches(self, raw_target: str | None, folder_name: str) -> bool:
+        """
+        True if a raw readlink result points at folder_name, either its mirror
+        copy or Versions/ (links made while it did not fit the mirror).
+        Compares normalized paths first and only resolves on mismatch, so the
+        common unchanged case costs no extra filesystem calls.
+        """
+        if raw_target is None:
+            return False
+
+        # Strip Windows Long Path prefix (\\?\) returned for junctions
+        raw_target = raw_target.removeprefix(LONG_PATH_PREFIX)
+
+        target = Path(raw_target)
+        if not target.is_absolute():
+            target = self.persists_dir / target
+
+        expected = [self.version_path(folder_name)]
+        if self.mirror is not None and self.mirror.enabled:
+            expected.insert(0, self.mirror.path(folder_name))
+        normalized = os.path.normcase(os.path.normpath(target))
+        if any(
+            normalized == os.path.normcase(os.path.normpath(path)) for path in expected
+        ):
+            return True
+
+        # Slow path: symlinked parents, different spelling of the same root
         try:
-            os.symlink(src, dst, target_is_directory=True)
-        except OSError as e:
-            # Check for Windows Privilege Error (1314)
-            if e.winerror == 1314 and platform.system() == "Windows":
-                # Fallback to Junction
-                self._create_junction(src, dst)
+            resolved = self.fs.resolve(target)
+            return any(resolved == self.fs.resolve(path) for path in expected)
+        except OSError:
+            return False
+
+    def create_link(
+        self,
+        app_name: str,
+        folder_name: str,
+        force: bool = False,
+        expected_generation: int | None = None,
+    ) -> None:
+        """
+        Creates a symlink (or junction on Windows): Persists/app_name -> Versions/folder_name
+        With force, an existing entry is replaced unless it already points at
+        the requested version, in which case nothing is touched.
+        """
+        with self.write_transaction(expected_generation) as changes:
+            _, errors = self._create_links([(app_name, folder_name)], force, changes)
+        if errors:
+            raise errors[0]
+
+    def create_links(
+        self,
+        items: list[tuple[str, str]],
+        force: bool = False,
+        expected_generation: int | None = None,
+    ) -> list[LinkResult]:
+        """
+        Batch form of create_link for [(app_name, folder_name), ...].
+        Each existing entry is cleared right before its new link is created;
+        batched backends get all new links in a single call instead. Returns
+        one LinkResult per item, including the time spent on it.
+        """
+        with self.write_transaction(expected_generation) as changes:
+            results, _ = self._create_links(items, force, changes)
+        return results
+
+    def _create_links(
+        self, items: list[tuple[str, str]], force: bool, changes: list
+    ) -> tuple[list[LinkResult], dict[int, Exception]]:
+        """Appends the link names it touched to changes (no-ops are left out)."""
+        results: list[LinkResult] = []
+        checked: list[tuple[int, str, str, str]] = []
+        errors: dict[int, Exception] = {}
+
+        for i, (app_name, folder_name) in enumerate(items):
+            result: LinkResult = {
+                "link_name": app_name,
+                "folder_name": folder_name,
+                "ok": True,
+                "error": None,
+                "seconds": 0.0,
+            }
+            results.append(result)
+
+            started = time.perf_counter()
+            try:
+                kind = self._check_entry(app_name, folder_name, force)
+                if kind is not None:
+                    checked.append((i, app_name, folder_name, kind))
+            except OSError as ex:
+                errors[i] = ex
+            result["seconds"] = time.perf_counter() - started
+
+        if self.mirror is not None and self.mirror.enabled:
+            # Read-through: bring the local copies up to date while the old
+            # links still work, so apps are never left without their folder
+            sources = self.mirror.prepare(
+                [folder_name for _, _, folder_name, _ in checked]
+            )
+        else:
+            sources = {}
+
+        remaining = checked
+        while remaining:
+            # Clear and create link by link, so a failure or an interruption
+            # leaves at most one link missing. Backends that pay per call
+            # (the junction script) get everything at once instead.
+            size = len(remaining) if self.backend.batched else 1
+            batch, remaining = remaining[:size], remaining[size:]
+            self._link_batch(batch, sources, results, errors, changes)
+
+        if sources:
+            # The copies just unlinked were kept while still in use
+            self.mirror.evict()
+
+        for i, error in errors.items():
+            results[i]["ok"] = False
+            results[i]["error"] = str(error)
+
+        return results, errors
+
+    def _link_batch(
+        self,
+        batch: list[tuple[int, str, str, str]],
+        sources: dict[str, Path],
+        results: list[LinkResult],
+        errors: dict[int, Exception],
+        changes: list,
+    ) -> None:
+        """Clears the entries of batch, then links them in one backend call."""
+        pending: list[tuple[int, str, str]] = []
+        for i, app_name, folder_name, kind in batch:
+            started = time.perf_counter()
+            try:
+                self._clear_entry(app_name, kind)
+                pending.append((i, app_name, folder_name))
+            except OSError as ex:
+                errors[i] = ex
+            results[i]["seconds"] += time.perf_counter() - started
+        if not pending:
+            return
+
+        changes.extend(app_name for _, app_name, _ in pending)
+        pairs = [
+            (
+                sources.get(folder_name) or self.version_path(folder_name),
+                self.persists_dir / app_name,
+            )
+            for _, app_name, folder_name in pending
+        ]
+        started = time.perf_counter()
+        try:
+            try:
+                outcomes = self.backend.create_many(pairs)
+            except PrivilegeError:
+                fallback = fallback_backend()
+                if fallback is None:
+                    raise
+                # No symlink privilege: use junctions from now on
+                self.backend = fallback
+                outcomes = self.backend.create_many(pairs)
+        except OSError as ex:
+            # The backend failed as a whole, e.g. cmd.exe could not start
+            seconds = (time.perf_counter() - started) / len(pairs)
+            outcomes = [(seconds, ex)] * len(pairs)
+
+        for (i, app_name, folder_name), (seconds, error) in zip(pending, outcomes):
+            results[i]["seconds"] += seconds
+            if error is not None:
+                errors[i] = error
             else:
-                raise
+                self._notify_link(app_name, folder_name)
+
+    def _check_entry(self, app_name: str, folder_name: str, force: bool) -> str | None:
+        """
+        Classifies Persists/app_name without changing it. Returns its kind
+        (see read_link_state), or None if the entry already points at
+        folder_name and nothing needs to be created.
+        """
+        kind, raw_target = self.read_link_state(app_name)
+        if kind == "missing":
+            return kind
+
+        if not force:
+            raise FileExistsError(
+                f"Target {self.persists_dir / app_name} already exists."
+            )
+
+        if kind == "link" and self.link_matches(raw_target, folder_name):
+            # Already points at the requested version, nothing to do
+            return None
+        return kind
 
-    def _create_junction(self, src: Path, dst: Path) -> None:
+    def _clear_entry(self, app_name: str, kind: str) -> None:
+        """Makes room for Persists/app_name, an entry of the given kind."""
+        dst = self.persists_dir / app_name
+        if kind == "missing":
+            return
+
+        if self.fs.is_symlink(dst) or kind == "file":
+            self.fs.unlink(dst)
+        else:
+            # Directory or Junction
+            try:
+                self.fs.rmdir(dst)  # Works for Junctions and empty dirs
+            except OSError:
+                self.fs.rmtree(dst)  # Non-empty directory
+
+    def remove_link(
+        self, app_name: str, expected_generation: int | None = None
+    ) -> None:
         """
-        Creates a Windows Directory Junction using mklink /J.
-        Does not require Admin privileges.
+        Removes the link Persists/app_name without touching its target.
+        Refuses to delete real directories, which may hold user data.
         """
-        # mklink /J Link Target
-        cmd = ["cmd", "/c", "mklink", "/J", str(dst), str(src)]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        dst = self.persists_dir / app_name
 
-        if result.returncode != 0:
-            raise OSError(f"Failed to create junction: {result.stderr}")
+        with self.write_transaction(expected_generation) as changes:
+            if self.fs.is_symlink(dst):
+                self.fs.unlink(dst)
+            elif self.resolve_link_target(dst) is not None:
+                # Junction: rmdir removes the reparse point only
+                self.fs.rmdir(dst)
+            elif self.fs.exists(dst):
+                raise IsADirectoryError(f"{dst} is a real directory, not a link.")
+            else:
+                raise FileNotFoundError(f"{dst} does not exist.")
+            changes.append(app_name)
+            # Inside the transaction, like create_link, so flush listeners
+            # see this change too
+            self._notify_link(app_name, None)
 
     @staticmethod
     def extract_app_name(folder_name: str) -> str:
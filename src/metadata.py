@@ -0,0 +1,422 @@
+import configparser
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TypedDict
+
+from manager import VersionManager
+
+METADATA_FILE = "metadata.json"
+
+# Manifests looked at, relative to the version folder (plus top-level *.exe / *.desktop)
+MANIFESTS = ("package.json", "resources/app/package.json", "VERSION", "version.txt")
+
+RT_VERSION = 16
+# Larger resource sections are not worth reading for a version string
+MAX_RESOURCE_SIZE = 16 * 1024 * 1024
+
+
+class VersionMetadata(TypedDict):
+    version: str | None
+    name: str | None
+    publisher: str | None
+    build_date: str | None  # ISO date
+    sources: list[str]  # Manifests that contributed, e.g. ["app.exe", "package.json"]
+
+
+# -- Extractors --
+
+
+def read_package_json(path: Path) -> dict[str, str | None]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    author = data.get("author")
+    if isinstance(author, dict):
+        author = author.get("name")
+    return {
+        "version": data.get("version"),
+        "name": data.get("productName") or data.get("name"),
+        "publisher": author if isinstance(author, str) else None,
+    }
+
+
+def read_version_file(path: Path) -> dict[str, str | None]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        first = f.readline().strip()
+    return {"version": first or None}
+
+
+def read_desktop_entry(path: Path) -> dict[str, str | None]:
+    parser = configparser.ConfigParser(interpolation=None, strict=False)
+    parser.optionxform = str  # type: ignore[assignment]
+    parser.read(path, encoding="utf-8")
+    if "Desktop Entry" not in parser:
+        return {}
+    entry = parser["Desktop Entry"]
+    return {
+        # "Version" is the spec version; AppImages carry the app's own
+        "version": entry.get("X-AppImage-Version"),
+        "name": entry.get("Name"),
+    }
+
+
+def _align(pos: int) -> int:
+    return (pos + 3) & ~3
+
+
+def _parse_version_node(data: bytes, offset: int) -> tuple[str, object, list, int]:
+    """One VS_VERSIONINFO-style node: (key, value, children, end)."""
+    length, value_length, value_type = struct.unpack_from("<HHH", data, offset)
+    end = min(offset + length, len(data))
+
+    key_end = offset + 6
+    while key_end + 1 < end and data[key_end : key_end + 2] != b"\0\0":
+        key_end += 2
+    key = data[offset + 6 : key_end].decode("utf-16-le", errors="replace")
+    pos = _align(key_end + 2)
+
+    value: object
+    if value_type == 1:
+        # Some linkers count bytes instead of characters; cut at the NUL
+        raw = data[pos : min(pos + value_length * 2, end)]
+        value = raw.decode("utf-16-le", errors="replace").split("\0", 1)[0]
+        pos += value_length * 2
+    else:
+        value = data[pos : pos + value_length]
+        pos += value_length
+
+    children = []
+    pos = _align(pos)
+    while pos + 6 <= end:
+        child = _parse_version_node(data, pos)
+        if child[3] <= pos:
+            break
+        children.append(child)
+        pos = _align(child[3])
+    return key, value, children, end
+
+
+def parse_version_info(blob: bytes) -> dict[str, str]:
+    """
+    Flattens a VS_VERSIONINFO resource into its StringFileInfo strings
+    (CompanyName, ProductVersion, ...) plus "FixedProductVersion".
+    """
+    key, value, children, _ = _parse_version_node(blob, 0)
+    if key != "VS_VERSION_INFO":
+        return {}
+
+    strings: dict[str, str] = {}
+    if isinstance(value, bytes) and len(value) >= 52:
+        fixed = struct.unpack_from("<13I", value)
+        if fixed[0] == 0xFEEF04BD:
+            ms, ls = fixed[4], fixed[5]
+            strings["FixedProductVersion"] = (
+                f"{ms >> 16}.{ms & 0xFFFF}.{ls >> 16}.{ls & 0xFFFF}"
+            )
+
+    for child_key, _, tables, _ in children:
+        if child_key != "StringFileInfo":
+            continue
+        for _, _, entries, _ in tables:
+            for name, text, _, _ in entries:
+                if isinstance(text, str) and text.strip():
+                    strings.setdefault(name, text.strip())
+    return strings
+
+
+def read_pe_version(path: Path) -> dict[str, str | None]:
+    """
+    Version resource and link timestamp of a Windows executable, read with
+    plain seeks: headers, section table and the resource section only.
+    """
+    with open(path, "rb") as f:
+        dos = f.read(64)
+        if len(dos) < 64 or dos[:2] != b"MZ":
+            return {}
+        (pe_offset,) = struct.unpack_from("<I", dos, 0x3C)
+        f.seek(pe_offset)
+        header = f.read(24)
+        if header[:4] != b"PE\0\0":
+            return {}
+        _, section_count, timestamp, _, _, optional_size, _ = struct.unpack_from(
+            "<HHIIIHH", header, 4
+        )
+        optional = f.read(optional_size)
+        magic = struct.unpack_from("<H", optional)[0]
+        dirs_offset = 96 if magic == 0x10B else 112
+        if len(optional) < dirs_offset + 24:
+            return {}
+        resource_rva, resource_size = struct.unpack_from(
+            "<II", optional, dirs_offset + 16
+        )
+
+        sections = []
+        for _ in range(section_count):
+            raw = f.read(40)
+            virtual_size, virtual_address, raw_size, raw_pointer = struct.unpack_from(
+                "<IIII", raw, 8
+            )
+            sections.append((virtual_address, max(virtual_size, raw_size), raw_pointer))
+
+        def rva_to_offset(rva: int) -> int | None:
+            for virtual_address, size, raw_pointer in sections:
+                if virtual_address <= rva < virtual_address + size:
+                    return rva - virtual_address + raw_pointer
+            return None
+
+        result: dict[str, str | None] = {}
+        # Reproducible builds store a hash here; only keep plausible dates
+        if 788918400 <= timestamp <= datetime.now(timezone.utc).timestamp():
+            result["build_date"] = (
+                datetime.fromtimestamp(timestamp, timezone.utc).date().isoformat()
+            )
+
+        resource_offset = rva_to_offset(resource_rva) if resource_rva else None
+        if resource_offset is None or not 0 < resource_size <= MAX_RESOURCE_SIZE:
+            return result
+        f.seek(resource_offset)
+        rsrc = f.read(resource_size)
+
+        def entries(dir_offset: int) -> list[tuple[int, int]]:
+            named, ids = struct.unpack_from("<HH", rsrc, dir_offset + 12)
+            return [
+                struct.unpack_from("<II", rsrc, dir_offset + 16 + 8 * i)
+                for i in range(named + ids)
+            ]
+
+        # Type -> name -> language; take the first name and language
+        node = next((o for i, o in entries(0) if i == RT_VERSION), None)
+        for _ in range(2):
+            if node is None or not node & 0x80000000:
+                return result
+            level = entries(node & 0x7FFFFFFF)
+            node = level[0][1] if level else None
+        if node is None or node & 0x80000000:
+            return result
+
+        data_rva, data_size = struct.unpack_from("<II", rsrc, node)
+        data_offset = rva_to_offset(data_rva)
+        if data_offset is None:
+            return result
+        f.seek(data_offset)
+        strings = parse_version_info(f.read(data_size))
+
+    result["version"] = (
+        strings.get("ProductVersion")
+        or strings.get("FileVersion")
+        or strings.get("FixedProductVersion")
+    )
+    result["name"] = strings.get("ProductName") or strings.get("FileDescription")
+    result["publisher"] = strings.get("CompanyName")
+    return result
+
+
+# -- Ordering --
+
+
+def version_key(text: str) -> tuple[int, ...]:
+    """Numeric parts of a version string, so 1.10 sorts after 1.9."""
+    return tuple(int(part) for part in re.findall(r"\d+", text))
+
+
+def order_versions(
+    versions: Sequence[str], metadata: Mapping[str, VersionMetadata]
+) -> list[str]:
+    """
+    Versions oldest first by their real version where known, else by the
+    numbers in the folder name. Ties keep the scan order.
+    """
+
+    def key(folder_name: str) -> tuple[int, ...]:
+        meta = metadata.get(folder_name)
+        if meta and meta["version"]:
+            return version_key(meta["version"])
+        return version_key(folder_name)
+
+    return sorted(versions, key=key)
+
+
+def describe(meta: VersionMetadata | None) -> str:
+    """Short display line, e.g. '1.2.3 · Vendor · 2024-05-01'."""
+    if not meta:
+        return ""
+    parts = (meta["version"], meta["publisher"], meta["build_date"])
+    return " · ".join(p for p in parts if p)
+
+
+# -- Store --
+
+
+def _no_metadata() -> VersionMetadata:
+    return {
+        "version": None,
+        "name": None,
+        "publisher": None,
+        "build_date": None,
+        "sources": [],
+    }
+
+
+class MetadataStore:
+    """
+    Extracts VersionMetadata from the manifests inside version folders.
+    Results are cached in METADATA_FILE keyed by a fingerprint of the
+    manifest files (path, size, mtime), so unchanged versions cost one
+    directory listing. refresh() runs on a thread pool and is meant to be
+    started after the first render; the scan itself never waits on it.
+    """
+
+    def __init__(
+        self,
+        manager: VersionManager,
+        path: Path | None = None,
+        max_workers: int = 8,
+    ):
+        self.manager = manager
+        self.path = path or manager.data_dir / METADATA_FILE
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._cache: dict[str, dict] | None = None
+
+    def _load(self) -> dict[str, dict]:
+        if self._cache is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._cache = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._cache = {}
+        return self._cache
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with self._lock, open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._load(), f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def cached(self) -> dict[str, VersionMetadata]:
+        """Everything extracted so far, without touching version folders."""
+        with self._lock:
+            return {folder: entry["meta"] for folder, entry in self._load().items()}
+
+    def _manifests(self, folder_name: str) -> list[Path]:
+        root = self.manager.version_path(folder_name)
+        found = [root / relpath for relpath in MANIFESTS if (root / relpath).is_file()]
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith(
+                    (".exe", ".desktop")
+                ):
+                    found.append(Path(entry.path))
+        return found
+
+    def _main_executable(self, folder_name: str, exes: list[Path]) -> Path | None:
+        """The exe named like the app, else the largest one (not an uninstaller)."""
+        app_name = self.manager.extract_app_name(folder_name).lower()
+        exes = [p for p in exes if not p.stem.lower().startswith(("unins", "uninst"))]
+        for exe in exes:
+            if exe.stem.lower().startswith(app_name) or app_name.startswith(
+                exe.stem.lower()
+            ):
+                return exe
+        return max(exes, key=lambda p: p.stat().st_size, default=None)
+
+    def extract(self, folder_name: str) -> VersionMetadata:
+        """Metadata for one version, from the cache if its manifests are unchanged."""
+        manifests = self._manifests(folder_name)
+        root = self.manager.version_path(folder_name)
+        h = hashlib.sha1()
+        for path in manifests:
+            st = path.stat()
+            relpath = path.relative_to(root).as_posix()
+            h.update(f"{relpath}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+        key = h.hexdigest()
+
+        with self._lock:
+            entry = self._load().get(folder_name)
+        if entry and entry["key"] == key:
+            return entry["meta"]
+
+        meta = _no_metadata()
+        exe = self._main_executable(
+            folder_name, [p for p in manifests if p.suffix.lower() == ".exe"]
+        )
+        # Most authoritative first; later sources only fill gaps
+        readers: list[tuple[Path, Callable[[Path], dict[str, str | None]]]] = []
+        if exe:
+            readers.append((exe, read_pe_version))
+        for path in manifests:
+            if path.name == "package.json":
+                readers.append((path, read_package_json))
+            elif path.suffix.lower() == ".desktop":
+                readers.append((path, read_desktop_entry))
+        for path in manifests:
+            if path.name in ("VERSION", "version.txt"):
+                readers.append((path, read_version_file))
+
+        for path, reader in readers:
+            try:
+                found = reader(path)
+            except (OSError, ValueError, struct.error, configparser.Error) as ex:
+                print(f"Failed to read {path}: {ex}")
+                continue
+            contributed = False
+            for field in ("version", "name", "publisher", "build_date"):
+                if found.get(field) and not meta[field]:
+                    meta[field] = found[field]
+                    contributed = True
+            if contributed:
+                meta["sources"].append(path.relative_to(root).as_posix())
+
+        with self._lock:
+            self._load()[folder_name] = {"key": key, "meta": meta}
+        return meta
+
+    def refresh(
+        self,
+        folder_names: list[str],
+        on_result: Callable[[str, VersionMetadata], None] | None = None,
+        prune: bool = False,
+    ) -> dict[str, VersionMetadata]:
+        """
+        Extracts in parallel, saves the cache once, returns {folder: metadata}.
+        With prune, cached versions not in folder_names are dropped.
+        """
+        results: dict[str, VersionMetadata] = {}
+
+        def run(folder_name: str) -> None:
+            try:
+                meta = self.extract(folder_name)
+            except (
+                OSError,
+                ValueError,
+                TypeError,
+                AttributeError,
+                RecursionError,
+            ) as ex:
+                # A malformed manifest must not take down the whole pool;
+                # the version shows without metadata and is retried next time
+                print(f"Failed to read metadata of {folder_name}: {ex}")
+                meta = _no_metadata()
+            results[folder_name] = meta
+            if on_result:
+                on_result(folder_name, meta)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            list(pool.map(run, folder_names))
+
+        if prune:
+            with self._lock:
+                # Forget versions that no longer exist
+                cache = self._load()
+                for folder_name in set(cache) - set(folder_names):
+                    del cache[folder_name]
+        self._save()
+        return results
@@ -0,0 +1,169 @@
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import TypedDict
+
+from filesystem import FileSystem
+from linkbackend import LinkResult
+from manager import VersionManager
+
+# Order in which changes are executed. Cheap, reversible retargets first;
+# replacing a real directory deletes data, so it always runs last.
+ACTION_ORDER = {
+    "retarget": 0,
+    "create": 1,
+    "replace_directory": 2,
+    "skip": 3,
+    "noop": 4,
+}
+
+
+class PlanStep(TypedDict):
+    action: str  # "create" | "retarget" | "replace_directory" | "noop" | "skip"
+    link_name: str
+    current: str | None  # Folder or raw path the link points at now
+    target: str  # Requested Versions/ folder
+    cost: int  # Estimated filesystem operations (readlink, unlink, symlink, ...)
+    note: str
+
+
+class LinkPlan:
+    """Ordered list of steps produced by plan_links(). Nothing is touched until apply_plan()."""
+
+    def __init__(self, steps: list[PlanStep], generation: int | None = None):
+        self.steps = steps
+        # Persists/ generation the plan was computed against
+        self.generation = generation
+
+    @property
+    def changes(self) -> list[PlanStep]:
+        """Steps that modify Persists/ (excludes no-ops and skips)."""
+        return [s for s in self.steps if s["action"] not in ("noop", "skip")]
+
+    @property
+    def total_cost(self) -> int:
+        return sum(s["cost"] for s in self.steps)
+
+    def count(self, action: str) -> int:
+        return sum(1 for s in self.steps if s["action"] == action)
+
+    def summary(self) -> str:
+        parts = [
+            f"{self.count(action)} {action.replace('_', ' ')}"
+            for action in ACTION_ORDER
+            if self.count(action)
+        ]
+        return ", ".join(parts) if parts else "nothing to do"
+
+    def describe(self) -> list[str]:
+        """Human readable lines, one per step."""
+        lines = []
+        for s in self.steps:
+            current = s["current"] or "-"
+            lines.append(
+                f"{s['action']:<18} {s['link_name']:<30} {current} -> {s['target']}"
+                f"  (cost {s['cost']}){'  ' + s['note'] if s['note'] else ''}"
+            )
+        return lines
+
+
+def _count_entries(fs: FileSystem, path: Path) -> int:
+    """Number of files and directories rmtree would have to remove."""
+    total = 0
+    for _, dirs, files in fs.walk(path):
+        total += len(dirs) + len(files)
+    return total
+
+
+def plan_links(
+    manager: VersionManager, requests: dict[str, str] | Iterable[tuple[str, str]]
+) -> LinkPlan:
+    """
+    Compares requested {link_name: folder_name} with the current state of
+    Persists/ and returns an ordered plan. Unchanged links cost one readlink.
+    """
+    items = requests.items() if isinstance(requests, dict) else requests
+    steps: list[PlanStep] = []
+    generation = manager.read_generation()
+
+    for link_name, folder_name in items:
+        kind, raw_target = manager.read_link_state(link_name)
+        step: PlanStep = {
+            "action": "noop",
+            "link_name": link_name,
+            "current": None,
+            "target": folder_name,
+            "cost": 1,  # The readlink above
+            "note": "",
+        }
+
+        if kind == "link":
+            if manager.link_matches(raw_target, folder_name):
+                step["current"] = folder_name
+                steps.append(step)
+                continue
+            step["current"] = raw_target
+
+        # Only changes need to verify the target exists
+        step["cost"] += 1
+        if not manager.fs.is_dir(manager.version_path(folder_name)):
+            step["action"] = "skip"
+            step["note"] = "version folder is missing"
+        elif kind == "missing":
+            step["action"] = "create"
+            step["cost"] += 1  # symlink
+        elif kind == "link":
+            step["action"] = "retarget"
+            step["cost"] += 2  # unlink + symlink
+        elif kind == "directory":
+            entries = _count_entries(manager.fs, manager.persists_dir / link_name)
+            step["action"] = "replace_directory"
+            step["current"] = "(directory)"
+            step["cost"] += entries + 2  # rmtree + rmdir + symlink
+            step["note"] = f"deletes {entries} entries"
+        else:
+            step["action"] = "replace_directory"
+            step["current"] = "(file)"
+            step["cost"] += 2  # unlink + symlink
+            step["note"] = "deletes a file"
+
+        steps.append(step)
+
+    steps.sort(key=lambda s: (ACTION_ORDER[s["action"]], s["link_name"]))
+    return LinkPlan(steps, generation)
+
+
+def execute_plan(manager: VersionManager, plan: LinkPlan) -> list[LinkResult]:
+    """
+    Executes the changing steps of a plan as one backend batch, in plan order.
+    Raises StaleStateError if another writer changed Persists/ since planning.
+    Returns a LinkResult (with per-link timing) for each changing step.
+    """
+    return manager.create_links(
+        [(step["link_name"], step["target"]) for step in plan.changes],
+        force=True,
+        expected_generation=plan.generation,
+    )
+
+
+def apply_plan(
+    manager: VersionManager,
+    plan: LinkPlan,
+    on_step: Callable[[PlanStep, str | None], None] | None = None,
+) -> tuple[int, int]:
+    """
+    Executes a plan. on_step is called after the batch for each changing step
+    with its error message (or None). Returns (success_count, fail_count).
+    """
+    success_count = 0
+    fail_count = 0
+
+    for step, result in zip(plan.changes, execute_plan(manager, plan)):
+        if result["ok"]:
+            success_count += 1
+        else:
+            print(f"Failed to link {step['link_name']}: {result['error']}")
+            fail_count += 1
+        if on_step:
+            on_step(step, result["error"])
+
+    return success_count, fail_count
@@ -0,0 +1,208 @@
+import fnmatch
+import json
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import TypedDict
+
+from manager import VersionManager
+
+PREWARM_FILE = "prewarm.json"
+
+# What a first launch usually needs: executables and shared libraries
+DEFAULT_PATTERNS = [
+    "*.exe",
+    "*.dll",
+    "*.pyd",
+    "*.so",
+    "*.so.*",
+    "*.dylib",
+    "*.node",
+    "*.asar",
+    "*.jar",
+    "bin/*",
+]
+DEFAULT_BUDGET = 256 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+
+class PrewarmSettings(TypedDict):
+    enabled: bool
+    budget_bytes: int
+    patterns: dict[str, list[str]]  # {link_name: patterns}; "*" is the default
+
+
+class PrewarmResult(TypedDict):
+    app_name: str
+    folder_name: str
+    files: int
+    bytes: int
+    skipped: int  # Matching files left out because of the budget
+    method: str  # "fadvise" | "read"
+    elapsed: float
+
+
+def load_settings(path: Path) -> PrewarmSettings:
+    settings: PrewarmSettings = {
+        "enabled": False,
+        "budget_bytes": DEFAULT_BUDGET,
+        "patterns": {"*": list(DEFAULT_PATTERNS)},
+    }
+    try:
+        with open(path, encoding="utf-8") as f:
+            settings.update(json.load(f))
+    except (FileNotFoundError, ValueError):
+        pass
+    return settings
+
+
+def save_settings(settings: PrewarmSettings, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _warm_file(path: str, size: int) -> str:
+    """Pulls a file into the page cache. Returns the method used."""
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        if hasattr(os, "posix_fadvise"):
+            # Asynchronous readahead: the kernel fetches while we move on
+            os.posix_fadvise(fd, 0, size, os.POSIX_FADV_WILLNEED)
+            return "fadvise"
+        # No hint API (Windows, macOS): read and discard
+        while os.read(fd, CHUNK_SIZE):
+            pass
+        return "read"
+    finally:
+        os.close(fd)
+
+
+def prewarm_version(
+    version_dir: Path, patterns: list[str], budget_bytes: int
+) -> tuple[int, int, int, str]:
+    """
+    Warms files under version_dir matching any pattern (relative path or
+    file name), smallest first so the budget covers as many files as possible.
+    Returns (files, bytes, skipped, method).
+    """
+    candidates: list[tuple[int, str]] = []
+    for dirpath, _, filenames in os.walk(version_dir):
+        rel_dir = os.path.relpath(dirpath, version_dir).replace(os.sep, "/")
+        for name in filenames:
+            relpath = name if rel_dir == "." else f"{rel_dir}/{name}"
+            if any(
+                fnmatch.fnmatch(relpath, p) or fnmatch.fnmatch(name, p)
+                for p in patterns
+            ):
+                full = os.path.join(dirpath, name)
+                try:
+                    candidates.append((os.path.getsize(full), full))
+                except OSError:
+                    continue
+
+    candidates.sort()
+    files = warmed = skipped = 0
+    method = "fadvise" if hasattr(os, "posix_fadvise") else "read"
+
+    for size, full in candidates:
+        if warmed + size > budget_bytes:
+            skipped += 1
+            continue
+        try:
+            method = _warm_file(full, size)
+        except OSError:
+            continue
+        files += 1
+        warmed += size
+
+    return files, warmed, skipped, method
+
+
+class Prewarmer:
+    """
+    Post-link stage: after create_link succeeds, the new version is queued
+    and warmed by a single background worker so linking never waits on it.
+    The worker exits when the queue is empty.
+    """
+
+    def __init__(
+        self,
+        manager: VersionManager,
+        settings_path: Path | None = None,
+        on_done: Callable[[PrewarmResult], None] | None = None,
+    ):
+        self.manager = manager
+        self.settings_path = settings_path or manager.data_dir / PREWARM_FILE
+        self.on_done = on_done
+        self._queue: queue.Queue[tuple[str, str]] = queue.Queue()
+        self._worker: threading.Thread | None = None
+        # Guards the queue and the worker: listeners may run on several
+        # threads (hub writer, daemon) while the worker decides to exit
+        self._lock = threading.Lock()
+
+    def attach(self) -> None:
+        self.manager.add_link_listener(self._on_link_changed)
+
+    def _on_link_changed(self, app_name: str, folder_name: str | None) -> None:
+        if folder_name is None or not load_settings(self.settings_path)["enabled"]:
+            return
+        with self._lock:
+            self._queue.put((app_name, folder_name))
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                # Exit once idle; the next link starts a new worker
+                try:
+                    app_name, folder_name = self._queue.get_nowait()
+                except queue.Empty:
+                    self._worker = None
+                    return
+            try:
+                result = self.prewarm(app_name, folder_name)
+                if self.on_done:
+                    self.on_done(result)
+            except (OSError, RuntimeError) as ex:
+                # RuntimeError: on_done hit a closed page
+                print(f"Failed to prewarm {folder_name}: {ex}")
+            finally:
+                self._queue.task_done()
+
+    def drain(self) -> None:
+        """Waits for the queued versions, e.g. before a CLI process exits."""
+        self._queue.join()
+
+    def prewarm(self, app_name: str, folder_name: str) -> PrewarmResult:
+        """Warms one version synchronously using the app's patterns and budget."""
+        settings = load_settings(self.settings_path)
+        patterns = settings["patterns"].get(
+            app_name, settings["patterns"].get("*", DEFAULT_PATTERNS)
+        )
+
+        # The link uses Versions/ when the version is not in the local cache
+        source = self.manager.link_source(folder_name)
+        if not self.manager.fs.is_dir(source):
+            source = self.manager.version_path(folder_name)
+
+        started = time.perf_counter()
+        files, warmed, skipped, method = prewarm_version(
+            source, patterns, settings["budget_bytes"]
+        )
+        return {
+            "app_name": app_name,
+            "folder_name": folder_name,
+            "files": files,
+            "bytes": warmed,
+            "skipped": skipped,
+            "method": method,
+            "elapsed": time.perf_counter() - started,
+        }
@@ -0,0 +1,81 @@
+import json
+import os
+from pathlib import Path
+
+from manager import VersionManager
+from planner import LinkPlan, apply_plan, plan_links
+
+PROFILES_FILE = "profiles.json"
+
+
+class ProfileStore:
+    """
+    Named snapshots of the Persists/ -> Versions/ mapping.
+    Stored as JSON: {profile_name: {link_name: folder_name}}
+    """
+
+    def __init__(self, manager: VersionManager, path: Path | None = None):
+        self.manager = manager
+        self.path = path or manager.data_dir / PROFILES_FILE
+
+    def _load(self) -> dict[str, dict[str, str]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self, profiles: dict[str, dict[str, str]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so a crash never leaves a truncated file
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(profiles, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def names(self) -> list[str]:
+        return sorted(self._load())
+
+    def get(self, name: str) -> dict[str, str]:
+        profiles = self._load()
+        if name not in profiles:
+            raise KeyError(f"Unknown profile: {name}")
+        mapping = profiles[name]
+        # Hand-edited files: anything but {link_name: folder_name} is unusable
+        if not isinstance(mapping, dict) or not all(
+            isinstance(k, str) and isinstance(v, str) for k, v in mapping.items()
+        ):
+            raise ValueError(f"Profile {name} is broken, save it again")
+        return mapping
+
+    def snapshot(self, name: str) -> dict[str, str]:
+        """Saves the current managed links under `name` (overwrites)."""
+        mapping = {
+            link_name: folder_name
+            for link_name, folder_name in self.manager.current_links().items()
+            if folder_name is not None
+        }
+        profiles = self._load()
+        profiles[name] = mapping
+        self._save(profiles)
+        return mapping
+
+    def delete(self, name: str) -> None:
+        profiles = self._load()
+        if profiles.pop(name, None) is None:
+            raise KeyError(f"Unknown profile: {name}")
+        self._save(profiles)
+
+    def plan(self, name: str) -> LinkPlan:
+        """Plan that moves Persists/ to the profile; unchanged links are no-ops."""
+        return plan_links(self.manager, self.get(name))
+
+    def apply(self, name: str) -> tuple[LinkPlan, int, int]:
+        """
+        Relinks only the entries that differ from the profile. Versions that no
+        longer exist are skipped so their existing links stay in place.
+        Returns (plan, success_count, fail_count).
+        """
+        plan = self.plan(name)
+        success_count, fail_count = apply_plan(self.manager, plan)
+        return plan, success_count, fail_count + plan.count("skip")
@@ -0,0 +1,226 @@
+import json
+import os
+import platform
+import stat
+from pathlib import Path
+
+from config import BIN_DIR
+from filesystem import FileSystem
+from manager import VersionManager
+
+# Sub-folders of a version searched for executables ("" is the version root)
+SEARCH_DIRS = ("", "bin")
+
+# Windows executable extensions, used when PATHEXT is not set
+DEFAULT_PATHEXT = ".COM;.EXE;.BAT;.CMD"
+
+INDEX_FILE = ".index.json"
+
+
+def _pathext() -> set[str]:
+    return {
+        ext.lower()
+        for ext in os.environ.get("PATHEXT", DEFAULT_PATHEXT).split(";")
+        if ext
+    }
+
+
+def find_executables(
+    version_dir: Path, is_windows: bool | None = None, fs: FileSystem | None = None
+) -> list[str]:
+    """
+    Returns executables of a version as paths relative to version_dir,
+    e.g. ["node.exe", "bin/npm"]. Only SEARCH_DIRS are listed, not the whole tree.
+    """
+    if is_windows is None:
+        is_windows = platform.system() == "Windows"
+    extensions = _pathext() if is_windows else set()
+    fs = fs or FileSystem()
+
+    found: list[str] = []
+    for sub in SEARCH_DIRS:
+        folder = version_dir / sub if sub else version_dir
+        try:
+            files = fs.list_files(folder)
+        except OSError:
+            # Missing bin/ or unreadable folder
+            continue
+        for name, mode in files.items():
+            if is_windows:
+                if os.path.splitext(name)[1].lower() not in extensions:
+                    continue
+            elif not mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH):
+                continue
+            found.append(f"{sub}/{name}" if sub else name)
+    return sorted(found)
+
+
+class BinIndex:
+    """
+    Keeps Persists/.bin populated with one shim per executable of every
+    active version, so a single PATH entry serves all apps.
+
+    Shims point *through* Persists/<App>, not at Versions/, so switching a
+    version only touches .bin when the set of executables changes.
+    The index lives in .bin/.index.json:
+    {"apps": {link_name: [relpath, ...]}, "owners": {shim_name: link_name}}
+    """
+
+    def __init__(self, manager: VersionManager, is_windows: bool | None = None):
+        self.manager = manager
+        self.is_windows = (
+            platform.system() == "Windows" if is_windows is None else is_windows
+        )
+
+    @property
+    def bin_dir(self) -> Path:
+        return self.manager.persists_dir / BIN_DIR.name
+
+    @property
+    def enabled(self) -> bool:
+        """Shims are maintained once .bin exists (created by rebuild())."""
+        return self.manager.fs.is_dir(self.bin_dir)
+
+    def attach(self) -> None:
+        """Update .bin incrementally whenever the manager switches a link."""
+        self.manager.add_link_listener(self.on_link_changed)
+
+    # -- Index persistence --
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.manager.fs.read_bytes(self.bin_dir / INDEX_FILE))
+        except (FileNotFoundError, ValueError):
+            return {"apps": {}, "owners": {}}
+
+    def _save(self, index: dict) -> None:
+        tmp = self.bin_dir / (INDEX_FILE + ".tmp")
+        data = json.dumps(index, indent=1, sort_keys=True).encode()
+        self.manager.fs.write_bytes(tmp, data)
+        self.manager.fs.replace(tmp, self.bin_dir / INDEX_FILE)
+
+    # -- Shims --
+
+    def _shim_name(self, relpath: str) -> str:
+        name = relpath.rsplit("/", 1)[-1]
+        if self.is_windows:
+            # Every shim is a .cmd wrapper, whatever the original extension
+            return os.path.splitext(name)[0] + ".cmd"
+        return name
+
+    def _write_shim(self, link_name: str, relpath: str) -> str:
+        fs = self.manager.fs
+        shim = self.bin_dir / self._shim_name(relpath)
+        if fs.is_symlink(shim) or fs.exists(shim):
+            fs.unlink(shim)
+
+        if self.is_windows:
+            # .cmd wrapper: no symlink privilege needed, resolves relative to .bin
+            target = "..\\" + link_name + "\\" + relpath.replace("/", "\\")
+            fs.write_bytes(shim, f'@"%~dp0{target}" %*\r\n'.encode())
+        else:
+            fs.symlink(Path("..") / link_name / relpath, shim)
+        return shim.name
+
+    def _remove_shim(self, shim_name: str) -> None:
+        fs = self.manager.fs
+        shim = self.bin_dir / shim_name
+        if fs.is_symlink(shim) or fs.exists(shim):
+            fs.unlink(shim)
+
+    def _update_app(
+        self, index: dict, link_name: str, executables: list[str]
+    ) -> list[str]:
+        """
+        Applies the executable set of one app to .bin, touching only shims
+        that were added or removed. Returns shim names lost to conflicts.
+        """
+        apps: dict[str, list[str]] = index["apps"]
+        owners: dict[str, str] = index["owners"]
+
+        old = set(apps.get(link_name, []))
+        new = set(executables)
+
+        freed = []
+        for relpath in old - new:
+            shim_name = self._shim_name(relpath)
+            if owners.get(shim_name) == link_name:
+                self._remove_shim(shim_name)
+                del owners[shim_name]
+                freed.append(shim_name)
+
+        conflicts = []
+        for relpath in sorted(new):
+            shim_name = self._shim_name(relpath)
+            owner = owners.get(shim_name)
+            if owner is not None and owner != link_name:
+                # First app to claim a command keeps it
+                conflicts.append(shim_name)
+                continue
+            if owner is None or relpath not in old:
+                self._write_shim(link_name, relpath)
+                owners[shim_name] = link_name
+
+        if new:
+            apps[link_name] = sorted(new)
+        else:
+            apps.pop(link_name, None)
+
+        # Hand freed commands to the next app that also provides them
+        for shim_name in freed:
+            if shim_name in owners:
+                continue
+            for other, relpaths in sorted(apps.items()):
+                match = next(
+                    (r for r in relpaths if self._shim_name(r) == shim_name), None
+                )
+                if other != link_name and match:
+                    self._write_shim(other, match)
+                    owners[shim_name] = other
+                    break
+
+        return conflicts
+
+    def on_link_changed(self, link_name: str, folder_name: str | None) -> None:
+        """Link listener: re-index a single app."""
+        if not self.enabled:
+            return
+
+        index = self._load()
+        executables = (
+            find_executables(
+                self.manager.version_path(folder_name), self.is_windows, self.manager.fs
+            )
+            if folder_name
+            else []
+        )
+        self._update_app(index, link_name, executables)
+        self._save(index)
+
+    def rebuild(self) -> tuple[int, list[str]]:
+        """
+        Full re-index of every managed link, creating .bin if needed.
+        Returns (shim_count, conflicting_shim_names).
+        """
+        self.manager.fs.mkdir(self.bin_dir, parents=True, exist_ok=True)
+        index = self._load()
+        links = {
+            link_name: folder_name
+            for link_name, folder_name in self.manager.current_links().items()
+            if folder_name is not None
+        }
+
+        conflicts: list[str] = []
+        # Drop apps that are no longer linked first to free their shim names
+        for link_name in list(index["apps"]):
+            if link_name not in links:
+                self._update_app(index, link_name, [])
+
+        for link_name, folder_name in sorted(links.items()):
+            executables = find_executables(
+                self.manager.version_path(folder_name), self.is_windows, self.manager.fs
+            )
+            conflicts.extend(self._update_app(index, link_name, executables))
+
+        self._save(index)
+        return len(index["owners"]), conflicts
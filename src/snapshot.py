@@ -0,0 +1,319 @@
+import fnmatch
+import heapq
+import itertools
+import sys
+from array import array
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from typing import Any, TypedDict
+
+
+class AppGroup(TypedDict):
+    versions: list[str]
+    active_version: str | None
+    link_name: str | None
+
+
+class SnapshotDelta(TypedDict):
+    generation: int
+    changed: dict[str, AppGroup]  # New groups and groups that differ
+    removed: list[str]
+
+
+class VersionEntry(TypedDict):
+    app_name: str
+    folder_name: str
+    active: bool
+
+
+# Sort keys for ScanSnapshot.iter_groups(order_by=...), on group indices
+GROUP_ORDERS = ("name", "versions")
+
+
+class GroupRecord:
+    """
+    Read-only view of one app group inside a ScanSnapshot.
+    Supports the dict-style access of the old AppGroup dicts:
+    record["versions"], record["active_version"], record.get("link_name").
+    """
+
+    __slots__ = ("_index", "_snapshot")
+
+    def __init__(self, snapshot: "ScanSnapshot", index: int):
+        self._snapshot = snapshot
+        self._index = index
+
+    @property
+    def name(self) -> str:
+        return self._snapshot._names[self._index]
+
+    @property
+    def versions(self) -> Sequence[str]:
+        """Folder names, oldest first (same order as scan_versions)."""
+        snap = self._snapshot
+        return snap._versions[snap._starts[self._index] : snap._starts[self._index + 1]]
+
+    @property
+    def versions_desc(self) -> Sequence[str]:
+        """Folder names, newest first, without re-sorting."""
+        return self.versions[::-1]
+
+    @property
+    def active_version(self) -> str | None:
+        active = self._snapshot._active[self._index]
+        return self._snapshot._versions[active] if active >= 0 else None
+
+    @property
+    def link_name(self) -> str | None:
+        return self._snapshot._links[self._index]
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "versions":
+            return self.versions
+        if key == "active_version":
+            return self.active_version
+        if key == "link_name":
+            return self.link_name
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> AppGroup:
+        return {
+            "versions": list(self.versions),
+            "active_version": self.active_version,
+            "link_name": self.link_name,
+        }
+
+    def __repr__(self) -> str:
+        return f"GroupRecord({self.name!r}, {len(self.versions)} versions)"
+
+
+class ScanSnapshot(Mapping[str, GroupRecord]):
+    """
+    Immutable result of one scan, stored as flat arrays instead of nested dicts:
+
+    _names:    group names, sorted
+    _versions: every folder name, grouped by app, oldest first within a group
+    _starts:   group i owns _versions[_starts[i]:_starts[i + 1]]
+    _active:   index into _versions of the linked folder, or -1
+    _links:    Persists link name per group, or None
+
+    Behaves like the old {app_name: AppGroup} dict for reading.
+    """
+
+    __slots__ = (
+        "_active",
+        "_index",
+        "_links",
+        "_names",
+        "_starts",
+        "_versions",
+        "generation",
+    )
+
+    def __init__(
+        self,
+        groups: Sequence[tuple[str, Sequence[str], str | None, str | None]],
+        generation: int = 0,
+    ):
+        """
+        groups: (name, versions, active_version, link_name) tuples. Names and
+        folder names are interned so repeated scans share the same strings.
+        generation: Persists/ write generation the scan started from.
+        """
+        self.generation = generation
+        ordered = sorted(groups, key=lambda g: g[0])
+
+        names: list[str] = []
+        versions: list[str] = []
+        starts = array("l", [0])
+        active = array("l")
+        links: list[str | None] = []
+
+        for name, group_versions, active_version, link_name in ordered:
+            names.append(sys.intern(name))
+            active_index = -1
+            for folder_name in group_versions:
+                if folder_name == active_version:
+                    active_index = len(versions)
+                versions.append(sys.intern(folder_name))
+            starts.append(len(versions))
+            active.append(active_index)
+            links.append(sys.intern(link_name) if link_name is not None else None)
+
+        self._names = tuple(names)
+        self._index = {name: i for i, name in enumerate(self._names)}
+        self._versions = tuple(versions)
+        self._starts = starts
+        self._active = active
+        self._links = tuple(links)
+
+    @classmethod
+    def empty(cls) -> "ScanSnapshot":
+        return cls([])
+
+    def __getitem__(self, name: str) -> GroupRecord:
+        return GroupRecord(self, self._index[name])
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        """Group names in sorted order (callers no longer need to sort)."""
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @property
+    def version_count(self) -> int:
+        return len(self._versions)
+
+    def to_dict(self) -> dict[str, AppGroup]:
+        """Plain dicts, e.g. for JSON serialization."""
+        return {name: self[name].to_dict() for name in self._names}
+
+    def __repr__(self) -> str:
+        return f"ScanSnapshot({len(self)} groups, {self.version_count} versions)"
+
+    def _group_key(self, i: int) -> tuple:
+        start, active = self._starts[i], self._active[i]
+        return (
+            self._versions[start : self._starts[i + 1]],
+            active - start if active >= 0 else -1,
+            self._links[i],
+        )
+
+    def diff(self, older: "ScanSnapshot") -> SnapshotDelta:
+        """
+        What changed since older, per group. Folder names are interned, so
+        unchanged groups compare by identity and the diff stays cheap even
+        for large trees.
+        """
+        changed: dict[str, AppGroup] = {}
+        for i, name in enumerate(self._names):
+            j = older._index.get(name)
+            if j is None or self._group_key(i) != older._group_key(j):
+                changed[name] = self[name].to_dict()
+        removed = [name for name in older._names if name not in self._index]
+        return {"generation": self.generation, "changed": changed, "removed": removed}
+
+    # -- Queries --
+    # Lazy views over the snapshot: records are built one at a time, so a
+    # caller that stops early (limit, break) never touches the rest.
+
+    def _matches(
+        self,
+        i: int,
+        match: str | None,
+        linked: bool | None,
+        active: bool | None,
+        min_versions: int,
+    ) -> bool:
+        if match is not None and not fnmatch.fnmatch(
+            self._names[i].lower(), match.lower()
+        ):
+            return False
+        if linked is not None and (self._links[i] is not None) != linked:
+            return False
+        if active is not None and (self._active[i] >= 0) != active:
+            return False
+        return self._starts[i + 1] - self._starts[i] >= min_versions
+
+    def iter_groups(
+        self,
+        *,
+        match: str | None = None,
+        linked: bool | None = None,
+        active: bool | None = None,
+        min_versions: int = 0,
+        where: Callable[[GroupRecord], bool] | None = None,
+        order_by: str = "name",
+        descending: bool = False,
+        limit: int | None = None,
+    ) -> Iterator[GroupRecord]:
+        """
+        Yields groups matching every given filter:
+        match:        case-insensitive glob on the group name
+        linked:       has (or has no) entry in Persists/
+        active:       links to (or does not link to) one of its versions
+        min_versions: at least this many versions
+        where:        any other predicate on the record
+        order_by "versions" sorts by version count; only the top `limit`
+        indices are kept in memory while sorting.
+        """
+        if order_by not in GROUP_ORDERS:
+            raise ValueError(f"Unknown order: {order_by}")
+
+        indices: Iterable[int] = (
+            i
+            for i in range(len(self._names))
+            if self._matches(i, match, linked, active, min_versions)
+        )
+        if order_by == "versions":
+            starts = self._starts
+
+            def count(i: int) -> int:
+                return starts[i + 1] - starts[i]
+
+            if where is None and limit is not None:
+                pick = heapq.nlargest if descending else heapq.nsmallest
+                indices = pick(limit, indices, key=count)
+            else:
+                indices = sorted(indices, key=count, reverse=descending)
+        elif descending:
+            indices = reversed([*indices])
+
+        records = (GroupRecord(self, i) for i in indices)
+        if where is not None:
+            records = (r for r in records if where(r))
+        return itertools.islice(records, limit)
+
+    def iter_versions(
+        self,
+        *,
+        newest_first: bool = False,
+        per_app: int | None = None,
+        active: bool | None = None,
+        limit: int | None = None,
+        **group_filters: Any,
+    ) -> Iterator[VersionEntry]:
+        """
+        Yields versions of the groups selected by iter_groups(**group_filters).
+        per_app caps the versions taken from each group; active keeps only
+        linked (or only unlinked) versions.
+        """
+
+        def entries() -> Iterator[VersionEntry]:
+            for group in self.iter_groups(**group_filters):
+                versions = group.versions_desc if newest_first else group.versions
+                current = group.active_version
+                taken = 0
+                for folder_name in versions:
+                    is_active = folder_name == current
+                    if active is not None and is_active != active:
+                        continue
+                    yield {
+                        "app_name": group.name,
+                        "folder_name": folder_name,
+                        "active": is_active,
+                    }
+                    taken += 1
+                    if per_app is not None and taken >= per_app:
+                        break
+
+        return itertools.islice(entries(), limit)
+
+    def iter_unlinked(self, limit: int | None = None) -> Iterator[tuple[str, str]]:
+        """
+        (group_name, folder_name) for versions of apps that have no entry in
+        Persists/, the same "linked" notion the grid and batch dialog use.
+        """
+        return (
+            (entry["app_name"], entry["folder_name"])
+            for entry in self.iter_versions(linked=False, min_versions=1, limit=limit)
+        )
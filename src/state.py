@@ -6,6 +6,8 @@ class AppState:
     def __init__(self):
         # selected_versions: {app_name: version_folder}
         self.selected_versions: dict[str, str] = {}
+        # Apps whose cards show every version (kept across grid refreshes)
+        self.expanded_apps: set[str] = set()
         self._listeners: list[Callable] = []
         self._is_batching = False
 
@@ -30,6 +32,16 @@ class AppState:
             del self.selected_versions[app_name]
             self._notify()
 
+    def is_expanded(self, app_name: str) -> bool:
+        return app_name in self.expanded_apps
+
+    def set_expanded(self, app_name: str, expanded: bool):
+        """View-only state: does not notify, the card rebuilds itself."""
+        if expanded:
+            self.expanded_apps.add(app_name)
+        else:
+            self.expanded_apps.discard(app_name)
+
     def clear_all(self):
         self.selected_versions.clear()
         self._notify()
@@ -0,0 +1,222 @@
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import TypedDict
+
+from linkbackend import LinkBackend
+from manager import VersionManager
+
+APP_NAME = "StressApp"
+VERSIONS = ("StressApp-1.0", "StressApp-2.0")
+
+
+class ReaderStats(TypedDict):
+    reads: int
+    failed: int
+    longest_gap: float  # Longest run of failed reads, first failure to next success
+    errors: dict[str, int]  # Exception type -> count
+
+
+class StressReport(TypedDict):
+    mode: str  # "link" | "directory"
+    backend: str
+    switches: int
+    readers: int
+    reads: int
+    failed_reads: int
+    longest_unavailable: float
+    latency: dict[str, float]  # min, p50, p90, p99, max, mean (seconds)
+    errors: dict[str, int]
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(round(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def latency_summary(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "min": ordered[0] if ordered else 0.0,
+        "p50": _percentile(ordered, 50),
+        "p90": _percentile(ordered, 90),
+        "p99": _percentile(ordered, 99),
+        "max": ordered[-1] if ordered else 0.0,
+        "mean": sum(ordered) / len(ordered) if ordered else 0.0,
+    }
+
+
+def read_loop(paths: list[str], stop, results) -> None:
+    """
+    Reader body, shared by threads and processes: opens and reads the files
+    through the link until stop is set, then puts its ReaderStats on results.
+    Only the gap bookkeeping runs per read, so the loop stays tight.
+    """
+    stats: ReaderStats = {"reads": 0, "failed": 0, "longest_gap": 0.0, "errors": {}}
+    gap_started: float | None = None
+    i = 0
+
+    while not stop.is_set():
+        path = paths[i % len(paths)]
+        i += 1
+        stats["reads"] += 1
+        try:
+            with open(path, "rb") as f:
+                f.read()
+        except OSError as ex:
+            stats["failed"] += 1
+            name = type(ex).__name__
+            stats["errors"][name] = stats["errors"].get(name, 0) + 1
+            if gap_started is None:
+                gap_started = time.perf_counter()
+            continue
+
+        if gap_started is not None:
+            stats["longest_gap"] = max(
+                stats["longest_gap"], time.perf_counter() - gap_started
+            )
+            gap_started = None
+
+    if gap_started is not None:
+        stats["longest_gap"] = max(
+            stats["longest_gap"], time.perf_counter() - gap_started
+        )
+    results.put(stats)
+
+
+class LinkSwitchStress:
+    """
+    Measures what running programs see while Pivot switches a version:
+    reader threads (or processes) keep opening files through Persists/<App>
+    while the main thread calls create_link(force=True) back and forth.
+
+    mode="link" switches link to link. mode="directory" turns Persists/<App>
+    into a real directory before every switch, so each switch pays for the
+    rmtree of a first-time migration.
+
+    Works in its own Versions/ + Persists/ tree under root (a temp dir by
+    default; point it at a NAS path to measure that filesystem).
+    """
+
+    def __init__(
+        self,
+        root: Path | None = None,
+        files: int = 20,
+        file_size: int = 64 * 1024,
+        backend: LinkBackend | None = None,
+    ):
+        self._own_root = root is None
+        self.root = (
+            Path(tempfile.mkdtemp(prefix="pivot-stress-")) if root is None else root
+        )
+        self.files = files
+        self.file_size = file_size
+
+        self.manager = VersionManager(backend=backend, root=self.root)
+
+    def setup(self) -> None:
+        self.manager.persists_dir.mkdir(parents=True, exist_ok=True)
+        for folder_name in VERSIONS:
+            version_dir = self.manager.versions_dir / folder_name
+            version_dir.mkdir(parents=True, exist_ok=True)
+            payload = folder_name.encode().ljust(self.file_size, b".")
+            for i in range(self.files):
+                (version_dir / f"file{i:03}.bin").write_bytes(payload)
+        self.manager.create_link(APP_NAME, VERSIONS[0], force=True)
+
+    def cleanup(self) -> None:
+        if self._own_root:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def _make_real_directory(self, folder_name: str) -> None:
+        """
+        Replaces the link with a copy of the version, outside the timed part.
+        The copy is staged first so readers only miss the final rename.
+        """
+        staging = self.root / "staging"
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.copytree(self.manager.version_path(folder_name), staging)
+        self.manager.remove_link(APP_NAME)
+        os.rename(staging, self.manager.persists_dir / APP_NAME)
+
+    def run(
+        self,
+        switches: int = 200,
+        readers: int = 4,
+        processes: bool = False,
+        mode: str = "link",
+        interval: float = 0.0,
+    ) -> StressReport:
+        self.setup()
+        link_dir = self.manager.persists_dir / APP_NAME
+        paths = [str(link_dir / f"file{i:03}.bin") for i in range(self.files)]
+
+        if processes:
+            stop = multiprocessing.Event()
+            results = multiprocessing.Queue()
+            workers = [
+                multiprocessing.Process(target=read_loop, args=(paths, stop, results))
+                for _ in range(readers)
+            ]
+        else:
+            stop = threading.Event()
+            results = queue.Queue()
+            workers = [
+                threading.Thread(target=read_loop, args=(paths, stop, results))
+                for _ in range(readers)
+            ]
+
+        for worker in workers:
+            worker.start()
+
+        latencies: list[float] = []
+        try:
+            for n in range(switches):
+                target = VERSIONS[(n + 1) % len(VERSIONS)]
+                if mode == "directory":
+                    self._make_real_directory(VERSIONS[n % len(VERSIONS)])
+
+                started = time.perf_counter()
+                self.manager.create_link(APP_NAME, target, force=True)
+                latencies.append(time.perf_counter() - started)
+
+                if interval:
+                    time.sleep(interval)
+        except BaseException:
+            # Stop the readers but skip their results, so a reader that
+            # never reports cannot hide the original error
+            stop.set()
+            for worker in workers:
+                worker.join(timeout=5)
+            raise
+
+        stop.set()
+        # Drain before joining: a process exits only once its result is read
+        stats = [results.get(timeout=30) for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        errors: dict[str, int] = {}
+        for s in stats:
+            for name, count in s["errors"].items():
+                errors[name] = errors.get(name, 0) + count
+
+        return {
+            "mode": mode,
+            "backend": self.manager.backend.name,
+            "switches": switches,
+            "readers": readers,
+            "reads": sum(s["reads"] for s in stats),
+            "failed_reads": sum(s["failed"] for s in stats),
+            "longest_unavailable": max((s["longest_gap"] for s in stats), default=0.0),
+            "latency": latency_summary(latencies),
+            "errors": errors,
+        }
@@ -0,0 +1,405 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import TypedDict
+
+from config import STAGING_SUFFIXES
+from manager import VersionManager
+
+TIERS_FILE = "tiers.json"
+# Copies being built and old copies being deleted; hidden from scans
+STAGING_SUFFIX = STAGING_SUFFIXES[0]
+CHUNK_SIZE = 1024 * 1024
+DAY = 86400
+
+
+class TierSettings(TypedDict):
+    enabled: bool
+    slow_root: str  # Big, slow disk for cold versions; Versions/ is the fast root
+    hot_days: float  # Versions used within this many days stay on the fast root
+    rate_mb: float  # Copy throttle in MB/s, 0 for none
+    interval: float  # Seconds between background passes
+
+
+class TierMove(TypedDict):
+    folder_name: str
+    to: str  # "fast" | "slow"
+
+
+class MoveResult(TypedDict):
+    folder_name: str
+    to: str
+    files: int
+    bytes: int
+    relinked: int
+    elapsed: float
+
+
+class VerifyError(OSError):
+    """A copied file does not read back with the source's hash."""
+
+
+def load_settings(path: Path) -> TierSettings:
+    settings: TierSettings = {
+        "enabled": False,
+        "slow_root": "",
+        "hot_days": 30.0,
+        "rate_mb": 50.0,
+        "interval": 600.0,
+    }
+    try:
+        with open(path, encoding="utf-8") as f:
+            settings.update(json.load(f))
+    except (FileNotFoundError, ValueError):
+        pass
+    return settings
+
+
+def save_settings(settings: TierSettings, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=2)
+    os.replace(tmp, path)
+
+
+class Throttle:
+    """Sleeps as needed to keep a byte stream under rate bytes per second."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.started = time.perf_counter()
+        self.total = 0
+
+    def consumed(self, size: int) -> None:
+        self.total += size
+        if self.rate:
+            ahead = self.total / self.rate - (time.perf_counter() - self.started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+def _read_hash(path: str, throttle: Throttle) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            h.update(chunk)
+            throttle.consumed(len(chunk))
+    return h.hexdigest()
+
+
+def _copy_file(source: str, target: str, throttle: Throttle) -> int:
+    """Copies, fsyncs and reads back one file. Returns the bytes copied."""
+    copied = 0
+    h = hashlib.sha256()
+    with open(source, "rb") as fsrc, open(target, "wb") as fdst:
+        while chunk := fsrc.read(CHUNK_SIZE):
+            fdst.write(chunk)
+            h.update(chunk)
+            throttle.consumed(len(chunk))
+            copied += len(chunk)
+        fdst.flush()
+        os.fsync(fdst.fileno())
+    shutil.copystat(source, target)
+    if _read_hash(target, throttle) != h.hexdigest():
+        raise VerifyError(f"{target} does not match {source} after copying")
+    return copied
+
+
+def _file_state(path: str) -> tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def tree_state(src: Path) -> dict[str, tuple[int, int]]:
+    """{relpath: (size, mtime_ns)} of the regular files under src."""
+    state: dict[str, tuple[int, int]] = {}
+    for dirpath, _, filenames in os.walk(src):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if not os.path.islink(path):
+                state[os.path.relpath(path, src)] = _file_state(path)
+    return state
+
+
+def copy_verified(
+    src: Path,
+    dst: Path,
+    throttle: Throttle,
+    snapshot: dict[str, tuple[int, int]] | None = None,
+) -> tuple[int, int]:
+    """
+    Streams the src tree to dst, hashing each file while it is copied, then
+    fsyncs and reads the copy back to compare. Raises VerifyError on a
+    mismatch. Fills snapshot with each file's (size, mtime_ns) from before
+    it was copied, see tree_state. Returns (files, bytes).
+    """
+    files = copied = 0
+    for dirpath, dirnames, filenames in os.walk(src):
+        rel_dir = os.path.relpath(dirpath, src)
+        target_dir = dst / rel_dir if rel_dir != "." else dst
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        for name in dirnames + filenames:
+            source = os.path.join(dirpath, name)
+            target = str(target_dir / name)
+            if os.path.islink(source):
+                os.symlink(os.readlink(source), target)
+                if name in dirnames:
+                    dirnames.remove(name)
+                continue
+            if name in dirnames:
+                continue
+
+            state = _file_state(source)
+            copied += _copy_file(source, target, throttle)
+            if snapshot is not None:
+                snapshot[os.path.relpath(source, src)] = state
+            files += 1
+
+        shutil.copystat(dirpath, target_dir)
+    return files, copied
+
+
+def sync_changed(
+    src: Path, dst: Path, snapshot: dict[str, tuple[int, int]]
+) -> tuple[int, int]:
+    """
+    Brings dst up to date with the files of src that changed, appeared or
+    went away since snapshot was taken, unthrottled, and updates snapshot.
+    Returns (files, bytes) copied.
+    """
+    current = tree_state(src)
+    files = copied = 0
+    for relpath in snapshot.keys() - current.keys():
+        os.unlink(dst / relpath)
+        del snapshot[relpath]
+    for relpath, state in current.items():
+        if snapshot.get(relpath) == state:
+            continue
+        (dst / relpath).parent.mkdir(parents=True, exist_ok=True)
+        copied += _copy_file(str(src / relpath), str(dst / relpath), Throttle(0))
+        snapshot[relpath] = state
+        files += 1
+    return files, copied
+
+
+class TierManager:
+    """
+    Keeps active and recently used versions in Versions/ (the fast root) and
+    moves cold ones to a slow root, which VersionManager scans as a tier root.
+
+    A move copies the version next to its destination under a staging name,
+    verifies it, renames it into place and only then retires the old copy,
+    so the version is listed in at least one root at every moment. Links
+    to it are switched to the new copy under the write lock.
+    Moves run one at a time on a background thread, throttled to rate_mb.
+    """
+
+    def __init__(
+        self,
+        manager: VersionManager,
+        usage=None,
+        settings_path: Path | None = None,
+    ):
+        self.manager = manager
+        # usage.UsageTracker; without it only active versions count as hot
+        self.usage = usage
+        self.settings_path = settings_path or manager.data_dir / TIERS_FILE
+        self.settings = load_settings(self.settings_path)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings["enabled"] and bool(self.settings["slow_root"])
+
+    @property
+    def slow_root(self) -> Path:
+        return Path(self.settings["slow_root"])
+
+    def attach(self) -> None:
+        """Makes the manager list cold versions and promotes them when linked."""
+        if not self.enabled:
+            return
+        self.manager.tier_roots = (self.slow_root,)
+        self.manager.add_link_listener(self._on_link_changed)
+
+    def _on_link_changed(self, app_name: str, folder_name: str | None) -> None:
+        if folder_name and self.tier_of(folder_name) == "slow":
+            # Linked from the slow root for now; the next pass promotes it
+            self._wake.set()
+
+    def tier_of(self, folder_name: str) -> str:
+        path = self.manager.version_path(folder_name)
+        return "slow" if path.parent == self.slow_root else "fast"
+
+    # -- Planning --
+
+    def plan(self, now: float | None = None) -> list[TierMove]:
+        """Promotions first, so a version linked from the slow disk gets fast soon."""
+        cutoff = (now or time.time()) - self.settings["hot_days"] * DAY
+        active = {f for f in self.manager.current_links().values() if f}
+        last_used = self.usage.last_used() if self.usage is not None else {}
+
+        promote: list[TierMove] = []
+        demote: list[TierMove] = []
+        for folder_name in self.manager.scan_versions():
+            hot = folder_name in active or last_used.get(folder_name, 0.0) >= cutoff
+            tier = self.tier_of(folder_name)
+            if tier == "slow" and hot:
+                promote.append({"folder_name": folder_name, "to": "fast"})
+            elif tier == "fast" and not hot:
+                demote.append({"folder_name": folder_name, "to": "slow"})
+        return promote + demote
+
+    # -- Moving --
+
+    def _destination(self, folder_name: str, to: str) -> Path:
+        if to == "slow":
+            return self.slow_root / folder_name
+        shard = self.manager.shard_name(folder_name)
+        if self.manager.is_shard(shard):
+            return self.manager.versions_dir / shard / folder_name
+        return self.manager.versions_dir / folder_name
+
+    def move(self, folder_name: str, to: str) -> MoveResult | None:
+        """
+        Moves one version to the "fast" or "slow" root. Files changed while
+        copying are copied again under the write lock. Returns None if a
+        demotion was called off because the version got linked meanwhile,
+        or if the version was still being written after catching up.
+        """
+        started = time.perf_counter()
+        src = self.manager.version_path(folder_name)
+        dst = self._destination(folder_name, to)
+        staging = dst.with_name(folder_name + STAGING_SUFFIX)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.rmtree(staging, ignore_errors=True)
+        if to == "slow" and dst.is_dir():
+            # Leftover of an interrupted demotion; never used while src exists
+            shutil.rmtree(dst)
+
+        throttle = Throttle(self.settings["rate_mb"] * 1024 * 1024)
+        snapshot: dict[str, tuple[int, int]] = {}
+        try:
+            files, size = copy_verified(src, staging, throttle, snapshot)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        retired = src.with_name(folder_name + STAGING_SUFFIX)
+        relinked = 0
+        with self.manager.write_transaction() as changes:
+            links = [
+                link_name
+                for link_name, linked in self.manager.current_links().items()
+                if linked == folder_name
+            ]
+            if to == "slow" and links:
+                shutil.rmtree(staging, ignore_errors=True)
+                return None
+
+            # A linked version is written to while it is copied; the app's
+            # writes since then would be lost with the old copy. Catch up
+            # once, and call the move off if it is still being written.
+            try:
+                synced, _ = sync_changed(src, staging, snapshot)
+                if synced and tree_state(src) != snapshot:
+                    print(f"{folder_name} keeps changing; moving it later")
+                    shutil.rmtree(staging, ignore_errors=True)
+                    return None
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+
+            # From here until the old copy is retired both roots list it
+            os.rename(staging, dst)
+            changes.append(folder_name)
+            if to == "slow":
+                # Versions/ wins while it has the folder, so retire it first
+                os.rename(src, retired)
+            if links:
+                items = [(link_name, folder_name) for link_name in links]
+                results = self.manager.create_links(items, force=True)
+                relinked = sum(1 for result in results if result["ok"])
+            if to == "fast":
+                try:
+                    os.rename(src, retired)
+                except OSError as ex:
+                    # Still open by a program on Windows; the copy in
+                    # Versions/ is used from now on, delete this one later
+                    print(f"Failed to retire {src}: {ex}")
+                    retired = None
+
+        if retired is not None:
+            shutil.rmtree(retired, ignore_errors=True)
+
+        return {
+            "folder_name": folder_name,
+            "to": to,
+            "files": files,
+            "bytes": size,
+            "relinked": relinked,
+            "elapsed": time.perf_counter() - started,
+        }
+
+    def run(
+        self,
+        dry_run: bool = False,
+        on_progress: Callable[[int, int, str], None] | None = None,
+    ) -> list[MoveResult]:
+        """One pass: plans, then moves version by version. Failures are skipped."""
+        moves = self.plan()
+        if dry_run:
+            return [
+                {**move, "files": 0, "bytes": 0, "relinked": 0, "elapsed": 0.0}
+                for move in moves
+            ]
+
+        results: list[MoveResult] = []
+        for done, move in enumerate(moves, 1):
+            if self._stop.is_set():
+                break
+            try:
+                result = self.move(move["folder_name"], move["to"])
+            except OSError as ex:
+                print(
+                    f"Failed to move {move['folder_name']} to the {move['to']} root: {ex}"
+                )
+                result = None
+            if result is not None:
+                results.append(result)
+            if on_progress:
+                on_progress(done, len(moves), move["folder_name"])
+        return results
+
+    def start(self) -> None:
+        """Runs a pass every interval seconds, or soon after a cold version is linked."""
+        if not self.enabled or self._worker is not None:
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._worker = None
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.settings["interval"])
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.run()
+            except OSError as ex:
+                print(f"Tiering pass failed: {ex}")
@@ -2,6 +2,7 @@ import asyncio
 from typing import TypedDict
 import flet as ft
 
+from planner import apply_plan, plan_links
 from ui.utils import show_snack
 
 
@@ -25,16 +26,11 @@ class BatchLinkDialog:
             )
             return
 
-        # Filter for unlinked apps (no active version and no existing link)
-        unlinked_apps = []
-        for app_name in sorted(groups.keys()):
-            data = groups[app_name]
-            if data["active_version"] is None and data["link_name"] is None:
-                versions = data["versions"]
-                if versions:
-                    # Sort versions descending (newest first)
-                    sorted_versions = sorted(versions, reverse=True)
-                    unlinked_apps.append((app_name, sorted_versions))
+        # Unlinked apps (no entry in Persists/), newest version first
+        unlinked_apps = [
+            (group.name, group.versions_desc)
+            for group in groups.iter_groups(linked=False, active=False, min_versions=1)
+        ]
 
         if not unlinked_apps:
             await show_snack(
@@ -95,33 +91,34 @@ class BatchLinkDialog:
 
         async def execute_batch(e):
             close_dialog()
-            success_count = 0
-            fail_count = 0
-
-            await show_snack(self.page, "Processing batch links...", ft.Colors.BLUE)
-
-            for app_name, controls in batch_controls.items():
-                if controls["checkbox"].value:
-                    version = controls["dropdown"].value
-                    try:
-                        await asyncio.sleep(0.01)
-                        self.manager.create_link(app_name, version, force=True)
-                        success_count += 1
-                    except Exception as ex:
-                        print(f"Failed to link {app_name}: {ex}")
-                        fail_count += 1
+            await show_snack(
+                self.page, "Processing batch links...", ft.Colors.BLUE, key="batch"
+            )
+
+            requests = {
+                app_name: controls["dropdown"].value
+                for app_name, controls in batch_controls.items()
+                if controls["checkbox"].value and controls["dropdown"].value
+            }
+            plan = plan_links(self.manager, requests)
+            success_count, fail_count = await asyncio.to_thread(
+                apply_plan, self.manager, plan
+            )
+            fail_count += plan.count("skip")
 
             if fail_count > 0:
                 await show_snack(
                     self.page,
                     f"Linked {success_count} apps. Failed: {fail_count}",
                     ft.Colors.ORANGE,
+                    key="batch",
                 )
             else:
                 await show_snack(
                     self.page,
                     f"Successfully linked {success_count} apps!",
                     ft.Colors.GREEN,
+                    key="batch",
                 )
 
             if self.on_success:
@@ -0,0 +1,61 @@
+import flet as ft
+
+
+def show_clone_dialog(page: ft.Page, versions: list[str], on_confirm):
+    """
+    Asks for the source version (newest first) and the new folder name,
+    then runs on_confirm(source, folder_name).
+    """
+    source = ft.Dropdown(
+        label="Clone from",
+        options=[ft.dropdown.Option(v) for v in versions],
+        value=versions[0],
+        width=400,
+    )
+    folder_name = ft.TextField(label="New version folder", value=versions[0], width=400)
+
+    def on_source_change(e):
+        folder_name.value = source.value
+        folder_name.update()
+
+    source.on_change = on_source_change
+
+    def close_dialog(e=None):
+        page.close(dialog)  # type: ignore[attr-defined]
+
+    async def confirm(e):
+        if not folder_name.value or folder_name.value == source.value:
+            folder_name.error_text = "Choose a new folder name"
+            folder_name.update()
+            return
+        close_dialog()
+        await on_confirm(source.value, folder_name.value.strip())
+
+    dialog = ft.AlertDialog(
+        modal=True,
+        title=ft.Text("Clone Version"),
+        content=ft.Column(
+            controls=[
+                ft.Text(
+                    "Unchanged files are shared with the source until either version is linked.",
+                    size=12,
+                    color=ft.Colors.GREY_700,
+                ),
+                source,
+                folder_name,
+            ],
+            tight=True,
+            spacing=10,
+        ),
+        actions=[
+            ft.TextButton("Cancel", on_click=close_dialog),
+            ft.ElevatedButton(
+                "Clone",
+                on_click=confirm,
+                bgcolor=ft.Colors.BLUE,
+                color=ft.Colors.WHITE,
+            ),
+        ],
+        actions_alignment=ft.MainAxisAlignment.END,
+    )
+    page.open(dialog)  # type: ignore[attr-defined]
@@ -0,0 +1,32 @@
+# Versions shown on a collapsed card (in addition to the active/selected one)
+COLLAPSED_VERSION_COUNT = 3
+
+
+def visible_versions(
+    versions_desc: list[str],
+    active_version: str | None,
+    selected_version: str | None,
+    expanded: bool,
+) -> list[str]:
+    """
+    Versions to build rows for, newest first. Collapsed cards keep the newest
+    few plus the active and selected versions, so state is never hidden.
+    """
+    if expanded or len(versions_desc) <= COLLAPSED_VERSION_COUNT:
+        return versions_desc
+    pinned = {active_version, selected_version}
+    return [
+        v
+        for i, v in enumerate(versions_desc)
+        if i < COLLAPSED_VERSION_COUNT or v in pinned
+    ]
+
+
+def toggle_label(total: int, shown: int, expanded: bool) -> str | None:
+    """Text of the card's expand/collapse button, or None if it has none."""
+    hidden = total - shown
+    if hidden:
+        return f"Show {hidden} more"
+    if expanded and total > COLLAPSED_VERSION_COUNT:
+        return "Show less"
+    return None
@@ -1,6 +1,11 @@
+from collections.abc import Mapping, Sequence
+
 import flet as ft
 
+from metadata import VersionMetadata, describe
 from state import AppState
+from ui.collapse import toggle_label, visible_versions
+from usage import format_age
 
 
 class VersionRow(ft.Container):
@@ -12,10 +17,12 @@ class VersionRow(ft.Container):
         is_selected: bool,
         on_toggle_select,
         on_link_click,
+        detail: str = "",
     ):
         super().__init__()
         self.app_name = app_name
         self.version = version
+        self.detail = detail
         self.is_active = is_active
         self.is_selected = is_selected
 
@@ -91,6 +98,12 @@ class VersionRow(ft.Container):
                             else ft.Colors.GREY_700,
                             weight=ft.FontWeight.NORMAL,
                         ),
+                        ft.Text(
+                            self.detail,
+                            size=11,
+                            color=ft.Colors.GREY_500,
+                            visible=bool(self.detail),
+                        ),
                     ],
                     spacing=10,
                 ),
@@ -105,12 +118,16 @@ class AppCard(ft.Container):
     def __init__(
         self,
         app_name: str,
-        versions: list[str],
+        versions: Sequence[str],
         active_version: str | None,
         link_name: str | None,
         app_state: AppState,
         on_link_version,
         on_open_folder=None,
+        on_verify=None,
+        on_clone=None,
+        metadata: Mapping[str, VersionMetadata] | None = None,
+        last_used: Mapping[str, float] | None = None,
     ):
         super().__init__()
         self.app_name = app_name
@@ -120,6 +137,10 @@ class AppCard(ft.Container):
         self.app_state = app_state
         self.on_link_version = on_link_version
         self.on_open_folder = on_open_folder
+        self.on_verify = on_verify
+        self.on_clone = on_clone
+        self.metadata = metadata or {}
+        self.last_used = last_used or {}
 
         self.padding = 10
         self.border = ft.Border.all(1, ft.Colors.GREY_300)
@@ -138,6 +159,28 @@ class AppCard(ft.Container):
         if self.on_open_folder:
             await self.on_open_folder(self.app_name)
 
+    def _handle_expand_click(self, e):
+        # Only this card is rebuilt; the state outlives grid refreshes
+        self.app_state.set_expanded(
+            self.app_name, not self.app_state.is_expanded(self.app_name)
+        )
+        self.content = self._build_content()
+        self.update()
+
+    async def _handle_verify_click(self, e):
+        if self.on_verify:
+            await self.on_verify(self.app_name)
+
+    async def _handle_clone_click(self, e):
+        if self.on_clone:
+            await self.on_clone(self.app_name)
+
+    def _detail(self, version: str) -> str:
+        parts = [describe(self.metadata.get(version))]
+        if version in self.last_used:
+            parts.append(format_age(self.last_used[version]))
+        return " · ".join(p for p in parts if p)
+
     def _build_content(self):
         # Header Parts
         header_left = ft.Row(
@@ -154,11 +197,38 @@ class AppCard(ft.Container):
             vertical_alignment=ft.CrossAxisAlignment.CENTER,
         )
 
-        # Header Right (Folder Icon if linked)
+        # Header Right (Clone, plus Verify + Folder Icons if linked)
         header_right = ft.Container()  # Empty by default
+        buttons: list[ft.Control] = []
+        if self.versions and self.on_clone:
+            buttons.append(
+                ft.IconButton(
+                    icon=ft.Icons.CONTENT_COPY,
+                    tooltip="Clone a version to stage a new one",
+                    on_click=self._handle_clone_click,
+                    icon_size=18,
+                    icon_color=ft.Colors.GREY_600,
+                    style=ft.ButtonStyle(padding=0),
+                    width=24,
+                    height=24,
+                )
+            )
         if self.link_name:
-            header_right = ft.Container(
-                content=ft.IconButton(
+            if self.active_version and self.on_verify:
+                buttons.append(
+                    ft.IconButton(
+                        icon=ft.Icons.VERIFIED_USER_OUTLINED,
+                        tooltip="Verify active version against its fingerprint",
+                        on_click=self._handle_verify_click,
+                        icon_size=18,
+                        icon_color=ft.Colors.GREY_600,
+                        style=ft.ButtonStyle(padding=0),
+                        width=24,
+                        height=24,
+                    )
+                )
+            buttons.append(
+                ft.IconButton(
                     icon=ft.Icons.FOLDER_OPEN,
                     tooltip="Open installation folder",
                     on_click=self._handle_folder_click,
@@ -167,7 +237,11 @@ class AppCard(ft.Container):
                     style=ft.ButtonStyle(padding=0),
                     width=24,
                     height=24,
-                ),
+                )
+            )
+        if buttons:
+            header_right = ft.Container(
+                content=ft.Row(controls=buttons, spacing=4),
                 margin=ft.margin.only(right=4),
             )
 
@@ -183,8 +257,8 @@ class AppCard(ft.Container):
 
         rows: list[ft.Control] = []
 
-        # Sort versions descending
-        sorted_versions = sorted(self.versions, reverse=True)
+        # Versions arrive oldest first; show newest first
+        sorted_versions = list(reversed(self.versions))
 
         if not self.versions:
             # Empty state
@@ -198,9 +272,15 @@ class AppCard(ft.Container):
                 )
             )
         else:
-            for v in sorted_versions:
+            selected = self.app_state.get_selected(self.app_name)
+            expanded = self.app_state.is_expanded(self.app_name)
+            shown = visible_versions(
+                sorted_versions, self.active_version, selected, expanded
+            )
+
+            for v in shown:
                 is_active = v == self.active_version
-                is_selected = self.app_state.get_selected(self.app_name) == v
+                is_selected = selected == v
 
                 rows.append(
                     VersionRow(
@@ -212,6 +292,19 @@ class AppCard(ft.Container):
                             self.app_name, v
                         ),
                         on_link_click=self._handle_link_click,
+                        detail=self._detail(v),
+                    )
+                )
+
+            label = toggle_label(len(sorted_versions), len(shown), expanded)
+            if label is not None:
+                hidden = len(sorted_versions) > len(shown)
+                rows.append(
+                    ft.TextButton(
+                        label,
+                        icon=ft.Icons.EXPAND_MORE if hidden else ft.Icons.EXPAND_LESS,
+                        on_click=self._handle_expand_click,
+                        style=ft.ButtonStyle(color=ft.Colors.GREY_600),
                     )
                 )
 
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+# Snack bars added to page.overlay, ever. Two let a new message open while
+# the previous one is still animating out.
+POOL_SIZE = 2
+# Keyed updates (batch progress) closer together than this are coalesced
+MIN_INTERVAL = 0.25
+
+
+class NotificationManager:
+    """
+    Shows messages through a fixed pool of snack bars that are added to
+    page.overlay once and then reused, so the overlay and the client-side
+    control tree stay the same size however many messages a session shows.
+
+    Messages may carry a key. A new message with the key of the visible
+    one updates it in place instead of taking another snack bar. With
+    throttle, keyed messages arriving faster than min_interval are held
+    back and only the latest is shown once the interval is over, so a
+    batch reports "Linked 40/200" rather than 200 separate snacks.
+
+    Must be used from the page's event loop; create_snack returns a new
+    control with a .content Text, .bgcolor and .open.
+    """
+
+    def __init__(
+        self,
+        page: Any,
+        create_snack: Callable[[], Any],
+        pool_size: int = POOL_SIZE,
+        min_interval: float = MIN_INTERVAL,
+    ):
+        self.page = page
+        self.create_snack = create_snack
+        self.pool_size = pool_size
+        self.min_interval = min_interval
+        self._pool: deque = deque()
+        # id(snack) -> key of the message it shows
+        self._keys: dict[int, str | None] = {}
+        self._last_shown: dict[str, float] = {}
+        # key -> (message, color) waiting for its interval to pass
+        self._pending: dict[str, tuple[str, str | None]] = {}
+        self._flush_scheduled = False
+
+    def _ensure_pool(self) -> None:
+        if self._pool:
+            return
+        for _ in range(self.pool_size):
+            snack = self.create_snack()
+            self.page.overlay.append(snack)
+            self._pool.append(snack)
+
+    def _snack_for(self, key: str | None):
+        """The snack showing key if it is still open, else the least recently used."""
+        if key is not None:
+            for snack in self._pool:
+                if snack.open and self._keys.get(id(snack)) == key:
+                    return snack
+        snack = self._pool.popleft()
+        self._pool.append(snack)
+        return snack
+
+    def _render(self, message: str, color: str | None, key: str | None) -> None:
+        self._ensure_pool()
+        snack = self._snack_for(key)
+        snack.content.value = message
+        snack.bgcolor = color
+        snack.open = True
+        self._keys[id(snack)] = key
+        if key is not None:
+            self._last_shown[key] = time.monotonic()
+        self.page.update()
+
+    def notify(
+        self,
+        message: str,
+        color: str | None = None,
+        key: str | None = None,
+        throttle: bool = False,
+    ) -> bool:
+        """Shows a message. Returns False if it was held back for coalescing."""
+        if key is not None:
+            # A newer message for the key supersedes any held-back one
+            self._pending.pop(key, None)
+            if throttle:
+                waited = time.monotonic() - self._last_shown.get(key, float("-inf"))
+                if waited < self.min_interval:
+                    self._pending[key] = (message, color)
+                    self._schedule_flush(self.min_interval - waited)
+                    return False
+        self._render(message, color, key)
+        return True
+
+    def progress(self, key: str, done: int, total: int, label: str = "Linked") -> bool:
+        """Throttled "<label> done/total"; the last step is always shown."""
+        return self.notify(f"{label} {done}/{total}", key=key, throttle=done < total)
+
+    def flush(self) -> None:
+        """Shows the held-back message of every key now."""
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, {}
+        for key, (message, color) in pending.items():
+            self._render(message, color, key)
+
+    def _schedule_flush(self, delay: float) -> None:
+        if self._flush_scheduled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop (e.g. tests): shown by the next notify() or flush()
+            return
+        self._flush_scheduled = True
+        loop.call_later(delay, self.flush)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
@@ -0,0 +1,66 @@
+import flet as ft
+
+from planner import LinkPlan
+
+ACTION_ICONS = {
+    "create": (ft.Icons.ADD_LINK, ft.Colors.GREEN),
+    "retarget": (ft.Icons.SWAP_HORIZ, ft.Colors.BLUE),
+    "replace_directory": (ft.Icons.WARNING_AMBER, ft.Colors.ORANGE),
+    "skip": (ft.Icons.BLOCK, ft.Colors.GREY_500),
+}
+
+
+def show_plan_dialog(page: ft.Page, plan: LinkPlan, on_confirm):
+    """
+    Shows every change a plan will make and runs on_confirm() if accepted.
+    No-op steps are summarized, not listed.
+    """
+    rows: list[ft.Control] = []
+    for step in plan.steps:
+        if step["action"] == "noop":
+            continue
+        icon, color = ACTION_ICONS[step["action"]]
+        detail = f"{step['current'] or '-'} → {step['target']}"
+        if step["note"]:
+            detail += f"  ({step['note']})"
+        rows.append(
+            ft.Row(
+                controls=[
+                    ft.Icon(icon, size=16, color=color),
+                    ft.Text(step["link_name"], weight=ft.FontWeight.BOLD, size=13),
+                    ft.Text(detail, size=12, color=ft.Colors.GREY_700, expand=True),
+                ],
+                spacing=8,
+            )
+        )
+
+    def close_dialog(e=None):
+        page.close(dialog)  # type: ignore[attr-defined]
+
+    async def confirm(e):
+        close_dialog()
+        await on_confirm()
+
+    dialog = ft.AlertDialog(
+        modal=True,
+        title=ft.Text(f"Link Plan: {plan.summary()}"),
+        content=ft.Column(
+            controls=rows,
+            scroll=ft.ScrollMode.AUTO,
+            spacing=6,
+            height=min(400, 30 * len(rows) + 10),
+            width=560,
+        ),
+        actions=[
+            ft.TextButton("Cancel", on_click=close_dialog),
+            ft.ElevatedButton(
+                f"Apply {len(plan.changes)} Changes",
+                on_click=confirm,
+                disabled=not plan.changes,
+                bgcolor=ft.Colors.BLUE,
+                color=ft.Colors.WHITE,
+            ),
+        ],
+        actions_alignment=ft.MainAxisAlignment.END,
+    )
+    page.open(dialog)  # type: ignore[attr-defined]
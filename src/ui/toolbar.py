@@ -5,13 +5,23 @@ from state import AppState
 
 class PivotToolbar(ft.Container):
     def __init__(
-        self, page: ft.Page, app_state: AppState, on_link_action, on_select_latest
+        self,
+        page: ft.Page,
+        app_state: AppState,
+        on_link_action,
+        on_select_latest,
+        get_profile_names=None,
+        on_apply_profile=None,
+        on_save_profile=None,
     ):
         super().__init__()
         self.app_page = page
         self.app_state = app_state
         self.on_link_action = on_link_action
         self.on_select_latest = on_select_latest
+        self.get_profile_names = get_profile_names
+        self.on_apply_profile = on_apply_profile
+        self.on_save_profile = on_save_profile
 
         self.padding = 10
         self.bgcolor = ft.Colors.WHITE
@@ -26,6 +36,40 @@ class PivotToolbar(ft.Container):
         if self.on_link_action:
             await self.on_link_action()
 
+    async def _handle_apply_profile(self, e):
+        if self.on_apply_profile:
+            await self.on_apply_profile(e.control.data)
+
+    async def _handle_save_profile(self, e):
+        if self.on_save_profile:
+            await self.on_save_profile()
+
+    def _build_profiles_menu(self) -> ft.Control:
+        names = self.get_profile_names() if self.get_profile_names else []
+
+        items: list[ft.PopupMenuItem] = [
+            ft.PopupMenuItem(
+                content=ft.Text(f"Apply '{name}'"),
+                data=name,
+                on_click=self._handle_apply_profile,
+            )
+            for name in names
+        ]
+        if items:
+            items.append(ft.PopupMenuItem())  # Divider
+        items.append(
+            ft.PopupMenuItem(
+                content=ft.Text("Save current links as profile..."),
+                on_click=self._handle_save_profile,
+            )
+        )
+
+        return ft.PopupMenuButton(
+            icon=ft.Icons.BOOKMARKS_OUTLINED,
+            tooltip="Profiles",
+            items=items,
+        )
+
     def _build_content(self):
         count = len(self.app_state.selected_versions)
 
@@ -40,6 +84,8 @@ class PivotToolbar(ft.Container):
                     controls=[
                         ft.Row(
                             controls=[
+                                self._build_profiles_menu(),
+                                ft.VerticalDivider(width=1, color=ft.Colors.GREY_300),
                                 ft.TextButton(
                                     "Select Latest",
                                     icon=ft.Icons.AUTO_MODE,
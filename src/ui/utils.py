@@ -3,12 +3,34 @@ import subprocess
 import platform
 from pathlib import Path
 
+from ui.notifications import NotificationManager
 
-async def show_snack(page: ft.Page, message: str, color: str | None = None):
-    snack = ft.SnackBar(ft.Text(message), bgcolor=color)
-    page.overlay.append(snack)
-    snack.open = True
-    page.update()
+# One manager (and snack bar pool) per page, keyed by id(page)
+_notifiers: dict[int, NotificationManager] = {}
+
+
+def notifier(page: ft.Page) -> NotificationManager:
+    manager = _notifiers.get(id(page))
+    if manager is None:
+        manager = _notifiers[id(page)] = NotificationManager(
+            page, lambda: ft.SnackBar(ft.Text(""))
+        )
+    return manager
+
+
+def release_notifier(page: ft.Page) -> None:
+    """Drops a closed page's manager (and with it the page)."""
+    _notifiers.pop(id(page), None)
+
+
+async def show_snack(
+    page: ft.Page, message: str, color: str | None = None, key: str | None = None
+):
+    notifier(page).notify(message, color, key)
+
+
+async def show_progress(page: ft.Page, key: str, done: int, total: int):
+    notifier(page).progress(key, done, total)
 
 
 def reveal_in_explorer(path: Path):
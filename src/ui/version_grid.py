@@ -1,15 +1,42 @@
+import asyncio
+
 import flet as ft
 
+from clone import VersionCloner
+from locking import StaleStateError
+from metadata import order_versions
+from snapshot import ScanSnapshot, SnapshotDelta
 from state import AppState
+from ui.clone_dialog import show_clone_dialog
 from ui.components import AppCard
 from ui.utils import show_snack, reveal_in_explorer
 
 
 class VersionGrid(ft.Column):
-    def __init__(self, page: ft.Page, manager, app_state: AppState):
+    def __init__(
+        self,
+        page: ft.Page,
+        manager,
+        app_state: AppState,
+        fingerprints=None,
+        metadata_store=None,
+        usage=None,
+        hub=None,
+    ):
         self.app_page = page
         self.manager = manager
         self.app_state = app_state
+        self.fingerprints = fingerprints
+        self.metadata_store = metadata_store
+        # Last known metadata per folder; the cache is shown until a refresh lands
+        self.metadata = metadata_store.cached() if metadata_store else {}
+        # UsageTracker; {folder_name: last use}, reloaded with the data
+        self.usage = usage
+        self.last_used: dict[str, float] = {}
+        # hub.SessionHub shared with other sessions: reads come from its
+        # snapshot, writes queue on its writer and changes arrive as deltas
+        self.hub = hub
+        self._cards: dict[str, AppCard] = {}
 
         self.grid = ft.ResponsiveRow(spacing=10, run_spacing=10)
 
@@ -26,7 +53,15 @@ class VersionGrid(ft.Column):
     async def on_link_version(self, app_name: str, folder_name: str):
         """Direct link action from a specific row (bypasses batch)"""
         try:
-            self.manager.create_link(app_name, folder_name, force=True)
+            # Reject the click if another process changed Persists/ meanwhile.
+            # Off the event loop: a cached link may copy files first.
+            await self.run_write(
+                self.manager.create_link,
+                app_name,
+                folder_name,
+                force=True,
+                expected_generation=self.groups.generation,
+            )
 
             # If this app was selected for batch, deselect it since it's now handled
             self.app_state.deselect(app_name)
@@ -34,13 +69,35 @@ class VersionGrid(ft.Column):
             await show_snack(
                 self.app_page, f"Linked {app_name} -> {folder_name}", ft.Colors.GREEN
             )
-            await self.refresh_data()
+            await self.reload_after_write()
+
+        except StaleStateError:
+            await show_snack(
+                self.app_page,
+                "Links were changed by another Pivot instance. Refreshed, please retry.",
+                ft.Colors.ORANGE,
+            )
+            await self.reload_after_write()
 
         except Exception as ex:
             await show_snack(
                 self.app_page, f"Failed to link {app_name}: {ex}", ft.Colors.ERROR
             )
 
+    async def run_write(self, fn, *args, **kwargs):
+        """
+        Runs a write off the event loop; with a hub, behind the writes of
+        every other session.
+        """
+        if self.hub is not None:
+            return await asyncio.wrap_future(self.hub.submit(fn, *args, **kwargs))
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def reload_after_write(self):
+        """Hub sessions get the change as a delta like everyone else."""
+        if self.hub is None:
+            await self.refresh_data()
+
     async def on_open_folder(self, app_name: str):
         """Opens the Persists folder for the given app."""
         if not hasattr(self, "groups") or app_name not in self.groups:
@@ -57,39 +114,192 @@ class VersionGrid(ft.Column):
             # Should not happen since button is hidden if unlinked, but fallback just in case
             pass
 
+    async def on_verify(self, app_name: str):
+        """Verifies the active version of an app against its recorded fingerprint."""
+        if self.fingerprints is None or app_name not in self.groups:
+            return
+
+        folder_name = self.groups[app_name]["active_version"]
+        if not folder_name:
+            return
+
+        try:
+            if not self.fingerprints.has_baseline(folder_name):
+                await asyncio.to_thread(self.fingerprints.record, folder_name)
+                await show_snack(
+                    self.app_page,
+                    f"No fingerprint for {folder_name} yet, recorded one now",
+                    ft.Colors.BLUE,
+                )
+                return
+
+            await show_snack(
+                self.app_page, f"Verifying {folder_name}...", ft.Colors.BLUE
+            )
+            result = await asyncio.to_thread(self.fingerprints.verify, folder_name)
+        except (OSError, ValueError) as ex:
+            await show_snack(
+                self.app_page, f"Failed to verify {folder_name}: {ex}", ft.Colors.ERROR
+            )
+            return
+
+        if result["ok"]:
+            await show_snack(
+                self.app_page,
+                f"{folder_name} matches its fingerprint ({result['elapsed']:.1f}s)",
+                ft.Colors.GREEN,
+            )
+        else:
+            await show_snack(
+                self.app_page,
+                f"{folder_name} changed: {len(result['modified'])} modified, "
+                f"{len(result['removed'])} removed, {len(result['added'])} added",
+                ft.Colors.ORANGE,
+            )
+
+    async def on_clone(self, app_name: str):
+        """Stages a new version folder as a cheap clone of an existing one."""
+        if app_name not in self.groups:
+            return
+
+        async def clone(source: str, folder_name: str):
+            try:
+                result = await self.run_write(
+                    VersionCloner(self.manager).clone, source, folder_name
+                )
+            except (OSError, ValueError) as ex:
+                await show_snack(
+                    self.app_page, f"Failed to clone {source}: {ex}", ft.Colors.ERROR
+                )
+                return
+
+            await self.reload_after_write()
+            await show_snack(
+                self.app_page,
+                f"Created {folder_name} in {result['elapsed'] * 1000:.0f} ms "
+                f"({result['copied']} of {result['files']} files copied)",
+                ft.Colors.GREEN,
+            )
+
+        show_clone_dialog(
+            self.app_page, list(self.groups[app_name].versions_desc), clone
+        )
+
+    async def load_metadata(self):
+        """
+        Reads version manifests on a thread pool after the grid is shown,
+        then re-renders once with real versions, publishers and build dates.
+        """
+        if self.metadata_store is None or not hasattr(self, "groups"):
+            return
+        folders = [v for data in self.groups.values() for v in data.versions]
+        try:
+            if self.hub is not None:
+                # Read once for all sessions
+                future = self.hub.shared(
+                    "metadata", self.metadata_store.refresh, folders, None, True
+                )
+                self.metadata = await asyncio.wrap_future(future)
+            else:
+                self.metadata = await asyncio.to_thread(
+                    self.metadata_store.refresh, folders, None, True
+                )
+        except OSError as ex:
+            print(f"Failed to load version metadata: {ex}")
+            return
+        self.update_grid_ui()
+
+    def ordered_versions(self, app_name: str) -> list[str]:
+        """Versions of an app oldest first, by real version where known."""
+        return order_versions(self.groups[app_name].versions, self.metadata)
+
     async def refresh_data(self):
         """Full data reload from disk"""
         try:
-            self.groups = self.manager.get_grouped_versions()
+            if self.hub is not None:
+                self.groups = self.hub.groups()
+            else:
+                self.groups = self.manager.get_grouped_versions()
+            await self._load_last_used()
         except Exception as ex:
-            self.groups = {}
+            self.groups = ScanSnapshot.empty()
             await show_snack(
                 self.app_page, f"Error scanning versions: {ex}", ft.Colors.ERROR
             )
 
         self.update_grid_ui()
 
+    async def _load_last_used(self):
+        if self.usage is None:
+            return
+        if self.hub is not None:
+            future = self.hub.shared("last_used", self.usage.last_used)
+            self.last_used = await asyncio.wrap_future(future)
+        else:
+            self.last_used = self.usage.last_used()
+
+    async def apply_delta(self, snapshot: ScanSnapshot, delta: SnapshotDelta):
+        """
+        Takes a change pushed by the hub. Only the cards of changed apps are
+        rebuilt; the others keep their controls, so flet sends just the diff.
+        """
+        self.groups = snapshot
+        try:
+            await self._load_last_used()
+        except OSError as ex:
+            print(f"Failed to load usage: {ex}")
+
+        # Selections of removed apps, or that are now linked (here or in
+        # another session), are done
+        done = [name for name in delta["removed"] if self.app_state.get_selected(name)]
+        for app_name, data in delta["changed"].items():
+            selected = self.app_state.get_selected(app_name)
+            if selected is not None and selected == data["active_version"]:
+                done.append(app_name)
+        if done or not self._cards:
+            # Re-renders every card through the selection listener
+            with self.app_state.batch_updates():
+                for app_name in done:
+                    self.app_state.deselect(app_name)
+            return
+
+        for app_name in delta["removed"]:
+            self._cards.pop(app_name, None)
+        for app_name in delta["changed"]:
+            self._cards[app_name] = self._card(app_name)
+        self.grid.controls = [
+            self._cards[name] for name in snapshot if name in self._cards
+        ]
+        self.update()
+
+    def _card(self, app_name: str) -> AppCard:
+        data = self.groups[app_name]
+        return AppCard(
+            app_name=app_name,
+            versions=order_versions(data.versions, self.metadata),
+            active_version=data["active_version"],
+            link_name=data.get("link_name"),
+            app_state=self.app_state,
+            on_link_version=self.on_link_version,
+            on_open_folder=self.on_open_folder,
+            on_verify=self.on_verify if self.fingerprints else None,
+            on_clone=self.on_clone,
+            metadata=self.metadata,
+            last_used=self.last_used,
+        )
+
     def update_grid_ui(self):
         """Re-renders UI based on current data (self.groups) and selection state"""
         self.grid.controls.clear()
+        self._cards.clear()
 
         if not hasattr(self, "groups") or not self.groups:
             # Just empty or not loaded yet
             pass
         else:
-            sorted_apps = sorted(self.groups.keys())
-
-            for app_name in sorted_apps:
-                data = self.groups[app_name]
-                card = AppCard(
-                    app_name=app_name,
-                    versions=data["versions"],
-                    active_version=data["active_version"],
-                    link_name=data.get("link_name"),
-                    app_state=self.app_state,
-                    on_link_version=self.on_link_version,
-                    on_open_folder=self.on_open_folder,
-                )
-                self.grid.controls.append(card)
+            # Snapshot iterates app names in sorted order
+            for app_name in self.groups:
+                self._cards[app_name] = self._card(app_name)
+                self.grid.controls.append(self._cards[app_name])
 
         self.update()
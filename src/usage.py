@@ -0,0 +1,338 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import TypedDict
+
+from manager import VersionManager
+
+USAGE_FILE = "usage.json"
+
+# Link switches kept in the history; older ones only live on in the rollups
+MAX_HISTORY = 1000
+# Sampling caps: files stat'ed per version and wall time per sampling pass
+SAMPLE_FILES = 64
+SAMPLE_BUDGET = 0.05
+SAMPLE_INTERVAL = 300.0
+DAY = 86400
+
+
+class VersionUsage(TypedDict):
+    app: str  # Link name it was last linked as
+    switches: int  # Times it was linked
+    last_linked: float
+    last_used: float  # Newest access time seen while it was active; 0 if never
+
+
+class AppUsage(TypedDict):
+    versions: int  # Versions with usage records
+    switches: int
+    last_used: float
+    most_linked: str | None
+
+
+class UsageData(TypedDict):
+    versions: dict[str, VersionUsage]
+    # [timestamp, link_name, folder_name or None], oldest first
+    history: list[list]
+    # Per link name: relative path parts of the last file sampled, which the
+    # next sampling pass continues after; [] starts from the top
+    cursor: dict[str, list[str]]
+
+
+def _files_after(top: str, resume: list[str]) -> Iterator[str]:
+    """
+    Files under top in sorted top-down os.walk order (a folder's files,
+    then its subfolders), starting after the file at resume. Folders that
+    sort before resume are skipped without walking them.
+    """
+    try:
+        with os.scandir(top) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+    files: list[str] = []
+    dirs: list[str] = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if not is_dir:
+            files.append(entry.name)
+        elif not entry.is_symlink():
+            dirs.append(entry.name)
+
+    head, rest = (resume[0], resume[1:]) if resume else (None, [])
+    if head is None:
+        yield from (os.path.join(top, name) for name in files)
+    elif not rest:
+        yield from (os.path.join(top, name) for name in files if name > head)
+    # Otherwise resume lies in a subfolder and these files came before it
+    for name in dirs:
+        if rest and name < head:
+            continue
+        yield from _files_after(
+            os.path.join(top, name), rest if rest and name == head else []
+        )
+
+
+def _access_time(
+    version_dir: Path, limit: int, position: list[str]
+) -> tuple[float, list[str]]:
+    """
+    Newest atime among up to `limit` files of version_dir, starting after
+    the file at position. Returns (atime, next position; [] once the tree
+    is done). Top-level files come first: that is where executables usually are.
+    """
+    newest = 0.0
+    top = str(version_dir)
+    for seen, path in enumerate(_files_after(top, position), 1):
+        try:
+            newest = max(newest, os.stat(path).st_atime)
+        except OSError:
+            pass
+        if seen >= limit:
+            return newest, os.path.relpath(path, top).split(os.sep)
+    return newest, []
+
+
+def _new_usage(link_name: str) -> VersionUsage:
+    return {"app": link_name, "switches": 0, "last_linked": 0.0, "last_used": 0.0}
+
+
+def format_age(timestamp: float, now: float | None = None) -> str:
+    """ "used 3d ago" style age for the version rows."""
+    if not timestamp:
+        return "never used"
+    seconds = (now or time.time()) - timestamp
+    if seconds < 3600:
+        return "used just now"
+    if seconds < DAY:
+        return f"used {int(seconds // 3600)}h ago"
+    return f"used {int(seconds // DAY)}d ago"
+
+
+class UsageTracker:
+    """
+    Records which versions are actually used, in one small JSON file.
+
+    Link switches come from the manager's link listener and are saved once
+    per write, so a batch of links costs one rewrite of the file. Access times are
+    sampled from the files of active versions by a background thread; each
+    pass stats at most SAMPLE_FILES files per version and stops after
+    SAMPLE_BUDGET seconds, continuing where it left off on the next pass.
+    Filesystems mounted noatime (or NTFS with last-access updates off) only
+    report link switches.
+    """
+
+    def __init__(
+        self,
+        manager: VersionManager,
+        path: Path | None = None,
+        sample_files: int = SAMPLE_FILES,
+        budget: float = SAMPLE_BUDGET,
+    ):
+        self.manager = manager
+        self.path = path or manager.data_dir / USAGE_FILE
+        self.sample_files = sample_files
+        self.budget = budget
+        self._lock = threading.Lock()
+        # Switches not saved yet: [timestamp, link_name, folder_name]
+        self._pending: list[list] = []
+        self._stop = threading.Event()
+        self._worker: threading.Thread | None = None
+
+    # -- Store --
+
+    def load(self) -> UsageData:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        data.setdefault("versions", {})
+        data.setdefault("history", [])
+        data.setdefault("cursor", {})
+        return data
+
+    def _save(self, data: UsageData) -> None:
+        # Callers hold the write lock: the GUI sampler and CLI or daemon
+        # flushes run in different processes and merge into the same file
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            # Compact: thousands of history entries stay a few dozen KB
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    # -- Link Switches --
+
+    def attach(self) -> None:
+        self.manager.add_link_listener(self.record_switch)
+        self.manager.add_flush_listener(self.flush)
+
+    def record_switch(
+        self, link_name: str, folder_name: str | None, now: float | None = None
+    ) -> None:
+        """Buffers a switch; flush() saves it (the manager calls it per write)."""
+        with self._lock:
+            self._pending.append([now or time.time(), link_name, folder_name])
+
+    def flush(self) -> None:
+        """Saves the buffered switches in one rewrite of the file."""
+        if not self._pending:
+            return
+        with self.manager.write_transaction(), self._lock:
+            data = self.load()
+            for entry in self._pending:
+                _, link_name, folder_name = entry
+                data["history"].append(entry)
+                if folder_name is not None:
+                    usage = data["versions"].setdefault(
+                        folder_name, _new_usage(link_name)
+                    )
+                    usage["app"] = link_name
+                    usage["switches"] += 1
+                    usage["last_linked"] = entry[0]
+            del data["history"][:-MAX_HISTORY]
+            self._save(data)
+            self._pending.clear()
+
+    # -- Sampling --
+
+    def sample(self) -> int:
+        """
+        One capped pass over the active versions. Returns the versions whose
+        last_used moved forward.
+        """
+        deadline = time.perf_counter() + self.budget
+        active = sorted(
+            (link_name, folder_name)
+            for link_name, folder_name in self.manager.current_links().items()
+            if folder_name
+        )
+        with self._lock:
+            data = self.load()
+        cursor = data["cursor"]
+
+        updated = 0
+        for link_name, folder_name in active:
+            if time.perf_counter() > deadline:
+                break
+            atime, cursor[link_name] = _access_time(
+                self.manager.link_source(folder_name),
+                self.sample_files,
+                cursor.get(link_name, []),
+            )
+            usage = data["versions"].setdefault(folder_name, _new_usage(link_name))
+            if atime > usage["last_used"]:
+                usage["last_used"] = atime
+                updated += 1
+
+        with self.manager.write_transaction(), self._lock:
+            # Switches recorded meanwhile win; only merge what was sampled
+            latest = self.load()
+            for folder_name, usage in data["versions"].items():
+                current = latest["versions"].setdefault(folder_name, usage)
+                current["last_used"] = max(current["last_used"], usage["last_used"])
+            latest["cursor"] = cursor
+            self._save(latest)
+        return updated
+
+    def start(self, interval: float = SAMPLE_INTERVAL) -> None:
+        """Samples every interval seconds on a daemon thread."""
+        if self._worker is not None:
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._worker = None
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.sample()
+            except OSError as ex:
+                print(f"Usage sampling failed: {ex}")
+
+    # -- Queries --
+
+    def last_used(self) -> dict[str, float]:
+        """{folder_name: last use}, the sampled access time or else the last link."""
+        return {
+            folder_name: max(usage["last_used"], usage["last_linked"])
+            for folder_name, usage in self.load()["versions"].items()
+        }
+
+    def unused(self, days: float, now: float | None = None) -> list[str]:
+        """
+        Version folders not used for `days`, least recently used first.
+        Versions never seen by the tracker count as unused; active ones never do.
+        """
+        cutoff = (now or time.time()) - days * DAY
+        last_used = self.last_used()
+        active = {f for f in self.manager.current_links().values() if f}
+        candidates = [
+            folder_name
+            for folder_name in self.manager.scan_versions()
+            if folder_name not in active and last_used.get(folder_name, 0.0) < cutoff
+        ]
+        return sorted(candidates, key=lambda f: (last_used.get(f, 0.0), f))
+
+    def rollups(self) -> dict[str, AppUsage]:
+        """Per link name totals over the recorded versions."""
+        apps: dict[str, AppUsage] = {}
+        best: dict[str, int] = {}
+        for folder_name, usage in self.load()["versions"].items():
+            app = apps.setdefault(
+                usage["app"],
+                {"versions": 0, "switches": 0, "last_used": 0.0, "most_linked": None},
+            )
+            app["versions"] += 1
+            app["switches"] += usage["switches"]
+            app["last_used"] = max(
+                app["last_used"], usage["last_used"], usage["last_linked"]
+            )
+            if usage["switches"] > best.get(usage["app"], -1):
+                best[usage["app"]] = usage["switches"]
+                app["most_linked"] = folder_name
+        return apps
+
+    def rolled_back(self, rank: Mapping[str, int]) -> set[str]:
+        """
+        Versions the user switched away from to an older version of the same
+        link, i.e. tried and rejected, until they are linked again.
+        rank orders folder names oldest first (e.g. by manifest version).
+        """
+        rejected: set[str] = set()
+        previous: dict[str, str] = {}
+        for _, link_name, folder_name in self.load()["history"]:
+            if folder_name is None:
+                continue
+            before = previous.get(link_name)
+            if (
+                before in rank
+                and folder_name in rank
+                and rank[folder_name] < rank[before]
+            ):
+                rejected.add(before)
+            rejected.discard(folder_name)
+            previous[link_name] = folder_name
+        return rejected
+
+
+def preferred_version(versions: list[str], rejected: set[str]) -> str:
+    """
+    Newest of versions (oldest first) that was not rolled back from, so
+    "Select Latest" does not keep offering a version the user backed out of.
+    """
+    for folder_name in reversed(versions):
+        if folder_name not in rejected:
+            return folder_name
+    return versions[-1]
@@ -0,0 +1,12 @@
+import pytest
+
+from manager import VersionManager
+
+
+@pytest.fixture
+def vm(tmp_path):
+    """VersionManager pointed at an isolated Versions/ + Persists/ tree."""
+    manager = VersionManager(root=tmp_path)
+    manager.versions_dir.mkdir()
+    manager.persists_dir.mkdir()
+    return manager
@@ -0,0 +1,140 @@
+import os
+import stat
+
+import cache as cache_module
+from cache import LocalCache, save_settings
+from planner import plan_links
+
+
+def make_cache(vm, tmp_path, budget, compare="mtime"):
+    settings_path = tmp_path / "cache.json"
+    save_settings(
+        {
+            "enabled": True,
+            "root": str(tmp_path / "local"),
+            "budget_bytes": budget,
+            "compare": compare,
+            "workers": 2,
+        },
+        settings_path,
+    )
+    cache = LocalCache(vm, settings_path=settings_path)
+    cache.attach()
+    return cache
+
+
+def make_version(vm, folder_name, files):
+    version_dir = vm.versions_dir / folder_name
+    for relpath, data in files.items():
+        (version_dir / relpath).parent.mkdir(parents=True, exist_ok=True)
+        (version_dir / relpath).write_bytes(data)
+
+
+def test_link_points_at_synced_local_copy(vm, tmp_path):
+    make_version(vm, "Nodejs-16.0.0", {"node": b"x" * 100, "lib/a.js": b"a"})
+    cache = make_cache(vm, tmp_path, budget=10_000)
+
+    vm.create_link("Nodejs", "Nodejs-16.0.0")
+
+    link = vm.persists_dir / "Nodejs"
+    assert os.path.realpath(link) == str(
+        (tmp_path / "local" / "Nodejs-16.0.0").resolve()
+    )
+    assert (link / "lib" / "a.js").read_bytes() == b"a"
+    # Still grouped as the Versions/ folder it mirrors
+    assert vm.get_grouped_versions()["Nodejs"].active_version == "Nodejs-16.0.0"
+
+    # Only the changed file is copied again; removed files disappear
+    (vm.versions_dir / "Nodejs-16.0.0" / "lib" / "a.js").write_bytes(b"changed")
+    (vm.versions_dir / "Nodejs-16.0.0" / "node").unlink()
+    result = cache.sync("Nodejs-16.0.0")
+    assert (result["copied"], result["removed"], result["unchanged"]) == (1, 1, 0)
+    assert (link / "lib" / "a.js").read_bytes() == b"changed"
+    assert cache.sync("Nodejs-16.0.0")["copied"] == 0
+
+
+def test_lru_eviction_keeps_active_versions(vm, tmp_path):
+    for name in ("Nodejs-14.0.0", "Nodejs-16.0.0", "copyq-7.1.0"):
+        make_version(vm, name, {"data": b"x" * 400})
+    make_version(vm, "Huge-1.0", {"data": b"x" * 2000})
+    cache = make_cache(vm, tmp_path, budget=1000)
+
+    vm.create_link("CopyQ", "copyq-7.1.0")
+    vm.create_link("Nodejs", "Nodejs-14.0.0")
+    vm.create_link("Nodejs", "Nodejs-16.0.0", force=True)
+
+    # 14.0.0 was the least recently used inactive copy
+    assert sorted(cache.entries()) == ["Nodejs-16.0.0", "copyq-7.1.0"]
+
+    # Larger than the budget: linked straight to Versions/
+    vm.create_link("Huge", "Huge-1.0")
+    assert os.path.realpath(vm.persists_dir / "Huge") == str(
+        (vm.versions_dir / "Huge-1.0").resolve()
+    )
+    assert sorted(cache.entries()) == ["Nodejs-16.0.0", "copyq-7.1.0"]
+
+
+def test_links_to_versions_are_not_replanned(vm, tmp_path):
+    make_version(vm, "Huge-1.0", {"data": b"x" * 2000})
+    make_cache(vm, tmp_path, budget=1000)
+
+    # Over budget: linked to Versions/, which still counts as up to date
+    vm.create_link("Huge", "Huge-1.0")
+    assert plan_links(vm, {"Huge": "Huge-1.0"}).summary() == "1 noop"
+
+
+def test_sync_keeps_old_link_and_permission_bits(vm, tmp_path):
+    make_version(vm, "git-2.40", {"git": b"a"})
+    make_version(vm, "git-2.41", {"git": b"b"})
+    (vm.versions_dir / "git-2.41" / "git").chmod(0o755)
+    cache = make_cache(vm, tmp_path, budget=10_000)
+    vm.create_link("git", "git-2.40")
+
+    prepare = cache.prepare
+    seen = []
+
+    def checked_prepare(folder_names):
+        # The old link is only replaced once the new copy is ready
+        seen.append((vm.persists_dir / "git" / "git").read_bytes())
+        return prepare(folder_names)
+
+    cache.prepare = checked_prepare
+    vm.create_link("git", "git-2.41", force=True)
+    assert seen == [b"a"]
+
+    copy = tmp_path / "local" / "git-2.41" / "git"
+    assert stat.S_IMODE(copy.stat().st_mode) == 0o755
+    # A mode change alone is synced too
+    (vm.versions_dir / "git-2.41" / "git").chmod(0o700)
+    assert cache.sync("git-2.41")["copied"] == 1
+    assert stat.S_IMODE(copy.stat().st_mode) == 0o700
+
+
+def test_hash_mode_reads_the_share_only_to_copy(vm, tmp_path, monkeypatch):
+    make_version(vm, "git-2.41", {"git.exe": b"git", "lib/a.dll": b"a"})
+    cache = make_cache(vm, tmp_path, budget=10_000, compare="hash")
+    hashed = []
+    hash_file = cache_module.hash_file
+
+    def recorded(path):
+        hashed.append(path)
+        return hash_file(path)
+
+    monkeypatch.setattr(cache_module, "hash_file", recorded)
+    vm.create_link("git", "git-2.41")
+    vm.remove_link("git")
+    vm.create_link("git", "git-2.41")
+
+    # Source hashes were recorded while copying; re-syncs hash local copies
+    local = tmp_path / "local" / "git-2.41"
+    assert hashed and all(path.startswith(str(local)) for path in hashed)
+
+    # A local copy changed in place (same size and mtime) is copied again
+    st = os.stat(local / "git.exe")
+    (local / "git.exe").write_bytes(b"bad")
+    os.utime(local / "git.exe", ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert (
+        cache.sync("git-2.41", hashes=cache.entries()["git-2.41"]["hashes"])["copied"]
+        == 1
+    )
+    assert (local / "git.exe").read_bytes() == b"git"
@@ -0,0 +1,84 @@
+import queue
+import shutil
+
+import pytest
+
+import daemon
+import prewarm
+import tiering
+from cli import main
+from prewarm import PREWARM_FILE, save_settings
+
+
+@pytest.fixture
+def cli_vm(vm, monkeypatch):
+    """Runs main() against vm, with no daemon to route requests to."""
+
+    def no_daemon(*args, **kwargs):
+        raise OSError("no daemon")
+
+    monkeypatch.setattr(daemon, "DaemonClient", no_daemon)
+    monkeypatch.setattr("cli.VersionManager", lambda: vm)
+    monkeypatch.setattr("config.ensure_app_dirs", lambda: None)
+    return vm
+
+
+def test_rpc_errors_are_reported_without_traceback(cli_vm, capsys):
+    (cli_vm.versions_dir / "git-2.41").mkdir()
+
+    assert main(["status", "Missing"]) == 1
+    assert "Unknown app: Missing" in capsys.readouterr().err
+    assert main(["link", "git", "git-9.9"]) == 1
+    assert "Unknown version of git: git-9.9" in capsys.readouterr().err
+    assert cli_vm.current_links() == {}
+
+
+def test_verify_reports_a_deleted_version(cli_vm, capsys):
+    (cli_vm.versions_dir / "git-2.41").mkdir()
+    (cli_vm.versions_dir / "git-2.41" / "git.exe").write_bytes(b"git")
+    cli_vm.create_link("git", "git-2.41")
+    assert main(["verify"]) == 0
+
+    shutil.rmtree(cli_vm.versions_dir / "git-2.41")
+    assert main(["verify"]) == 1
+    assert "MISSING git-2.41" in capsys.readouterr().out
+
+
+def test_link_prewarms_when_enabled(cli_vm, monkeypatch):
+    save_settings(
+        {"enabled": True, "budget_bytes": 1000, "patterns": {}},
+        cli_vm.data_dir / PREWARM_FILE,
+    )
+    (cli_vm.versions_dir / "git-2.41").mkdir()
+    warmed = queue.Queue()
+
+    def record(source, patterns, budget_bytes):
+        warmed.put(source)
+        return 0, 0, 0, "read"
+
+    monkeypatch.setattr(prewarm, "prewarm_version", record)
+
+    assert main(["link", "git", "git-2.41"]) == 0
+    assert warmed.get(timeout=5) == cli_vm.versions_dir / "git-2.41"
+
+
+def test_tier_attaches_one_tier_listener(cli_vm, tmp_path):
+    tiering.save_settings(
+        {
+            "enabled": True,
+            "slow_root": str(tmp_path / "slow"),
+            "hot_days": 30.0,
+            "rate_mb": 0.0,
+            "interval": 600.0,
+        },
+        cli_vm.data_dir / tiering.TIERS_FILE,
+    )
+
+    assert main(["tier", "--run"]) == 0
+    listeners = [
+        callback
+        for callback in cli_vm._link_listeners
+        if isinstance(getattr(callback, "__self__", None), tiering.TierManager)
+    ]
+    assert len(listeners) == 1
+    assert cli_vm.tier_roots == (tmp_path / "slow",)
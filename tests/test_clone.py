@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from clone import VersionCloner, open_for_write
+
+
+def test_clone_shares_data_until_written(vm, tmp_path):
+    src = vm.versions_dir / "App-1.2.0"
+    (src / "lib").mkdir(parents=True)
+    (src / "app.bin").write_bytes(b"v1.2.0")
+    (src / "lib" / "core.dll").write_bytes(b"core")
+    os.symlink("lib/core.dll", src / "core-link")
+
+    cloner = VersionCloner(vm)
+    generation = vm.read_generation()
+    result = cloner.clone("App-1.2.0", "App-1.2.1", method="hardlink")
+
+    clone = vm.versions_dir / "App-1.2.1"
+    assert (result["files"], result["hardlinked"], result["copied"]) == (2, 2, 0)
+    # Versions/ changed, Persists/ did not
+    assert vm.read_generation() == generation
+    assert cloner.source_of("App-1.2.1") == "App-1.2.0"
+    assert vm.get_grouped_versions()["App"].versions == ("App-1.2.0", "App-1.2.1")
+    assert (clone / "lib" / "core.dll").stat().st_ino == (
+        src / "lib" / "core.dll"
+    ).stat().st_ino
+    assert os.readlink(clone / "core-link") == "lib/core.dll"
+
+    # In-place write breaks the hardlink first
+    with open_for_write(clone / "app.bin") as f:
+        f.write(b"v1.2.1")
+    assert (clone / "app.bin").read_bytes() == b"v1.2.1"
+    assert (src / "app.bin").read_bytes() == b"v1.2.0"
+
+    # Patches replace names instead of writing through them
+    patch = tmp_path / "patch"
+    (patch / "lib").mkdir(parents=True)
+    (patch / "lib" / "core.dll").write_bytes(b"patched")
+    assert cloner.apply_patch("App-1.2.1", patch) == 1
+    assert (src / "lib" / "core.dll").read_bytes() == b"core"
+
+    assert cloner.unshare("App-1.2.1") == 0
+
+
+def test_linking_a_clone_unshares_it(vm):
+    src = vm.versions_dir / "App-1.0"
+    src.mkdir()
+    (src / "settings.ini").write_bytes(b"source")
+    cloner = VersionCloner(vm)
+    cloner.attach()
+    cloner.clone("App-1.0", "App-1.1", method="hardlink")
+
+    vm.create_link("App", "App-1.1")
+
+    # The app writes through its link in place; the source must not change
+    with open(vm.persists_dir / "App" / "settings.ini", "r+b") as f:
+        f.write(b"clone!")
+    assert (src / "settings.ini").read_bytes() == b"source"
+
+
+def test_linking_the_source_unshares_it(vm):
+    src = vm.versions_dir / "App-1.0"
+    src.mkdir()
+    (src / "settings.ini").write_bytes(b"source")
+    cloner = VersionCloner(vm)
+    cloner.attach()
+    cloner.clone("App-1.0", "App-1.1", method="hardlink")
+
+    # Nested in a larger write: unsharing waits until the lock is released
+    with vm.write_transaction():
+        vm.create_link("App", "App-1.0")
+        assert (src / "settings.ini").stat().st_nlink == 2
+    assert (src / "settings.ini").stat().st_nlink == 1
+
+    with open(vm.persists_dir / "App" / "settings.ini", "r+b") as f:
+        f.write(b"CHANGE")
+    assert (vm.versions_dir / "App-1.1" / "settings.ini").read_bytes() == b"source"
+
+
+def test_cloning_a_linked_version_does_not_hardlink(vm):
+    src = vm.versions_dir / "App-1.0"
+    src.mkdir()
+    (src / "settings.ini").write_bytes(b"source")
+    vm.create_link("App", "App-1.0")
+    cloner = VersionCloner(vm)
+
+    with pytest.raises(ValueError, match="is linked"):
+        cloner.clone("App-1.0", "App-1.1", method="hardlink")
+    result = cloner.clone("App-1.0", "App-1.1")
+    assert result["hardlinked"] == 0
+
+    with open(vm.persists_dir / "App" / "settings.ini", "r+b") as f:
+        f.write(b"CHANGE")
+    assert (vm.versions_dir / "App-1.1" / "settings.ini").read_bytes() == b"source"
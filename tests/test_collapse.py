@@ -0,0 +1,39 @@
+from state import AppState
+from ui.collapse import COLLAPSED_VERSION_COUNT, toggle_label, visible_versions
+
+VERSIONS = ["App-6.0", "App-5.0", "App-4.0", "App-3.0", "App-2.0", "App-1.0"]
+
+
+def test_collapsed_card_keeps_active_and_selected_versions():
+    assert COLLAPSED_VERSION_COUNT == 3
+    assert visible_versions(VERSIONS, None, None, expanded=False) == VERSIONS[:3]
+    assert visible_versions(VERSIONS, "App-1.0", "App-3.0", expanded=False) == [
+        "App-6.0",
+        "App-5.0",
+        "App-4.0",
+        "App-3.0",
+        "App-1.0",
+    ]
+    assert visible_versions(VERSIONS, "App-1.0", None, expanded=True) == VERSIONS
+    assert visible_versions(VERSIONS[:3], None, None, expanded=False) == VERSIONS[:3]
+
+
+def test_toggle_label():
+    assert toggle_label(6, 4, expanded=False) == "Show 2 more"
+    assert toggle_label(6, 6, expanded=True) == "Show less"
+    # Short lists need no button either way
+    assert toggle_label(3, 3, expanded=False) is None
+    assert toggle_label(3, 3, expanded=True) is None
+
+
+def test_expanded_apps_are_view_state():
+    state = AppState()
+    notified = []
+    state.add_listener(lambda: notified.append(1))
+
+    state.set_expanded("App", True)
+    assert state.is_expanded("App")
+    state.set_expanded("App", False)
+    state.set_expanded("Other", False)
+    assert not state.is_expanded("App")
+    assert not notified
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+from daemon import DaemonClient, PivotDaemon, RpcError
+
+
+@pytest.fixture
+def daemon(vm, tmp_path):
+    d = PivotDaemon(vm, address=str(tmp_path / "pivot.sock"))
+    thread = threading.Thread(target=d.serve_forever, daemon=True)
+    thread.start()
+    # Wait for the socket to appear
+    for _ in range(100):
+        if (tmp_path / "pivot.sock").exists():
+            break
+        threading.Event().wait(0.01)
+    yield d
+    d.stop()
+    thread.join(timeout=5)
+
+
+def test_daemon_status_and_link(vm, daemon):
+    (vm.versions_dir / "Nodejs-14.0.0").mkdir()
+    (vm.versions_dir / "Nodejs-16.0.0").mkdir()
+
+    with DaemonClient(daemon.address, daemon.family) as client:
+        assert client.call("ping") == "pong"
+        result = client.call("link", app="Nodejs", version="Nodejs-14.0.0")
+        assert result["active_version"] == "Nodejs-14.0.0"
+
+        # A write from another process (e.g. the GUI) is picked up via mtime
+        vm.create_link("Nodejs", "Nodejs-16.0.0", force=True)
+        assert client.call("status", app="Nodejs")["active_version"] == "Nodejs-16.0.0"
+
+        with pytest.raises(RpcError):
+            client.call("status", app="Missing")
+
+
+def test_link_to_unknown_version_writes_nothing(vm, daemon):
+    (vm.versions_dir / "Nodejs-14.0.0").mkdir()
+    (vm.versions_dir / "go-1.21").mkdir()
+
+    with DaemonClient(daemon.address, daemon.family) as client:
+        with pytest.raises(RpcError, match="Unknown version"):
+            client.call("link", app="Nodejs", version="Nodejs-99.0.0")
+        with pytest.raises(RpcError, match="Unknown version"):
+            client.call("link", app="Nodejs", version="go-1.21")
+    assert vm.current_links() == {}
@@ -0,0 +1,64 @@
+import os
+
+from doctor import Doctor
+
+
+def make_versions(vm, *names):
+    for name in names:
+        (vm.versions_dir / name).mkdir()
+
+
+def test_doctor_classifies_problems(vm, tmp_path):
+    make_versions(vm, "Nodejs-14.0.0", "Nodejs-16.0.0", "copyq-7.1.0")
+    vm.create_link("Nodejs", "Nodejs-14.0.0")
+    vm.create_link("CopyQ", "copyq-7.1.0")
+    vm.create_link("CopyQ2", "copyq-7.1.0")
+    (vm.persists_dir / "RealDir").mkdir()
+
+    # Dangling: version was deleted after linking
+    (vm.versions_dir / "Gone-1.0").mkdir()
+    vm.create_link("Gone", "Gone-1.0")
+    (vm.versions_dir / "Gone-1.0").rmdir()
+
+    # External: points outside Versions/
+    (tmp_path / "elsewhere").mkdir()
+    os.symlink(tmp_path / "elsewhere", vm.persists_dir / "Ext")
+
+    report = Doctor(vm).scan()
+    kinds = {(i["kind"], i["link_name"]) for i in report.issues}
+
+    assert ("outdated", "Nodejs") in kinds
+    assert ("duplicate", "CopyQ2") in kinds
+    assert ("real_directory", "RealDir") in kinds
+    assert ("dangling", "Gone") in kinds
+    assert ("external", "Ext") in kinds
+    assert report.index.links_for("copyq-7.1.0") == ["CopyQ", "CopyQ2"]
+    assert report.index.version_for("Nodejs") == "Nodejs-14.0.0"
+
+
+def test_doctor_repairs(vm):
+    make_versions(vm, "Nodejs-14.0.0", "Nodejs-16.0.0", "Gone-1.0")
+    vm.create_link("Nodejs", "Nodejs-14.0.0")
+    vm.create_link("Gone", "Gone-1.0")
+    (vm.versions_dir / "Gone-1.0").rmdir()
+    (vm.versions_dir / "Nodejs-14.0.0").rmdir()
+
+    doctor = Doctor(vm)
+    success_count, fail_count = doctor.repair(doctor.scan().by_kind("dangling"))
+
+    assert (success_count, fail_count) == (2, 0)
+    assert not (vm.persists_dir / "Gone").is_symlink()
+    assert doctor.scan().index.version_for("Nodejs") == "Nodejs-16.0.0"
+
+
+def test_outdated_uses_version_order_and_stays_healthy(vm):
+    make_versions(vm, "App-1.9", "App-1.10")
+    vm.create_link("App", "App-1.9")
+
+    report = Doctor(vm, metadata={}).scan()
+
+    # 1.10 is newer than 1.9, although it sorts first by name
+    assert [(i["kind"], i["fix_version"]) for i in report.issues] == [
+        ("outdated", "App-1.10")
+    ]
+    assert report.healthy
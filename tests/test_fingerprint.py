@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from fingerprint import FingerprintStore
+
+
+@pytest.mark.parametrize("max_workers", [0, 2])
+def test_verify_detects_changes_and_reuses_cache(vm, tmp_path, max_workers):
+    root = vm.versions_dir / "App-1.0"
+    (root / "lib").mkdir(parents=True)
+    (root / "app.exe").write_bytes(b"binary")
+    (root / "lib" / "core.dll").write_bytes(b"library")
+    (root / "lib" / "extra.dll").write_bytes(b"extra")
+
+    store = FingerprintStore(vm, path=tmp_path / "fp", max_workers=max_workers)
+    store.record("App-1.0")
+
+    result = store.verify("App-1.0")
+    assert result["ok"] and result["rehashed"] == 0
+
+    (root / "lib" / "core.dll").write_bytes(b"tampered")
+    os.utime(root / "lib" / "core.dll", ns=(1, 1))
+    (root / "lib" / "extra.dll").unlink()
+
+    result = store.verify("App-1.0")
+    assert not result["ok"]
+    assert result["modified"] == ["lib/core.dll"]
+    assert result["removed"] == ["lib/extra.dll"]
+    assert result["rehashed"] == 1
+    # The changed file is cached now; the baseline is not
+    assert store.verify("App-1.0")["rehashed"] == 0
+    assert not store.verify("App-1.0")["ok"]
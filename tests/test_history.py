@@ -0,0 +1,140 @@
+import itertools
+import json
+import time
+
+import pytest
+
+from history import DAY, LinkHistory, parse_when
+
+
+@pytest.fixture
+def history(vm):
+    for folder_name in (
+        "git-2.40",
+        "git-2.41",
+        "Nodejs-16.0.0",
+        "Nodejs-18.0.0",
+        "go-1.21",
+    ):
+        (vm.versions_dir / folder_name).mkdir()
+    vm.create_link("git", "git-2.40")
+    h = LinkHistory(vm, path=vm.data_dir / "history.jsonl", checkpoint_every=4)
+    h.attach()
+    return h
+
+
+def _mark(history) -> float:
+    # Link changes after this instant are strictly later: timestamps have
+    # millisecond resolution, so let the clock move past the mark first
+    point = history._last_time + 0.0005
+    time.sleep(0.002)
+    return point
+
+
+def test_attach_writes_baseline_checkpoint(vm, history):
+    lines = history.path.read_bytes().splitlines()
+    assert json.loads(lines[0])["links"] == {"git": "git-2.40"}
+
+    # Reattaching with nothing changed adds nothing
+    LinkHistory(vm, path=history.path).attach()
+    assert len(history.path.read_bytes().splitlines()) == 1
+
+
+def test_restore_undoes_a_batch(vm, history):
+    before = _mark(history)
+    vm.create_links(
+        [("git", "git-2.41"), ("Nodejs", "Nodejs-18.0.0"), ("go", "go-1.21")],
+        force=True,
+    )
+    vm.create_link("Nodejs", "Nodejs-16.0.0", force=True)
+    assert history.state_at(before) == {"git": "git-2.40"}
+
+    plan, added = history.restore_plan(before)
+    assert [(s["link_name"], s["target"]) for s in plan.changes] == [
+        ("git", "git-2.40")
+    ]
+    assert added == ["Nodejs", "go"]
+
+    history.restore(before)
+    assert vm.current_links() == {"git": "git-2.40"}
+    # The restore is history too, so it can be undone the same way
+    assert history.entries(limit=1)[0]["folder_name"] is None
+
+
+def test_restore_touches_only_links_that_differ(vm, history):
+    vm.create_link("Nodejs", "Nodejs-16.0.0")
+    point = _mark(history)
+    vm.create_link("git", "git-2.41", force=True)
+
+    plan, added = history.restore_plan(point)
+    assert [s["link_name"] for s in plan.steps] == ["git"]
+    assert added == []
+
+
+def test_checkpoints_bound_replay(vm, history):
+    for i in range(10):
+        vm.create_link("git", "git-2.41" if i % 2 else "git-2.40", force=True)
+
+    lines = history.path.read_bytes().splitlines()
+    checkpoints = [i for i, line in enumerate(lines) if line.startswith(b"{")]
+    assert len(checkpoints) > 1
+    assert all(b - a <= 5 for a, b in itertools.pairwise(checkpoints))
+    assert history.state_at(_mark(history)) == vm.current_links()
+
+
+def test_state_before_history_is_an_error(history):
+    with pytest.raises(ValueError, match="History starts"):
+        history.state_at(0)
+
+
+def test_compact_keeps_last_change_per_day(vm, history):
+    start = history._last_time
+    old = start + 1
+    for i in range(20):
+        history.record("git", "git-2.41" if i % 2 else "git-2.40", now=old + i)
+    history.record("Nodejs", "Nodejs-18.0.0", now=old + 30)
+    recent = old + 200 * DAY
+    history.record("go", "go-1.21", now=recent)
+    history.record("go", "go-1.21", now=recent + 1)
+
+    end_of_day = history.state_at(old + 40)
+    before, after = history.compact(keep_days=90, now=recent + DAY)
+
+    assert after < before
+    assert history.state_at(old + 40) == end_of_day
+    assert history.state_at(start) == {"git": "git-2.40"}
+    assert [e["link_name"] for e in history.entries(since=old)] == [
+        "go",
+        "go",
+        "Nodejs",
+        "git",
+    ]
+
+    # Appending continues on the rewritten log
+    history.record("git", "git-2.40", now=recent + 2)
+    assert history.state_at(recent + 2)["git"] == "git-2.40"
+
+
+def test_parse_when():
+    assert parse_when("2h", now=10000.0) == 10000.0 - 7200
+    assert parse_when("1712345678") == 1712345678.0
+    with pytest.raises(ValueError):
+        parse_when("yesterday-ish")
+
+
+def test_compact_keeps_an_empty_first_checkpoint(vm):
+    (vm.versions_dir / "git-2.40").mkdir()
+    history = LinkHistory(vm, path=vm.data_dir / "history.jsonl")
+    history.attach()  # Fresh install: {"links": {}}
+    start = history._last_time
+    # On separate days, so compaction keeps both
+    history.record("git", "git-2.40", now=start + DAY)
+    history.record("git", None, now=start + 2 * DAY)
+    points = [start, start + DAY, start + 2 * DAY]
+    before = [history.state_at(when) for when in points]
+    assert before == [{}, {"git": "git-2.40"}, {}]
+
+    history.compact(keep_days=1, now=start + 10 * DAY)
+
+    assert [history.state_at(when) for when in points] == before
+    assert history.path.read_bytes().startswith(b"{")
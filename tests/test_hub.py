@@ -0,0 +1,140 @@
+import threading
+import time
+
+from hub import SessionHub
+from snapshot import ScanSnapshot
+
+
+def _count_scans(vm):
+    scans = []
+    scan = vm.get_grouped_versions
+
+    def counted():
+        scans.append(threading.get_ident())
+        return scan()
+
+    vm.get_grouped_versions = counted
+    return scans
+
+
+def test_snapshot_diff_lists_only_changed_groups():
+    before = ScanSnapshot(
+        [
+            ("git", ["git-2.40", "git-2.41"], "git-2.40", "git"),
+            ("go", ["go-1.21"], None, None),
+            ("Nodejs", ["Nodejs-18.0.0"], None, None),
+        ]
+    )
+    after = ScanSnapshot(
+        [
+            ("git", ["git-2.40", "git-2.41"], "git-2.41", "git"),
+            ("go", ["go-1.21"], None, None),
+            ("python", ["python-3.12"], None, None),
+        ],
+        generation=3,
+    )
+
+    delta = after.diff(before)
+    assert delta["generation"] == 3
+    assert list(delta["changed"]) == ["git", "python"]
+    assert delta["changed"]["git"]["active_version"] == "git-2.41"
+    assert delta["removed"] == ["Nodejs"]
+    assert after.diff(after) == {"generation": 3, "changed": {}, "removed": []}
+
+
+def test_sessions_share_one_scan(vm):
+    for i in range(20):
+        (vm.versions_dir / f"App{i}-1.0").mkdir()
+    hub = SessionHub(vm)
+    scans = _count_scans(vm)
+
+    sessions = [hub.subscribe(lambda snapshot, delta: None) for _ in range(50)]
+    assert hub.sessions == 50
+    first = hub.groups()
+    assert all(hub.groups() is first for _ in sessions)
+    # Nothing changed: polling does not rescan either
+    assert hub.publish() is None
+    assert len(scans) == 1
+
+    for unsubscribe in sessions:
+        unsubscribe()
+    assert hub.sessions == 0
+
+
+def test_write_is_pushed_to_every_session_as_delta(vm):
+    (vm.versions_dir / "Nodejs-16.0.0").mkdir()
+    (vm.versions_dir / "Nodejs-18.0.0").mkdir()
+    (vm.versions_dir / "python-3.12").mkdir()
+    hub = SessionHub(vm)
+    hub.groups()
+    scans = _count_scans(vm)
+
+    received = [[], [], []]
+    for inbox in received:
+        hub.subscribe(lambda snapshot, delta, inbox=inbox: inbox.append(delta))
+
+    hub.submit(vm.create_link, "Nodejs", "Nodejs-18.0.0", force=True).result()
+
+    # One rescan for the write, however many sessions are open
+    assert len(scans) == 1
+    for inbox in received:
+        assert len(inbox) == 1
+        assert list(inbox[0]["changed"]) == ["Nodejs"]
+        assert inbox[0]["changed"]["Nodejs"]["active_version"] == "Nodejs-18.0.0"
+    assert hub.groups()["Nodejs"]["active_version"] == "Nodejs-18.0.0"
+
+
+def test_writes_from_sessions_are_serialized(vm):
+    for i in range(8):
+        (vm.versions_dir / f"App{i}-1.0").mkdir()
+    hub = SessionHub(vm)
+    running = []
+    overlaps = []
+
+    def write(i):
+        running.append(i)
+        if len(running) > 1:
+            overlaps.append(i)
+        time.sleep(0.01)
+        vm.create_link(f"App{i}", f"App{i}-1.0", force=True)
+        running.remove(i)
+
+    futures = [hub.submit(write, i) for i in range(8)]
+    for future in futures:
+        future.result()
+
+    assert not overlaps
+    assert all(hub.groups()[f"App{i}"]["active_version"] for i in range(8))
+
+
+def test_poller_publishes_changes_from_other_processes(vm):
+    (vm.versions_dir / "git-2.41").mkdir()
+    hub = SessionHub(vm, poll_interval=0.01)
+    hub.groups()
+    deltas = []
+    hub.subscribe(lambda snapshot, delta: deltas.append(delta))
+    hub.start()
+    try:
+        # E.g. the CLI, writing behind the hub's back
+        vm.create_link("git", "git-2.41", force=True)
+        for _ in range(200):
+            if deltas:
+                break
+            time.sleep(0.01)
+    finally:
+        hub.stop()
+
+    assert deltas and deltas[0]["changed"]["git"]["active_version"] == "git-2.41"
+
+
+def test_shared_work_runs_once_per_generation(vm):
+    hub = SessionHub(vm)
+    calls = []
+
+    def load():
+        calls.append(1)
+        return {"loaded": True}
+
+    futures = [hub.shared("metadata", load) for _ in range(10)]
+    assert all(f.result() == {"loaded": True} for f in futures)
+    assert len(calls) == 1
@@ -0,0 +1,82 @@
+import json
+import os
+
+from config import SHARD_MARKER
+from layout import STAGING_SUFFIX, ShardMigration
+
+
+def test_scan_reads_flat_and_sharded_layouts(vm):
+    (vm.versions_dir / "copyq-7.1.0").mkdir()
+    shard = vm.versions_dir / "Nodejs"
+    (shard / "Nodejs-16.0.0").mkdir(parents=True)
+    (shard / SHARD_MARKER).touch()
+
+    assert vm.scan_versions() == ["Nodejs-16.0.0", "copyq-7.1.0"]
+    assert vm.shards == ("Nodejs",)
+    assert vm.version_path("Nodejs-16.0.0") == shard / "Nodejs-16.0.0"
+
+    vm.create_link("Nodejs", "Nodejs-16.0.0")
+    groups = vm.get_grouped_versions()
+    assert groups["Nodejs"].active_version == "Nodejs-16.0.0"
+    assert "Nodejs" not in vm.scan_versions()
+
+
+def test_migration_moves_relinks_and_resumes(vm, tmp_path):
+    for name in ("Nodejs-14.0.0", "Nodejs-16.0.0", "Everything"):
+        (vm.versions_dir / name).mkdir()
+    (vm.versions_dir / "Nodejs-16.0.0" / "node").write_text("bin")
+    vm.create_link("Nodejs", "Nodejs-16.0.0")
+    vm.create_link("Everything", "Everything")
+    journal = tmp_path / "migration.json"
+
+    # Simulate a crash after the journaled move but before the relink
+    migration = ShardMigration(vm, journal_path=journal)
+    migration._write_journal(
+        {"folder_name": "Everything", "shard": "Everything", "links": ["Everything"]}
+    )
+    os.rename(
+        vm.versions_dir / "Everything",
+        vm.versions_dir / ("Everything" + STAGING_SUFFIX),
+    )
+
+    report = migration.run()
+
+    assert report["resumed"]
+    assert (report["moved"], report["failed"]) == (2, [])
+    assert not journal.exists()
+    assert sorted(os.listdir(vm.versions_dir)) == ["Everything", "Nodejs"]
+    assert (vm.persists_dir / "Nodejs" / "node").read_text() == "bin"
+    assert vm.current_links() == {"Nodejs": "Nodejs-16.0.0", "Everything": "Everything"}
+
+    # Nothing left to do
+    assert ShardMigration(vm, journal_path=journal).run()["moved"] == 0
+
+
+def test_failed_relink_keeps_the_journal(vm, tmp_path):
+    for name in ("Nodejs-16.0.0", "copyq-7.1.0"):
+        (vm.versions_dir / name).mkdir()
+    vm.create_link("Nodejs", "Nodejs-16.0.0")
+    journal = tmp_path / "migration.json"
+    migration = ShardMigration(vm, journal_path=journal)
+
+    create_links = vm.create_links
+
+    def failing_create_links(items, force=False, expected_generation=None):
+        results = create_links(items, force, expected_generation)
+        for result in results:
+            result.update(ok=False, error="in use")
+        return results
+
+    vm.create_links = failing_create_links
+    report = migration.run()
+
+    assert report["moved"] == 0
+    assert report["failed"] == [("Nodejs-16.0.0", "Failed to relink Nodejs: in use")]
+    assert json.loads(journal.read_text())["links"] == ["Nodejs"]
+    # Stopped before copyq, which would have overwritten the journal
+    assert (vm.versions_dir / "copyq-7.1.0").is_dir()
+
+    vm.create_links = create_links
+    report = migration.run()
+    assert report["resumed"] and report["moved"] == 1
+    assert not journal.exists()
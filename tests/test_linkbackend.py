@@ -0,0 +1,92 @@
+import subprocess
+from pathlib import Path
+
+from linkbackend import FakeBackend, JunctionBackend
+from manager import VersionManager
+from planner import execute_plan, plan_links
+
+
+def test_batch_uses_one_backend_call(vm, tmp_path):
+    backend = FakeBackend(batch_latency=0.05, fail={"Broken"})
+    manager = VersionManager(backend=backend, root=tmp_path)
+
+    requests = {}
+    for i in range(20):
+        (vm.versions_dir / f"App{i}-1.0").mkdir()
+        requests[f"App{i}"] = f"App{i}-1.0"
+    (vm.versions_dir / "Broken-1.0").mkdir()
+    requests["Broken"] = "Broken-1.0"
+
+    results = execute_plan(manager, plan_links(manager, requests))
+
+    # One "spawn" for the whole batch, its cost spread over the links
+    assert backend.batches == 1
+    assert len(results) == 21
+    assert [r["link_name"] for r in results if not r["ok"]] == ["Broken"]
+    assert all(r["seconds"] >= 0.05 / 21 for r in results if r["ok"])
+    assert (vm.persists_dir / "App3").resolve() == (
+        vm.versions_dir / "App3-1.0"
+    ).resolve()
+
+    # Unchanged links never reach the backend; only the failed one is retried
+    execute_plan(manager, plan_links(manager, requests))
+    assert backend.batches == 2
+    assert len(backend.created) == 20
+
+
+class RaisingBackend(FakeBackend):
+    """Fails the whole call for one link, like a backend that cannot start."""
+
+    def create_many(self, pairs):
+        if any(dst.name == "Broken" for _, dst in pairs):
+            raise OSError("backend crashed")
+        return super().create_many(pairs)
+
+
+def test_unbatched_backend_links_one_at_a_time(vm):
+    backend = RaisingBackend(batched=False)
+    manager = VersionManager(backend=backend, root=vm.versions_dir.parent)
+    for name in ("App1-1.0", "Broken-1.0", "App2-1.0"):
+        (vm.versions_dir / name).mkdir()
+
+    results = manager.create_links(
+        [("App1", "App1-1.0"), ("Broken", "Broken-1.0"), ("App2", "App2-1.0")]
+    )
+
+    # A backend failure costs only its own link
+    assert backend.batches == 2
+    assert [(r["link_name"], r["ok"]) for r in results] == [
+        ("App1", True),
+        ("Broken", False),
+        ("App2", True),
+    ]
+    assert results[1]["error"] == "backend crashed"
+    assert manager.current_links() == {"App1": "App1-1.0", "App2": "App2-1.0"}
+
+
+def test_junction_script_escapes_and_maps_errors(monkeypatch, tmp_path):
+    scripts = []
+
+    def run(args, **kwargs):
+        scripts.append(Path(args[-1]).read_text(encoding="utf-8"))
+        return subprocess.CompletedProcess(
+            args,
+            0,
+            stdout="PIVOT_FAIL 1\n",
+            stderr="PIVOT_LINK 0\nPIVOT_LINK 1\nAccess is denied.\n",
+        )
+
+    monkeypatch.setattr(subprocess, "run", run)
+    backend = JunctionBackend()
+    backend._native = None
+
+    outcomes = backend.create_many(
+        [
+            (tmp_path / "100%-1.0", tmp_path / "100%"),
+            (tmp_path / "App-1.0", tmp_path / "App"),
+        ]
+    )
+
+    assert "100%%-1.0" in scripts[0]
+    assert outcomes[0][1] is None
+    assert str(outcomes[1][1]) == "Failed to create junction: Access is denied."
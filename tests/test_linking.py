@@ -1,58 +1,106 @@
-import shutil
+from pathlib import Path
+
+import pytest
+
+from filesystem import MemoryFileSystem, MemoryLinkBackend
+from hub import ScanCache
 from manager import VersionManager
-from config import PERSISTS_DIR, VERSIONS_DIR
+from planner import execute_plan, plan_links
+from shims import BinIndex
+
+
+@pytest.fixture(params=["symlink", "junction"])
+def memvm(request):
+    """VersionManager on an in-memory tree, linking with either link kind."""
+    fs = MemoryFileSystem()
+    manager = VersionManager(
+        backend=MemoryLinkBackend(fs, request.param), fs=fs, root=Path("/pivot")
+    )
+    fs.mkdir(manager.versions_dir, parents=True)
+    fs.mkdir(manager.persists_dir)
+    return manager
+
+
+def test_linking(memvm):
+    fs = memvm.fs
+    fs.mkdir(memvm.versions_dir / "TestApp-1.0.0")
+    fs.mkdir(memvm.versions_dir / "TestApp-2.0.0")
+    fs.write_bytes(memvm.versions_dir / "TestApp-2.0.0" / "app.exe", b"v2")
+
+    memvm.create_link("TestApp", "TestApp-1.0.0")
+    link_path = memvm.persists_dir / "TestApp"
+    assert fs.is_dir(link_path)
+    assert fs.is_symlink(link_path) == (memvm.backend.kind == "symlink")
+    assert fs.resolve(link_path) == memvm.versions_dir / "TestApp-1.0.0"
+    assert memvm.current_links() == {"TestApp": "TestApp-1.0.0"}
 
+    with pytest.raises(FileExistsError):
+        memvm.create_link("TestApp", "TestApp-2.0.0")
 
-def test_linking():
-    # Setup
-    vm = VersionManager()
+    memvm.create_link("TestApp", "TestApp-2.0.0", force=True)
+    assert fs.read_bytes(link_path / "app.exe") == b"v2"
+    assert memvm.get_grouped_versions()["TestApp"]["active_version"] == "TestApp-2.0.0"
 
-    # Ensure clean state for test
-    test_app = "TestApp"
-    test_folder = "TestApp-1.0.0"
+    memvm.remove_link("TestApp")
+    assert not fs.exists(link_path)
+    # Removing the link never touches the version
+    assert fs.is_dir(memvm.versions_dir / "TestApp-2.0.0")
+    assert memvm.read_generation() == 3
 
-    # Create fake version
-    (VERSIONS_DIR / test_folder).mkdir(exist_ok=True)
 
-    # Ensure no existing link
-    link_path = PERSISTS_DIR / test_app
-    if link_path.exists():
-        if link_path.is_symlink():
-            link_path.unlink()
-        else:
-            shutil.rmtree(link_path)
+def test_real_directories_are_replaced_only_with_force(memvm):
+    fs = memvm.fs
+    fs.mkdir(memvm.versions_dir / "Tool-1.0")
+    fs.mkdir(memvm.persists_dir / "Tool")
+    fs.write_bytes(memvm.persists_dir / "Tool" / "settings.ini", b"user data")
 
-    print(f"Testing linking {test_folder} -> {test_app}...")
+    with pytest.raises(IsADirectoryError):
+        memvm.remove_link("Tool")
 
-    # Execute
-    vm.create_link(test_app, test_folder)
+    memvm.create_link("Tool", "Tool-1.0", force=True)
+    assert memvm.current_links() == {"Tool": "Tool-1.0"}
 
-    # Verify
-    if link_path.exists():
-        print(f"SUCCESS: Link created at {link_path}")
 
-        # Check if it's a symlink or junction (both are reparse points)
-        # Note: is_symlink() might be False for junctions on some python versions
-        is_sym = link_path.is_symlink()
-        print(f"       is_symlink(): {is_sym}")
+def test_large_tree_with_simulated_network_latency():
+    fs = MemoryFileSystem(latency=0.02)
+    manager = VersionManager(fs=fs, root=Path("/share"))
+    for i in range(20_000):
+        fs.mkdir(manager.versions_dir / f"app-{i:05}-1.{i % 7}", parents=True)
+    fs.mkdir(manager.persists_dir)
+    manager.create_link("app", "app-00042-1.0")
 
-        # For validation, we just want to ensure it resolves to the right place
-        resolved = link_path.resolve()
-        expected = (VERSIONS_DIR / test_folder).resolve()
+    fs.calls.clear()
+    fs.elapsed = 0.0
+    groups = manager.get_grouped_versions()
 
-        print(f"       Resolves to: {resolved}")
+    assert groups.version_count == 20_000
+    assert groups["app"]["active_version"] == "app-00042-1.0"
+    # One listing per directory, not one stat per version folder
+    assert fs.calls["list_dirs"] == 1
+    assert sum(fs.calls.values()) < 20
+    assert fs.elapsed == pytest.approx(0.02 * sum(fs.calls.values()))
 
-        if resolved == expected:
-            print("       Target path matches exactly.")
-        else:
-            print(f"       WARNING: Target {resolved} != {expected}")
-    else:
-        print("FAILURE: Link path does not exist.")
 
-    # Cleanup
-    link_path.unlink()
-    (VERSIONS_DIR / test_folder).rmdir()
+def test_planning_and_shims_stay_in_memory(memvm):
+    fs = memvm.fs
+    for folder_name in ("Tool-1.0", "Tool-2.0"):
+        fs.mkdir(memvm.versions_dir / folder_name)
+        fs.write_bytes(memvm.versions_dir / folder_name / "tool", b"#!/bin/sh\n")
+        fs.chmod(memvm.versions_dir / folder_name / "tool", 0o755)
+    fs.mkdir(memvm.persists_dir / "Tool")
+    fs.write_bytes(memvm.persists_dir / "Tool" / "settings.ini", b"user data")
 
+    plan = plan_links(memvm, {"Tool": "Tool-1.0", "Gone": "Gone-1.0"})
+    assert [(s["link_name"], s["action"]) for s in plan.steps] == [
+        ("Tool", "replace_directory"),
+        ("Gone", "skip"),
+    ]
+    assert plan.steps[0]["note"] == "deletes 1 entries"
 
-if __name__ == "__main__":
-    test_linking()
+    bin_index = BinIndex(memvm, is_windows=False)
+    bin_index.attach()
+    bin_index.rebuild()
+    stamp = ScanCache(memvm).stamp()
+    execute_plan(memvm, plan)
+    assert fs.readlink(bin_index.bin_dir / "tool") == str(Path("..", "Tool", "tool"))
+    assert ScanCache(memvm).stamp() != stamp
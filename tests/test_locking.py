@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from locking import StaleStateError, write_lock
+from planner import execute_plan, plan_links
+
+
+def test_writes_bump_generation_and_reject_stale_plans(vm):
+    for name in ("Nodejs-14.0.0", "Nodejs-16.0.0"):
+        (vm.versions_dir / name).mkdir()
+
+    assert vm.read_generation() == 0
+    vm.create_link("Nodejs", "Nodejs-14.0.0")
+    assert vm.read_generation() == 1
+
+    # No-op writes do not invalidate other readers
+    vm.create_link("Nodejs", "Nodejs-14.0.0", force=True)
+    assert vm.read_generation() == 1
+
+    snapshot = vm.get_grouped_versions()
+    plan = plan_links(vm, {"Nodejs": "Nodejs-16.0.0"})
+    assert snapshot.generation == plan.generation == 1
+
+    # Another writer gets in first
+    vm.remove_link("Nodejs")
+    with pytest.raises(StaleStateError):
+        execute_plan(vm, plan)
+    with pytest.raises(StaleStateError):
+        vm.create_link(
+            "Nodejs", "Nodejs-16.0.0", expected_generation=snapshot.generation
+        )
+    assert not (vm.persists_dir / "Nodejs").exists()
+
+
+def test_write_lock_is_reentrant_and_exclusive(vm):
+    lock = write_lock(vm.data_dir)
+    acquired = threading.Event()
+
+    def other_writer():
+        with lock:
+            acquired.set()
+
+    with lock:
+        with lock:
+            pass
+        thread = threading.Thread(target=other_writer)
+        thread.start()
+        assert not acquired.wait(0.2)
+
+    thread.join(5)
+    assert acquired.is_set()
@@ -0,0 +1,118 @@
+import json
+import struct
+
+from metadata import MetadataStore, order_versions, read_pe_version
+
+
+def _node(key, value=b"", children=(), text=False):
+    out = bytearray(6) + (key + "\0").encode("utf-16-le")
+    out += b"\0" * (-len(out) % 4)
+    out += value
+    out += b"\0" * (-len(out) % 4)
+    for child in children:
+        out += child
+        out += b"\0" * (-len(out) % 4)
+    value_length = len(value) // 2 if text else len(value)
+    struct.pack_into("<HHH", out, 0, len(out), value_length, 1 if text else 0)
+    return bytes(out)
+
+
+def _string(key, text):
+    return _node(key, (text + "\0").encode("utf-16-le"), text=True)
+
+
+def make_exe(path, timestamp=1700000000, **strings):
+    """Minimal PE32 with one .rsrc section holding a VS_VERSIONINFO."""
+    # File and product version 1.2.3.4
+    versions = (0x10002, 0x30004, 0x10002, 0x30004)
+    fixed = struct.pack("<13I", 0xFEEF04BD, 0x10000, *versions, *[0] * 7)
+    table = _node("040904b0", children=[_string(k, v) for k, v in strings.items()])
+    info = _node("VS_VERSION_INFO", fixed, [_node("StringFileInfo", children=[table])])
+
+    rsrc = bytearray()
+    rsrc += struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1) + struct.pack(
+        "<II", 16, 0x80000000 | 24
+    )
+    rsrc += struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1) + struct.pack(
+        "<II", 1, 0x80000000 | 48
+    )
+    rsrc += struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1) + struct.pack("<II", 0x409, 72)
+    rsrc += struct.pack("<IIII", 0x1000 + 88, len(info), 0, 0)
+    rsrc += info
+
+    optional = bytearray(224)
+    struct.pack_into("<H", optional, 0, 0x10B)
+    struct.pack_into("<II", optional, 96 + 16, 0x1000, len(rsrc))
+    section = b".rsrc\0\0\0" + struct.pack("<IIII", len(rsrc), 0x1000, len(rsrc), 0x200)
+    section += bytes(16)
+
+    header = bytearray(64)
+    header[:2] = b"MZ"
+    struct.pack_into("<I", header, 0x3C, 64)
+    header += b"PE\0\0" + struct.pack("<HHIIIHH", 0x14C, 1, timestamp, 0, 0, 224, 0x102)
+    header += optional + section
+    header += bytes(0x200 - len(header))
+    path.write_bytes(bytes(header) + bytes(rsrc))
+
+
+def test_read_pe_version(tmp_path):
+    exe = tmp_path / "app.exe"
+    make_exe(exe, CompanyName="Acme", ProductName="Acme App", ProductVersion="1.2.3")
+    assert read_pe_version(exe) == {
+        "build_date": "2023-11-14",
+        "version": "1.2.3",
+        "name": "Acme App",
+        "publisher": "Acme",
+    }
+
+    make_exe(exe, CompanyName="Acme")
+    assert read_pe_version(exe)["version"] == "1.2.3.4"
+
+
+def test_store_extracts_caches_and_orders(vm, tmp_path):
+    for name in ("Tool-1.9", "Tool-1.10", "Tool-nightly"):
+        (vm.versions_dir / name).mkdir()
+    make_exe(
+        vm.versions_dir / "Tool-1.9" / "Tool.exe",
+        CompanyName="Acme",
+        ProductVersion="1.9",
+    )
+    (vm.versions_dir / "Tool-1.10" / "package.json").write_text(
+        json.dumps({"version": "1.10.0", "author": {"name": "Acme"}})
+    )
+    (vm.versions_dir / "Tool-nightly" / "VERSION").write_text("2.0.0-dev\n")
+
+    store = MetadataStore(vm, path=tmp_path / "metadata.json", max_workers=2)
+    folders = vm.scan_versions()
+    results = store.refresh(folders, prune=True)
+
+    assert results["Tool-1.9"]["sources"] == ["Tool.exe"]
+    assert results["Tool-1.10"]["publisher"] == "Acme"
+    assert results["Tool-nightly"]["version"] == "2.0.0-dev"
+    assert order_versions(folders, results) == ["Tool-1.9", "Tool-1.10", "Tool-nightly"]
+
+    # Cached by manifest fingerprint; a changed manifest is read again
+    reloaded = MetadataStore(vm, path=tmp_path / "metadata.json")
+    assert reloaded.cached() == results
+    (vm.versions_dir / "Tool-nightly" / "VERSION").write_text("2.0.1-dev\n")
+    assert reloaded.extract("Tool-nightly")["version"] == "2.0.1-dev"
+
+
+def test_malformed_manifest_leaves_version_without_metadata(vm, tmp_path):
+    for name in ("Tool-1.0", "Tool-2.0"):
+        (vm.versions_dir / name).mkdir()
+    # Valid JSON, but not an object: the reader fails with AttributeError
+    (vm.versions_dir / "Tool-1.0" / "package.json").write_text("[1, 2]")
+    (vm.versions_dir / "Tool-2.0" / "VERSION").write_text("2.0.0\n")
+
+    seen = []
+    store = MetadataStore(vm, path=tmp_path / "metadata.json")
+    results = store.refresh(
+        vm.scan_versions(), on_result=lambda folder, meta: seen.append(folder)
+    )
+
+    assert results["Tool-1.0"]["version"] is None
+    assert results["Tool-2.0"]["version"] == "2.0.0"
+    assert sorted(seen) == ["Tool-1.0", "Tool-2.0"]
+    # Not cached, so a fixed manifest is picked up next time
+    assert "Tool-1.0" not in store.cached()
@@ -0,0 +1,68 @@
+import asyncio
+import gc
+import tracemalloc
+from types import SimpleNamespace
+
+from ui.notifications import NotificationManager
+
+
+class FakePage:
+    def __init__(self):
+        self.overlay = []
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+
+def make_snack():
+    return SimpleNamespace(content=SimpleNamespace(value=""), bgcolor=None, open=False)
+
+
+def test_overlay_and_memory_stay_flat():
+    page = FakePage()
+    notifier = NotificationManager(page, make_snack, min_interval=0)
+
+    def session(n):
+        for i in range(n):
+            notifier.notify(f"Linked app {i}", "green")
+            notifier.progress("batch", i % 200 + 1, 200)
+
+    session(1000)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    session(5000)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    assert len(page.overlay) == 2
+    growth = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    assert growth < 64 * 1024
+
+
+def test_progress_is_coalesced_into_one_snack():
+    page = FakePage()
+    notifier = NotificationManager(page, make_snack, min_interval=60)
+
+    async def batch():
+        notifier.notify("Starting", key="batch")
+        shown = [notifier.progress("batch", done, 200) for done in range(1, 201)]
+        return shown
+
+    shown = asyncio.run(batch())
+
+    # Only the final step renders inside the interval; the rest were held back
+    assert shown.count(True) == 1
+    assert notifier.pending == 0
+    visible = [s for s in page.overlay if s.open]
+    assert [s.content.value for s in visible] == ["Linked 200/200"]
+    assert page.updates == 2
+
+    notifier.notify("Unrelated")
+    assert len(page.overlay) == 2
+    assert sorted(s.content.value for s in page.overlay) == [
+        "Linked 200/200",
+        "Unrelated",
+    ]
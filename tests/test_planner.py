@@ -0,0 +1,47 @@
+from planner import apply_plan, plan_links
+
+
+def test_plan_classifies_and_orders_steps(vm):
+    for name in ("Nodejs-14.0.0", "Nodejs-16.0.0", "copyq-7.1.0", "AIMP-5.40"):
+        (vm.versions_dir / name).mkdir()
+    vm.create_link("Nodejs", "Nodejs-14.0.0")
+    vm.create_link("CopyQ", "copyq-7.1.0")
+    (vm.persists_dir / "AIMP").mkdir()
+    (vm.persists_dir / "AIMP" / "settings.ini").write_text("x")
+
+    plan = plan_links(
+        vm,
+        {
+            "CopyQ": "copyq-7.1.0",
+            "AIMP": "AIMP-5.40",
+            "Nodejs": "Nodejs-16.0.0",
+            "Bandizip": "Bandizip-7.40",
+            "Everything": "Nodejs-16.0.0",
+        },
+    )
+
+    assert [(s["action"], s["link_name"]) for s in plan.steps] == [
+        ("retarget", "Nodejs"),
+        ("create", "Everything"),
+        ("replace_directory", "AIMP"),
+        ("skip", "Bandizip"),
+        ("noop", "CopyQ"),
+    ]
+    # Unchanged links cost a single readlink
+    assert plan.steps[-1]["cost"] == 1
+
+    # Planning alone touches nothing
+    assert (vm.persists_dir / "AIMP" / "settings.ini").exists()
+
+    assert apply_plan(vm, plan) == (3, 0)
+    assert plan_links(vm, {"Nodejs": "Nodejs-16.0.0"}).changes == []
+
+
+def test_create_link_force_is_noop_when_unchanged(vm):
+    (vm.versions_dir / "Nodejs-14.0.0").mkdir()
+    vm.create_link("Nodejs", "Nodejs-14.0.0")
+    inode = (vm.persists_dir / "Nodejs").lstat().st_ino
+
+    vm.create_link("Nodejs", "Nodejs-14.0.0", force=True)
+
+    assert (vm.persists_dir / "Nodejs").lstat().st_ino == inode
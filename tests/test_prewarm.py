@@ -0,0 +1,93 @@
+import queue
+import threading
+import time
+
+from cache import LocalCache
+from cache import save_settings as save_cache_settings
+from prewarm import PREWARM_FILE, Prewarmer, prewarm_version, save_settings
+
+
+def test_prewarm_respects_patterns_and_budget(tmp_path):
+    (tmp_path / "bin").mkdir()
+    (tmp_path / "app.exe").write_bytes(b"x" * 100)
+    (tmp_path / "core.dll").write_bytes(b"x" * 300)
+    (tmp_path / "bin" / "tool").write_bytes(b"x" * 50)
+    (tmp_path / "readme.txt").write_bytes(b"x" * 10)
+
+    files, warmed, skipped, _ = prewarm_version(
+        tmp_path, ["*.exe", "*.dll", "bin/*"], budget_bytes=200
+    )
+
+    # Smallest first: bin/tool + app.exe fit, core.dll does not
+    assert (files, warmed, skipped) == (2, 150, 1)
+
+
+def test_linking_queues_versions_for_one_worker(vm):
+    save_settings(
+        {"enabled": True, "budget_bytes": 1000, "patterns": {"*": ["*.exe"]}},
+        vm.data_dir / PREWARM_FILE,
+    )
+    for name in ("App-1.0", "App-2.0", "Tool-1.0"):
+        (vm.versions_dir / name).mkdir()
+        (vm.versions_dir / name / "app.exe").write_bytes(b"x" * 10)
+
+    results = queue.Queue()
+    prewarmer = Prewarmer(vm, on_done=results.put)
+    prewarmer.attach()
+    # Versions are warmed one at a time, never by two workers at once
+    running = []
+    overlaps = []
+    prewarm = prewarmer.prewarm
+
+    def counted(app_name, folder_name):
+        running.append(folder_name)
+        if len(running) > 1:
+            overlaps.append(folder_name)
+        time.sleep(0.01)
+        try:
+            return prewarm(app_name, folder_name)
+        finally:
+            running.remove(folder_name)
+
+    prewarmer.prewarm = counted
+
+    # Listeners of concurrent writers start only one worker
+    barrier = threading.Barrier(2)
+
+    def link(app_name, folder_name):
+        barrier.wait()
+        prewarmer._on_link_changed(app_name, folder_name)
+
+    threads = [
+        threading.Thread(target=link, args=("App", "App-1.0")),
+        threading.Thread(target=link, args=("Tool", "Tool-1.0")),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    vm.create_link("App", "App-2.0")
+    vm.remove_link("App")
+    prewarmer.drain()
+
+    warmed = sorted(results.get(timeout=5)["folder_name"] for _ in range(3))
+    assert warmed == ["App-1.0", "App-2.0", "Tool-1.0"]
+    assert results.empty()
+    assert not overlaps
+
+
+def test_uncached_version_is_warmed_in_versions(vm, tmp_path):
+    (vm.versions_dir / "App-1.0").mkdir()
+    (vm.versions_dir / "App-1.0" / "app.exe").write_bytes(b"x" * 10)
+    cache_settings = {
+        "enabled": True,
+        "root": str(tmp_path / "local"),
+        "budget_bytes": 0,
+        "compare": "mtime",
+        "workers": 1,
+    }
+    save_cache_settings(cache_settings, tmp_path / "cache.json")
+    LocalCache(vm, tmp_path / "cache.json").attach()
+
+    result = Prewarmer(vm).prewarm("App", "App-1.0")
+    assert (result["files"], result["bytes"]) == (1, 10)
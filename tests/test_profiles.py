@@ -0,0 +1,39 @@
+import pytest
+
+from profiles import ProfileStore
+
+
+def test_profile_apply_touches_only_changed_links(vm, tmp_path):
+    for name in ("Nodejs-14.0.0", "Nodejs-16.0.0", "copyq-7.1.0"):
+        (vm.versions_dir / name).mkdir()
+    vm.create_link("Nodejs", "Nodejs-14.0.0")
+    vm.create_link("CopyQ", "copyq-7.1.0")
+
+    store = ProfileStore(vm, path=tmp_path / "profiles.json")
+    store.snapshot("stable")
+    vm.create_link("Nodejs", "Nodejs-16.0.0", force=True)
+    copyq_inode = (vm.persists_dir / "CopyQ").lstat().st_ino
+
+    assert store.names() == ["stable"]
+    assert [s["link_name"] for s in store.plan("stable").changes] == ["Nodejs"]
+
+    plan, success_count, fail_count = store.apply("stable")
+
+    assert (success_count, fail_count) == (1, 0)
+    assert plan.count("noop") == 1
+    # Unchanged link was not recreated
+    assert (vm.persists_dir / "CopyQ").lstat().st_ino == copyq_inode
+    assert store.plan("stable").changes == []
+
+
+def test_corrupt_or_broken_profiles_are_errors_not_crashes(vm, tmp_path):
+    path = tmp_path / "profiles.json"
+    path.write_text("{not json")
+    store = ProfileStore(vm, path=path)
+    assert store.names() == []
+    with pytest.raises(KeyError, match="Unknown profile"):
+        store.apply("stable")
+
+    path.write_text('{"stable": ["Nodejs-14.0.0"]}')
+    with pytest.raises(ValueError, match="broken"):
+        store.apply("stable")
@@ -0,0 +1,50 @@
+import os
+
+from shims import BinIndex
+
+
+def make_version(vm, folder, *executables):
+    root = vm.versions_dir / folder
+    for relpath in executables:
+        path = root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("#!/bin/sh\n")
+        os.chmod(path, 0o755)
+    (root / "README.txt").parent.mkdir(parents=True, exist_ok=True)
+    (root / "README.txt").write_text("not executable")
+
+
+def test_bin_index_updates_incrementally(vm):
+    make_version(vm, "Nodejs-14.0.0", "node", "bin/npm")
+    make_version(vm, "Nodejs-16.0.0", "node", "bin/npm", "bin/corepack")
+    make_version(vm, "Other-1.0", "node")
+    vm.create_link("Nodejs", "Nodejs-14.0.0")
+
+    bin_index = BinIndex(vm, is_windows=False)
+    bin_index.attach()
+    shim_count, conflicts = bin_index.rebuild()
+    bin_dir = bin_index.bin_dir
+
+    assert shim_count == 2 and conflicts == []
+    assert sorted(os.listdir(bin_dir)) == [".index.json", "node", "npm"]
+    node_inode = (bin_dir / "node").lstat().st_ino
+
+    # .bin is not an app
+    assert ".bin" not in vm.get_grouped_versions()
+
+    vm.create_link("Nodejs", "Nodejs-16.0.0", force=True)
+    assert (bin_dir / "corepack").is_symlink()
+    # Unchanged shims are left alone; they resolve through Persists/Nodejs
+    assert (bin_dir / "node").lstat().st_ino == node_inode
+    assert (bin_dir / "npm").resolve() == (
+        vm.versions_dir / "Nodejs-16.0.0" / "bin" / "npm"
+    ).resolve()
+
+    # Second app providing "node" does not steal the shim
+    vm.create_link("Other", "Other-1.0")
+    assert (bin_dir / "node").resolve().parent.name == "Nodejs-16.0.0"
+
+    vm.remove_link("Nodejs")
+    assert not (bin_dir / "npm").exists()
+    # ...and gets it once the owner goes away
+    assert (bin_dir / "node").resolve().parent.name == "Other-1.0"
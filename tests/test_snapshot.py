@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from snapshot import ScanSnapshot
+
+
+def test_grouped_versions_snapshot_reads_like_dict(vm, tmp_path):
+    for name in ("Nodejs-14.0.0", "Nodejs-16.0.0", "copyq-7.1.0", "copyq-7.0.0"):
+        (vm.versions_dir / name).mkdir()
+    vm.create_link("Node", "Nodejs-14.0.0")
+    (vm.persists_dir / "Portable").mkdir()
+    (tmp_path / "elsewhere").mkdir()
+    os.symlink(tmp_path / "elsewhere", vm.persists_dir / "Ext")
+
+    groups = vm.get_grouped_versions()
+
+    assert isinstance(groups, ScanSnapshot)
+    assert list(groups) == ["Ext", "Node", "Portable", "copyq"]
+    assert groups.to_dict() == {
+        "Ext": {"versions": [], "active_version": None, "link_name": "Ext"},
+        "Node": {
+            "versions": ["Nodejs-14.0.0", "Nodejs-16.0.0"],
+            "active_version": "Nodejs-14.0.0",
+            "link_name": "Node",
+        },
+        "Portable": {"versions": [], "active_version": None, "link_name": "Portable"},
+        "copyq": {
+            "versions": ["copyq-7.0.0", "copyq-7.1.0"],
+            "active_version": None,
+            "link_name": None,
+        },
+    }
+    assert groups["Node"].get("link_name") == "Node"
+    assert list(groups["copyq"].versions_desc) == ["copyq-7.1.0", "copyq-7.0.0"]
+
+
+def test_snapshot_is_immutable_and_interned():
+    snap = ScanSnapshot([("App", ["App-1.0", "App-2.0"], "App-2.0", "App")])
+
+    with pytest.raises(TypeError):
+        snap["App"] = None  # type: ignore[index]
+    with pytest.raises(AttributeError):
+        snap["App"].extra = 1  # type: ignore[attr-defined]
+
+    again = ScanSnapshot([("App", ["App-1.0"], None, None)])
+    assert again["App"].versions[0] is snap["App"].versions[0]
+
+
+def test_queries_filter_order_and_stop_early(vm):
+    for name in (
+        "Nodejs-14.0.0",
+        "Nodejs-16.0.0",
+        "copyq-7.0.0",
+        "git-2.0",
+        "go-1.20",
+        "go-1.21",
+        "go-1.22",
+    ):
+        (vm.versions_dir / name).mkdir()
+    # Linked under a custom name: grouped under the link, so not "unlinked"
+    vm.create_link("Node", "Nodejs-14.0.0")
+    vm.create_link("copyq", "copyq-7.0.0")
+
+    groups = vm.get_grouped_versions()
+
+    assert [g.name for g in groups.iter_groups(match="g*")] == ["git", "go"]
+    assert [
+        g.name
+        for g in groups.iter_groups(order_by="versions", descending=True, limit=2)
+    ] == [
+        "go",
+        "Node",
+    ]
+    assert [g.name for g in groups.iter_groups(linked=True)] == ["Node", "copyq"]
+    assert [
+        e["folder_name"]
+        for e in groups.iter_versions(match="go", newest_first=True, per_app=2)
+    ] == [
+        "go-1.22",
+        "go-1.21",
+    ]
+
+    unlinked = groups.iter_unlinked()
+    assert next(unlinked) == ("git", "git-2.0")
+    assert vm.get_unlinked_versions(groups) == [
+        ("git", "git-2.0"),
+        ("go", "go-1.20"),
+        ("go", "go-1.21"),
+        ("go", "go-1.22"),
+    ]
+    with pytest.raises(ValueError):
+        groups.iter_groups(order_by="size")
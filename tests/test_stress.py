@@ -0,0 +1,38 @@
+import pytest
+
+from stress import LinkSwitchStress, latency_summary
+
+
+def test_latency_summary():
+    summary = latency_summary([0.004, 0.001, 0.003, 0.002])
+    assert summary["min"] == 0.001
+    assert summary["p50"] == 0.002
+    assert summary["max"] == summary["p99"] == 0.004
+    assert latency_summary([])["mean"] == 0.0
+
+
+def test_stress_reports_switches_and_reads(tmp_path):
+    stress = LinkSwitchStress(root=tmp_path, files=3, file_size=1024)
+    for mode in ("link", "directory"):
+        report = stress.run(switches=20, readers=2, mode=mode)
+        assert report["switches"] == 20
+        assert report["reads"] > 0
+        assert report["failed_reads"] <= report["reads"]
+        assert report["latency"]["max"] >= report["latency"]["p50"] > 0
+    assert (tmp_path / "Persists" / "StressApp").is_symlink()
+
+
+def test_failed_switch_raises_its_own_error(tmp_path):
+    stress = LinkSwitchStress(root=tmp_path, files=3, file_size=1024)
+    create_link = stress.manager.create_link
+    calls = []
+
+    def failing(*args, **kwargs):
+        calls.append(args)
+        if len(calls) > 3:  # The setup link, then two switches
+            raise PermissionError("switch failed")
+        create_link(*args, **kwargs)
+
+    stress.manager.create_link = failing
+    with pytest.raises(PermissionError, match="switch failed"):
+        stress.run(switches=20, readers=2)
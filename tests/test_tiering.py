@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+import tiering
+from tiering import Throttle, TierManager, save_settings
+
+
+@pytest.fixture
+def tiers(vm, tmp_path):
+    settings_path = tmp_path / "tiers.json"
+    save_settings(
+        {
+            "enabled": True,
+            "slow_root": str(tmp_path / "slow"),
+            "hot_days": 30.0,
+            "rate_mb": 0.0,
+            "interval": 600.0,
+        },
+        settings_path,
+    )
+    tiers = TierManager(vm, settings_path=settings_path)
+    tiers.attach()
+    return tiers
+
+
+def test_cold_versions_move_to_slow_root_and_back(vm, tiers):
+    for name in ("App-1.0", "App-2.0"):
+        (vm.versions_dir / name / "bin").mkdir(parents=True)
+        (vm.versions_dir / name / "bin" / "app.exe").write_bytes(name.encode() * 1000)
+    vm.create_link("App", "App-1.0")
+
+    assert tiers.plan() == [{"folder_name": "App-2.0", "to": "slow"}]
+    [result] = tiers.run()
+    assert (result["files"], result["relinked"]) == (1, 0)
+    assert not (vm.versions_dir / "App-2.0").exists()
+    assert tiers.tier_of("App-2.0") == "slow"
+    # Still part of the grouped view, from the slow root
+    assert list(vm.get_grouped_versions()["App"].versions) == ["App-1.0", "App-2.0"]
+
+    # Linking a cold version works right away and promotes it on the next pass
+    vm.create_link("App", "App-2.0", force=True)
+    assert vm.current_links() == {"App": "App-2.0"}
+    assert tiers.plan() == [
+        {"folder_name": "App-2.0", "to": "fast"},
+        {"folder_name": "App-1.0", "to": "slow"},
+    ]
+    results = tiers.run()
+
+    assert [r["relinked"] for r in results] == [1, 0]
+    assert (vm.persists_dir / "App").resolve() == (
+        vm.versions_dir / "App-2.0"
+    ).resolve()
+    assert (
+        vm.persists_dir / "App" / "bin" / "app.exe"
+    ).read_bytes() == b"App-2.0" * 1000
+    assert vm.current_links() == {"App": "App-2.0"}
+    assert tiers.tier_of("App-1.0") == "slow"
+    assert sorted(p.name for p in tiers.slow_root.iterdir()) == ["App-1.0"]
+    assert tiers.plan() == []
+
+
+def test_throttle_limits_rate():
+    throttle = Throttle(rate=10 * 1024 * 1024)
+    started = time.perf_counter()
+    for _ in range(4):
+        throttle.consumed(256 * 1024)
+    assert time.perf_counter() - started >= 0.09
+
+
+def test_promotion_keeps_writes_made_while_copying(vm, tiers, monkeypatch):
+    (vm.versions_dir / "App-1.0").mkdir()
+    (vm.versions_dir / "App-1.0" / "settings.ini").write_bytes(b"old")
+    (vm.versions_dir / "App-1.0" / "app.exe").write_bytes(b"exe")
+    tiers.run()
+    assert tiers.tier_of("App-1.0") == "slow"
+    vm.create_link("App", "App-1.0")
+
+    copy = tiering.copy_verified
+
+    def copy_then_write(src, dst, throttle, snapshot=None):
+        result = copy(src, dst, throttle, snapshot)
+        # The running app writes through its link after the copy was made
+        (vm.persists_dir / "App" / "settings.ini").write_bytes(b"changed")
+        (vm.persists_dir / "App" / "new.log").write_bytes(b"log")
+        return result
+
+    monkeypatch.setattr(tiering, "copy_verified", copy_then_write)
+    [result] = tiers.run()
+
+    assert result["to"] == "fast"
+    assert tiers.tier_of("App-1.0") == "fast"
+    assert (vm.persists_dir / "App" / "settings.ini").read_bytes() == b"changed"
+    assert (vm.persists_dir / "App" / "new.log").read_bytes() == b"log"
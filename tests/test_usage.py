@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+
+from usage import DAY, UsageTracker, preferred_version
+
+
+def test_switches_sampling_and_unused(vm, tmp_path):
+    for name in ("Tool-1.0", "Tool-2.0", "Tool-3.0", "Old-1.0"):
+        (vm.versions_dir / name).mkdir()
+        for i in range(5):
+            (vm.versions_dir / name / f"f{i}.bin").write_bytes(b"x")
+    tracker = UsageTracker(vm, path=tmp_path / "usage.json", sample_files=2)
+    tracker.attach()
+
+    vm.create_link("Tool", "Tool-3.0")
+    vm.create_link("Tool", "Tool-2.0", force=True)  # Rolled back from 3.0
+
+    # An old access, then a program opening a file through the link
+    now = time.time()
+    for i in range(5):
+        os.utime(
+            vm.versions_dir / "Tool-2.0" / f"f{i}.bin", (now - 10 * DAY, now - 10 * DAY)
+        )
+    os.utime(vm.versions_dir / "Tool-2.0" / "f3.bin", (now + 60, now - 10 * DAY))
+
+    # Two files per pass: the new access time is found on the second pass
+    assert tracker.sample() == 1
+    assert tracker.sample() == 1
+    assert tracker.last_used()["Tool-2.0"] == now + 60
+
+    # Tool-3.0 was linked today; the active Tool-2.0 never counts as unused
+    assert tracker.unused(1) == ["Old-1.0", "Tool-1.0"]
+    assert tracker.unused(1, now=now + 3 * DAY) == ["Old-1.0", "Tool-1.0", "Tool-3.0"]
+
+    rollup = tracker.rollups()["Tool"]
+    assert (rollup["versions"], rollup["switches"]) == (2, 2)
+
+    versions = ["Tool-1.0", "Tool-2.0", "Tool-3.0"]
+    rank = {v: i for i, v in enumerate(versions)}
+    assert tracker.rolled_back(rank) == {"Tool-3.0"}
+    assert preferred_version(versions, tracker.rolled_back(rank)) == "Tool-2.0"
+
+    # Linking it again means it is wanted after all
+    vm.create_link("Tool", "Tool-3.0", force=True)
+    assert tracker.rolled_back(rank) == set()
+
+
+def test_batch_of_switches_is_saved_once(vm, tmp_path, monkeypatch):
+    for i in range(5):
+        (vm.versions_dir / f"App{i}-1.0").mkdir()
+    tracker = UsageTracker(vm, path=tmp_path / "usage.json")
+    tracker.attach()
+    saves = []
+    save = tracker._save
+    monkeypatch.setattr(tracker, "_save", lambda data: saves.append(save(data)))
+
+    vm.create_links([(f"App{i}", f"App{i}-1.0") for i in range(5)])
+    assert len(saves) == 1
+    assert len(tracker.load()["history"]) == 5
+
+    vm.remove_link("App0")
+    assert len(saves) == 2
+    assert tracker.load()["history"][-1][1:] == ["App0", None]
+
+
+def test_sampling_resumes_inside_subfolders(vm, tmp_path):
+    version = vm.versions_dir / "Tool-1.0"
+    for folder in ("", "a", "a/deep", "b"):
+        (version / folder).mkdir(exist_ok=True)
+        for name in ("f1", "f2"):
+            (version / folder / name).write_bytes(b"x")
+    now = time.time()
+    for path in version.rglob("*"):
+        if path.is_file():
+            os.utime(path, (now - DAY, now - DAY))
+    os.utime(version / "b" / "f1", (now, now - DAY))
+    vm.create_link("Tool", "Tool-1.0")
+    tracker = UsageTracker(vm, path=tmp_path / "usage.json", sample_files=3)
+
+    # f1 f2 a/f1, then a/f2 a/deep/f1 a/deep/f2, then b/f1 b/f2
+    tracker.sample()
+    assert tracker.load()["cursor"]["Tool"] == ["a", "f1"]
+    tracker.sample()
+    assert tracker.load()["cursor"]["Tool"] == ["a", "deep", "f2"]
+    assert tracker.sample() == 1
+    assert tracker.load()["cursor"]["Tool"] == []
+    assert tracker.last_used()["Tool-1.0"] == now
+
+
+def test_saves_wait_for_the_write_lock(vm, tmp_path):
+    tracker = UsageTracker(vm, path=tmp_path / "usage.json")
+    tracker.record_switch("Tool", "Tool-1.0")
+
+    # E.g. another process merging its own switches into the file
+    with vm.write_transaction():
+        flush = threading.Thread(target=tracker.flush)
+        flush.start()
+        flush.join(timeout=0.2)
+        assert flush.is_alive()
+        assert not tracker.path.exists()
+    flush.join(timeout=5)
+    assert tracker.load()["versions"]["Tool-1.0"]["switches"] == 1